@@ -13,11 +13,20 @@ from a2a.types import (
     AgentSkill,
 )
 from .agent_executor import ZadkGuideAgentExecutor
-from google.adk.artifacts import InMemoryArtifactService
+from .artifacts import create_artifact_service
+from .log_config import setup_logging
+from .lifespan import app_lifespan
+from .loop_monitor import loop_endpoint
+from .metrics import metrics_endpoint
+from .profiling import ProfilingMiddleware, profile_endpoint
 from google.adk.memory.in_memory_memory_service import InMemoryMemoryService
 from google.adk.runners import Runner
 from google.adk.sessions import InMemorySessionService
+from starlette.middleware import Middleware
+from starlette.routing import Route
 from .root_agent.agent import root_agent
+from .tracing import TRACE_ROUTES, TracedSessionService, setup_tracing
+from .usage import UsageTracker
 
 logger = logging.getLogger(__name__)
 
@@ -98,23 +107,25 @@ def main():
             description="A comprehensive multi-agent system that provides data analysis, visualization, coding assistance, and Vertex AI integration capabilities through specialized sub-agents.",
             url=f"http://{host}:{port}/",
             version="1.0.0",
-            defaultInputModes=["text/plain"],
+            defaultInputModes=["text/plain", "text/csv", "application/vnd.apache.parquet"],
             defaultOutputModes=["text/plain"],
             capabilities=capabilities,
             skills=skills,
         )
 
+        setup_tracing()
+
         # Create ADK Runner with the root agent
         runner = Runner(
             app_name=agent_card.name,
             agent=root_agent,
-            artifact_service=InMemoryArtifactService(),
-            session_service=InMemorySessionService(),
+            artifact_service=create_artifact_service(),
+            session_service=TracedSessionService(InMemorySessionService()),
             memory_service=InMemoryMemoryService(),
         )
         
         # Create Agent Executor
-        agent_executor = ZadkGuideAgentExecutor(runner)
+        agent_executor = ZadkGuideAgentExecutor(runner, UsageTracker(root_agent))
 
         # Create Default Request Handler
         request_handler = DefaultRequestHandler(
@@ -128,22 +139,36 @@ def main():
             http_handler=request_handler
         )
 
-        logger.info(f"Starting ZadkGuide A2A Agent Server on {host}:{port}")
-        logger.info(f"Agent Card available at: http://{host}:{port}/.well-known/agent-card.json")
+        logger.info("Starting ZadkGuide A2A Agent Server on %s:%s", host, port)
+        logger.info("Agent Card available at: http://%s:%s/.well-known/agent-card.json", host, port)
         
         # Start the server
-        uvicorn.run(server.build(), host=host, port=port)
+        uvicorn.run(
+            server.build(
+                routes=[
+                    Route("/metrics", metrics_endpoint),
+                    *(Route(path, endpoint) for path, endpoint in TRACE_ROUTES),
+                    Route("/debug/loop", loop_endpoint),
+                    Route("/debug/profile", profile_endpoint, methods=["GET", "POST"]),
+                ],
+                middleware=[Middleware(ProfilingMiddleware)],
+                lifespan=app_lifespan,
+            ),
+            host=host,
+            port=port,
+            # Let uvicorn's loggers propagate to the queued root handler.
+            log_config=None,
+        )
         
     except MissingAPIKeyError as e:
-        logger.error(f"Error: {e}")
+        logger.error("Error: %s", e)
         exit(1)
     except Exception as e:
-        logger.error(f"An error occurred during server startup: {e}")
+        logger.error("An error occurred during server startup: %s", e)
         exit(1)
 
 
 if __name__ == "__main__":
-    # Configure logging
-    logging.basicConfig(level=logging.INFO)
-    logging.getLogger("google.adk").setLevel(logging.INFO)
+    # Configure logging (see log_config.py)
+    setup_logging()
     main()
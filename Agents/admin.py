@@ -0,0 +1,24 @@
+"""The admin token that guards the debug, usage and artifact endpoints.
+
+Requests must send `Authorization: Bearer $ADMIN_TOKEN`; every guarded
+endpoint answers 403 when ADMIN_TOKEN is unset.
+"""
+
+import hmac
+import os
+
+from starlette.exceptions import HTTPException
+from starlette.requests import Request
+
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+
+
+def is_admin(request: Request) -> bool:
+    header = request.headers.get("authorization", "")
+    return bool(ADMIN_TOKEN) and hmac.compare_digest(header, f"Bearer {ADMIN_TOKEN}")
+
+
+def require_admin(request: Request) -> None:
+    """FastAPI dependency form of `is_admin`."""
+    if not is_admin(request):
+        raise HTTPException(status_code=403, detail="Forbidden")
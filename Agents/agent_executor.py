@@ -1,7 +1,11 @@
 """Agent Executor for ZadkGuide A2A Protocol implementation."""
 
+import base64
 import logging
+import time
 from collections.abc import AsyncGenerator
+from contextlib import aclosing
+from typing import Optional
 
 from a2a.server.agent_execution import AgentExecutor
 from a2a.server.agent_execution.context import RequestContext
@@ -18,27 +22,39 @@ from a2a.types import (
 )
 from a2a.utils.errors import ServerError
 from google.adk import Runner
+from google.adk.agents.run_config import RunConfig
 from google.adk.events import Event
 from google.genai import types
 
+from .log_config import bind_log_context
+from .metrics import observe_stream
+from .usage import UsageTracker
+
 logger = logging.getLogger(__name__)
-logger.setLevel(logging.DEBUG)
 
 
 class ZadkGuideAgentExecutor(AgentExecutor):
     """An AgentExecutor that runs ZadkGuide's ADK-based multi-agent system."""
 
-    def __init__(self, runner: Runner):
+    def __init__(self, runner: Runner, usage_tracker: Optional[UsageTracker] = None):
         self.runner = runner
+        self.usage_tracker = usage_tracker
         self._running_sessions = {}
 
     def _run_agent(
-        self, session_id, new_message: types.Content
+        self, session_id, new_message: types.Content, queued_at: float
     ) -> AsyncGenerator[Event, None]:
         """Run the agent with the given session and message."""
-        return self.runner.run_async(
-            session_id=session_id, user_id="zadkguide_agent", new_message=new_message
+        events = self.runner.run_async(
+            session_id=session_id,
+            user_id="zadkguide_agent",
+            new_message=new_message,
+            # Uploaded files become session artifacts (e.g. datasets).
+            run_config=RunConfig(save_input_blobs_as_artifacts=True),
         )
+        if self.usage_tracker is not None:
+            events = self.usage_tracker.track(events, "zadkguide_agent", session_id)
+        return observe_stream(events, "a2a", queued_at)
 
     async def _process_request(
         self,
@@ -47,32 +63,62 @@ class ZadkGuideAgentExecutor(AgentExecutor):
         task_updater: TaskUpdater,
     ) -> None:
         """Process the incoming request and handle agent responses."""
+        queued_at = time.perf_counter()
         session_obj = await self._upsert_session(session_id)
         session_id = session_obj.id
-
-        async for event in self._run_agent(session_id, new_message):
-            if event.is_final_response():
-                parts = convert_genai_parts_to_a2a(
-                    event.content.parts if event.content and event.content.parts else []
-                )
-                logger.debug("Yielding final response: %s", parts)
-                await task_updater.add_artifact(parts)
-                await task_updater.complete()
-                break
-            if not event.get_function_calls():
-                logger.debug("Yielding update response")
-                await task_updater.update_status(
-                    TaskState.working,
-                    message=task_updater.new_agent_message(
-                        convert_genai_parts_to_a2a(
-                            event.content.parts
-                            if event.content and event.content.parts
-                            else []
+        bind_log_context(session_id=session_id)
+
+        # Close the run promptly on break so its usage is recorded now.
+        async with aclosing(self._run_agent(session_id, new_message, queued_at)) as events:
+            async for event in events:
+                if event.actions.artifact_delta:
+                    await self._add_artifacts(
+                        session_id, event.actions.artifact_delta, task_updater
+                    )
+                if event.is_final_response():
+                    parts = convert_genai_parts_to_a2a(
+                        event.content.parts if event.content and event.content.parts else []
+                    )
+                    logger.debug("Yielding final response with %d parts", len(parts))
+                    await task_updater.add_artifact(parts)
+                    await task_updater.complete()
+                    break
+                if not event.get_function_calls():
+                    logger.debug("Yielding update response")
+                    await task_updater.update_status(
+                        TaskState.working,
+                        message=task_updater.new_agent_message(
+                            convert_genai_parts_to_a2a(
+                                event.content.parts
+                                if event.content and event.content.parts
+                                else []
+                            ),
                         ),
-                    ),
-                )
-            else:
-                logger.debug("Skipping event with function calls")
+                    )
+                else:
+                    logger.debug("Skipping event with function calls")
+
+    async def _add_artifacts(
+        self, session_id: str, artifact_delta: dict[str, int], task_updater: TaskUpdater
+    ) -> None:
+        """Send the artifacts saved by tools (e.g. charts) to the client as files."""
+        artifact_service = self.runner.artifact_service
+        if artifact_service is None:
+            return
+        for filename, version in artifact_delta.items():
+            artifact = await artifact_service.load_artifact(
+                app_name=self.runner.app_name,
+                user_id="zadkguide_agent",
+                session_id=session_id,
+                filename=filename,
+                version=version,
+            )
+            if artifact is None or artifact.inline_data is None:
+                logger.warning("Artifact %s v%s not found", filename, version)
+                continue
+            part = convert_genai_part_to_a2a(artifact)
+            part.root.file.name = filename
+            await task_updater.add_artifact([part], name=filename)
 
     async def execute(
         self,
@@ -137,7 +183,7 @@ def convert_a2a_part_to_genai(part: Part) -> types.Part:
         if isinstance(root.file, FileWithBytes):
             return types.Part(
                 inline_data=types.Blob(
-                    data=root.file.bytes.encode("utf-8"),
+                    data=base64.b64decode(root.file.bytes),
                     mime_type=root.file.mimeType or "application/octet-stream",
                 )
             )
@@ -175,7 +221,8 @@ def convert_genai_part_to_a2a(part: types.Part) -> Part:
         return Part(
             root=FilePart(
                 file=FileWithBytes(
-                    bytes=part.inline_data.data.decode("utf-8"),
+                    # A2A carries file bytes base64-encoded.
+                    bytes=base64.b64encode(part.inline_data.data).decode("ascii"),
                     mimeType=part.inline_data.mime_type,
                 )
             )
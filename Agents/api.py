@@ -2,25 +2,42 @@
 
 import json
 import logging
-from fastapi import FastAPI
+import time
+from fastapi import Depends, FastAPI, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-from starlette.responses import StreamingResponse
+from starlette.responses import Response, StreamingResponse
 
 from google.adk.runners import Runner
 from google.adk.sessions import DatabaseSessionService
 from google.genai import types
 
+from .admin import is_admin, require_admin
+from .artifacts import (
+    ARTIFACT_MAX_BYTES,
+    artifact_url,
+    create_artifact_service,
+    valid_artifact_token,
+)
+from .log_config import bind_log_context, setup_logging
+from .lifespan import app_lifespan
+from .loop_monitor import loop_endpoint
+from .metrics import metrics_endpoint, observe_stream
+from .profiling import ProfilingMiddleware, profile_endpoint
 from .root_agent.agent import root_agent
+from .tracing import TRACE_ROUTES, TracedSessionService, setup_tracing
+from .usage import UsageTracker
 
 # --- 1. Application Setup ---
-logging.basicConfig(level=logging.INFO)
-logging.getLogger("google.adk").setLevel(logging.INFO)
+setup_logging()
+logger = logging.getLogger(__name__)
+setup_tracing()
 
 app = FastAPI(
     title="ZadkGuide Agent API",
     description="API for interacting with the ZadkGuide multi-agent system.",
     version="1.0.0",
+    lifespan=app_lifespan,
 )
 
 app.add_middleware(
@@ -30,18 +47,26 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(ProfilingMiddleware)
 
 # Use DatabaseSessionService with a local SQLite file for robust session management.
 DB_URL = "sqlite:///./agent_api_data.db"
-session_service = DatabaseSessionService(db_url=DB_URL)
+session_service = TracedSessionService(DatabaseSessionService(db_url=DB_URL))
 
 APP_NAME = "ZadkGuideAPI"
+USER_ID = "api_user"
+# Charts and other tool output (see artifacts.py).
+artifact_service = create_artifact_service()
 runner = Runner(
     agent=root_agent,
     app_name=APP_NAME,
     session_service=session_service,
+    artifact_service=artifact_service,
 )
 
+# Token and cost accounting per invocation, with budgets (see usage.py).
+usage_tracker = UsageTracker(root_agent)
+
 # --- 2. API Data Models ---
 class ChatRequest(BaseModel):
     """Defines the structure of a chat request from the client."""
@@ -50,14 +75,20 @@ class ChatRequest(BaseModel):
 
 
 # --- 3. Streaming Logic ---
-async def stream_agent_responses(user_id: str, session_id: str, user_input: str):
+async def stream_agent_responses(
+    user_id: str, session_id: str, user_input: str, queued_at: float
+):
     """An async generator that yields agent events as they happen."""
+    bind_log_context(session_id=session_id)
     content = types.Content(role="user", parts=[types.Part(text=user_input)])
 
     try:
-        async for event in runner.run_async(
-            user_id=user_id, session_id=session_id, new_message=content
-        ):
+        events = usage_tracker.track(
+            runner.run_async(user_id=user_id, session_id=session_id, new_message=content),
+            user_id,
+            session_id,
+        )
+        async for event in observe_stream(events, "api", queued_at):
             # Determine event type based on event properties
             if event.is_final_response():
                 event_type = "FINAL_RESPONSE"
@@ -92,6 +123,13 @@ async def stream_agent_responses(user_id: str, session_id: str, user_input: str)
                 elif hasattr(part, "text") and part.text:
                     response_data["data"] = {"text": part.text.strip()}
             
+            # Artifacts saved by tools, with signed URLs to download them
+            if event.actions.artifact_delta:
+                response_data["data"]["artifacts"] = {
+                    filename: artifact_url(session_id, filename, version)
+                    for filename, version in event.actions.artifact_delta.items()
+                }
+
             # Add event metadata
             response_data["data"]["event_id"] = event.id
             response_data["data"]["author"] = event.author
@@ -109,7 +147,7 @@ async def chat_stream(request: ChatRequest):
     """
     Main endpoint for interacting with the agent.
     """
-    USER_ID = "api_user"
+    queued_at = time.perf_counter()
 
     # Follow the working reference pattern with proper async/await
     try:
@@ -118,10 +156,10 @@ async def chat_stream(request: ChatRequest):
             app_name=APP_NAME, user_id=USER_ID, session_id=request.session_id
         )
         actual_session_id = session.id
-        logging.info(f"Found existing session: {actual_session_id}")
+        logger.info("Found existing session: %s", actual_session_id)
     except Exception:
         # If get_session fails, the session does not exist. Create it.
-        logging.info(f"Session '{request.session_id}' not found. Creating a new one.")
+        logger.info("Session '%s' not found. Creating a new one.", request.session_id)
         initial_state = {
             "username": "API User",
             "email": "api@example.com",
@@ -136,9 +174,116 @@ async def chat_stream(request: ChatRequest):
         )
         # Use the actual session ID from the returned session object
         actual_session_id = new_session.id
-        logging.info(f"Created new session with ID: {actual_session_id}")
+        logger.info("Created new session with ID: %s", actual_session_id)
 
     return StreamingResponse(
-        stream_agent_responses(USER_ID, actual_session_id, request.user_input),
+        stream_agent_responses(USER_ID, actual_session_id, request.user_input, queued_at),
         media_type="application/x-json-stream",
     )
+
+
+async def read_limited_body(request: Request, limit: int) -> bytes:
+    """The request body, or a 413 as soon as it is known to exceed limit bytes."""
+    too_large = HTTPException(status_code=413, detail=f"Body is larger than {limit} bytes")
+    length = request.headers.get("content-length", "")
+    if length.isdigit() and int(length) > limit:
+        raise too_large
+    body = bytearray()
+    async for chunk in request.stream():
+        body += chunk
+        if len(body) > limit:
+            raise too_large
+    return bytes(body)
+
+
+@app.post("/sessions/{session_id}/artifacts/{filename}", dependencies=[Depends(require_admin)])
+async def upload_artifact(session_id: str, filename: str, request: Request):
+    """Saves the request body as a session artifact, e.g. a CSV or Parquet dataset.
+
+    The agent can then load it by name ("Uploaded file: <filename>").
+    """
+    data = await read_limited_body(request, ARTIFACT_MAX_BYTES)
+    version = await artifact_service.save_artifact(
+        app_name=APP_NAME,
+        user_id=USER_ID,
+        session_id=session_id,
+        filename=filename,
+        artifact=types.Part.from_bytes(
+            data=data,
+            mime_type=request.headers.get("content-type", "application/octet-stream"),
+        ),
+    )
+    return {"filename": filename, "version": version}
+
+
+@app.get("/sessions/{session_id}/artifacts/{filename}")
+async def session_artifact(
+    request: Request,
+    session_id: str,
+    filename: str,
+    version: int | None = Query(default=None, ge=0),
+    token: str = "",
+):
+    """An artifact saved by a tool, e.g. a chart named in a function response.
+
+    Open to the session's client through the signed URL the chat stream
+    gave it, and to admins for any version.
+    """
+    if not is_admin(request) and not (
+        version is not None and valid_artifact_token(session_id, filename, version, token)
+    ):
+        raise HTTPException(status_code=403, detail="Forbidden")
+    try:
+        artifact = await artifact_service.load_artifact(
+            app_name=APP_NAME,
+            user_id=USER_ID,
+            session_id=session_id,
+            filename=filename,
+            version=version,
+        )
+    except IndexError:
+        # InMemoryArtifactService indexes its versions with the requested one.
+        artifact = None
+    if artifact is None or artifact.inline_data is None:
+        raise HTTPException(status_code=404, detail="Artifact not found")
+    if len(artifact.inline_data.data or b"") > ARTIFACT_MAX_BYTES:
+        raise HTTPException(
+            status_code=413, detail=f"Artifact is larger than {ARTIFACT_MAX_BYTES} bytes"
+        )
+    return Response(
+        content=artifact.inline_data.data,
+        media_type=artifact.inline_data.mime_type or "application/octet-stream",
+    )
+
+
+# --- 5. Usage Endpoints (admin-only, see admin.py) ---
+@app.get("/usage/invocations/{invocation_id}", dependencies=[Depends(require_admin)])
+def invocation_usage(invocation_id: str):
+    """Token and cost totals of one invocation, per agent."""
+    return usage_tracker.store.summary("invocation_id", invocation_id)
+
+
+@app.get("/usage/sessions/{session_id}", dependencies=[Depends(require_admin)])
+def session_usage(session_id: str):
+    """Token and cost totals of a session, per agent."""
+    return usage_tracker.store.summary("session_id", session_id)
+
+
+@app.get("/usage/users/{user_id}", dependencies=[Depends(require_admin)])
+def user_usage(user_id: str):
+    """Token and cost totals of a user across sessions, per agent."""
+    return usage_tracker.store.summary("user_id", user_id)
+
+
+# Prometheus metrics (see metrics.py).
+app.add_route("/metrics", metrics_endpoint)
+
+# Admin-only sampled per-invocation traces as Chrome trace JSON (see tracing.py).
+for path, endpoint in TRACE_ROUTES:
+    app.add_route(path, endpoint)
+
+# Admin-only recent event loop stalls and their culprits (see loop_monitor.py).
+app.add_route("/debug/loop", loop_endpoint)
+
+# Admin-only on-demand profiling (see profiling.py).
+app.add_route("/debug/profile", profile_endpoint, methods=["GET", "POST"])
@@ -0,0 +1,129 @@
+"""Artifact storage shared by the FastAPI and A2A servers.
+
+Tools save their output (e.g. charts) through the runner's ADK
+ArtifactService, not to the local disk. With ARTIFACT_BUCKET set,
+artifacts go to that Google Cloud Storage bucket and every worker and
+replica sees them; otherwise they are kept in the process's memory, up to
+ARTIFACT_MEMORY_MAX_BYTES, beyond which the least recently used files are
+dropped with all their versions.
+
+Artifacts larger than ARTIFACT_MAX_BYTES (default 50 MiB) are neither
+accepted nor served over HTTP. The download URLs sent to a client carry a
+token signed with ARTIFACT_URL_SECRET, so the client can fetch what its
+session produced without the admin token.
+"""
+
+import hashlib
+import hmac
+import os
+import secrets
+from typing import Optional
+from urllib.parse import quote
+
+from google.adk.artifacts import (
+    BaseArtifactService,
+    GcsArtifactService,
+    InMemoryArtifactService,
+)
+from google.genai import types
+from pydantic import PrivateAttr
+
+ARTIFACT_BUCKET = os.getenv("ARTIFACT_BUCKET", "")
+ARTIFACT_MAX_BYTES = int(os.getenv("ARTIFACT_MAX_BYTES", str(50 * 1024 * 1024)))
+ARTIFACT_MEMORY_MAX_BYTES = int(os.getenv("ARTIFACT_MEMORY_MAX_BYTES", str(512 * 1024 * 1024)))
+# Without a shared secret, URLs are only valid on the process that made them.
+ARTIFACT_URL_SECRET = os.getenv("ARTIFACT_URL_SECRET", "").encode() or secrets.token_bytes(32)
+
+
+def _size(part: types.Part) -> int:
+    if part.inline_data is not None:
+        return len(part.inline_data.data or b"")
+    return len((part.text or "").encode())
+
+
+class BoundedInMemoryArtifactService(InMemoryArtifactService):
+    """InMemoryArtifactService that drops least recently used files past max_bytes."""
+
+    max_bytes: int = ARTIFACT_MEMORY_MAX_BYTES
+    _bytes: int = PrivateAttr(default=0)
+
+    async def save_artifact(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        session_id: str,
+        filename: str,
+        artifact: types.Part,
+    ) -> int:
+        version = await super().save_artifact(
+            app_name=app_name,
+            user_id=user_id,
+            session_id=session_id,
+            filename=filename,
+            artifact=artifact,
+        )
+        path = self._artifact_path(app_name, user_id, session_id, filename)
+        self._touch(path)
+        self._bytes += _size(artifact)
+        # The dict is kept in use order, oldest first; the new file stays.
+        for oldest in list(self.artifacts):
+            if self._bytes <= self.max_bytes or oldest == path:
+                break
+            self._bytes -= sum(_size(part) for part in self.artifacts.pop(oldest))
+        return version
+
+    async def load_artifact(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        session_id: str,
+        filename: str,
+        version: Optional[int] = None,
+    ) -> Optional[types.Part]:
+        self._touch(self._artifact_path(app_name, user_id, session_id, filename))
+        return await super().load_artifact(
+            app_name=app_name,
+            user_id=user_id,
+            session_id=session_id,
+            filename=filename,
+            version=version,
+        )
+
+    async def delete_artifact(
+        self, *, app_name: str, user_id: str, session_id: str, filename: str
+    ) -> None:
+        path = self._artifact_path(app_name, user_id, session_id, filename)
+        self._bytes -= sum(_size(part) for part in self.artifacts.get(path, []))
+        await super().delete_artifact(
+            app_name=app_name, user_id=user_id, session_id=session_id, filename=filename
+        )
+
+    def _touch(self, path: str) -> None:
+        if path in self.artifacts:
+            self.artifacts[path] = self.artifacts.pop(path)
+
+
+def create_artifact_service() -> BaseArtifactService:
+    """The artifact service configured by the environment."""
+    if ARTIFACT_BUCKET:
+        return GcsArtifactService(bucket_name=ARTIFACT_BUCKET)
+    return BoundedInMemoryArtifactService()
+
+
+def artifact_token(session_id: str, filename: str, version: int) -> str:
+    message = "\0".join((session_id, filename, str(version))).encode()
+    return hmac.new(ARTIFACT_URL_SECRET, message, hashlib.sha256).hexdigest()
+
+
+def artifact_url(session_id: str, filename: str, version: int) -> str:
+    """The download URL of one version of an artifact, for the session's client."""
+    return (
+        f"/sessions/{quote(session_id, safe='')}/artifacts/{quote(filename, safe='')}"
+        f"?version={version}&token={artifact_token(session_id, filename, version)}"
+    )
+
+
+def valid_artifact_token(session_id: str, filename: str, version: int, token: str) -> bool:
+    return hmac.compare_digest(token, artifact_token(session_id, filename, version))
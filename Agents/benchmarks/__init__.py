@@ -0,0 +1 @@
+"""Benchmarks for the ZadkGuide agent runtime."""
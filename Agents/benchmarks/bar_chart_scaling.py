@@ -0,0 +1,81 @@
+"""Bar chart render time from 10^3 to 10^6 input points.
+
+For each size, renders categorical data (n values over n/10 labels,
+aggregated to top-N plus "Other") and an ordered series (downsampled with
+LTTB), in process, and prints the time spent preparing the bars and in
+total. Up to --naive-max points it also times the original approach, one
+pyplot bar per input element.
+
+Run from the project root:
+
+    python -m Agents.benchmarks.bar_chart_scaling
+"""
+
+import argparse
+import io
+import time
+
+import numpy as np
+
+from ..root_agent.sub_agents.data_visualisation_agent.aggregate import prepare_bars
+from ..root_agent.sub_agents.data_visualisation_agent.config import MAX_BARS
+from ..root_agent.sub_agents.data_visualisation_agent.render import render_bar_chart
+
+
+def _naive(labels, values) -> float:
+    import matplotlib
+
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    start = time.perf_counter()
+    plt.figure()
+    plt.bar(labels, values)
+    buffer = io.BytesIO()
+    plt.savefig(buffer, format="png")
+    plt.close()
+    return time.perf_counter() - start
+
+
+def _timed(labels, values, max_bars: int, ordered: bool) -> tuple[float, float]:
+    start = time.perf_counter()
+    prepare_bars(labels, values, max_bars, ordered)
+    prepared = time.perf_counter() - start
+    start = time.perf_counter()
+    render_bar_chart(labels, values, "bench", "x", "y", max_bars, ordered)
+    return prepared, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--max-exponent", type=int, default=6)
+    parser.add_argument("--max-bars", type=int, default=MAX_BARS)
+    parser.add_argument("--series-points", type=int, default=500)
+    parser.add_argument("--naive-max", type=int, default=10_000)
+    args = parser.parse_args()
+
+    render_bar_chart(["a"], [1.0], "warm-up", "x", "y")
+    rng = np.random.default_rng(0)
+    print(f"{'points':>9s}  {'kind':11s} {'prepare':>10s} {'total':>10s} {'naive':>10s}")
+    for exponent in range(3, args.max_exponent + 1):
+        n = 10**exponent
+        values = rng.random(n) * 100
+        categories = np.char.add("item ", rng.integers(0, n // 10, n).astype(str))
+        series = np.arange(n)
+        for kind, labels, max_bars, ordered in (
+            ("categorical", categories, args.max_bars, False),
+            ("series", series, args.series_points, True),
+        ):
+            prepared, total = _timed(labels, values, max_bars, ordered)
+            naive = (
+                f"{_naive(labels.astype(str), values) * 1000:8.0f}ms"
+                if n <= args.naive_max
+                else f"{'-':>10s}"
+            )
+            print(
+                f"{n:9d}  {kind:11s} {prepared * 1000:8.1f}ms {total * 1000:8.1f}ms {naive}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""Concurrent chart throughput: pyplot on the loop vs the render engine.
+
+Renders the same bar charts concurrently three ways and prints charts per
+second and the worst event loop lag seen meanwhile (how long every other
+stream would have been stalled):
+
+- pyplot: the original tool, global pyplot state on the event loop;
+- thread: the Figure/Agg renderer in threads (CHART_RENDER_POOL_SIZE=0);
+- process: the Figure/Agg renderer in a warm process pool.
+
+Run from the project root:
+
+    python -m Agents.benchmarks.chart_render --charts 64 --workers 4
+"""
+
+import argparse
+import asyncio
+import io
+import time
+
+from ..root_agent.sub_agents.data_visualisation_agent.render import (
+    ChartRenderer,
+    render_bar_chart,
+)
+
+
+def _chart(i: int, bars: int) -> tuple:
+    labels = [f"item {j}" for j in range(bars)]
+    values = [float((i * 7 + j * 13) % 100) for j in range(bars)]
+    return labels, values, f"Chart {i}", "Item", "Value"
+
+
+def _pyplot_bar(labels, values, title, x_label, y_label) -> bytes:
+    import matplotlib
+
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    plt.figure()
+    plt.bar(labels, values)
+    plt.title(title)
+    plt.xlabel(x_label)
+    plt.ylabel(y_label)
+    buffer = io.BytesIO()
+    plt.savefig(buffer, format="png")
+    plt.close()
+    return buffer.getvalue()
+
+
+async def _max_loop_lag(stop: asyncio.Event, interval_s: float = 0.01) -> float:
+    worst = 0.0
+    while not stop.is_set():
+        expected = time.perf_counter() + interval_s
+        await asyncio.sleep(interval_s)
+        worst = max(worst, time.perf_counter() - expected)
+    return worst
+
+
+async def _run(render, charts: int, bars: int, concurrency: int) -> tuple[float, float]:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(i: int):
+        async with semaphore:
+            png = await render(*_chart(i, bars))
+            assert png.startswith(b"\x89PNG")
+
+    stop = asyncio.Event()
+    lag = asyncio.create_task(_max_loop_lag(stop))
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(charts)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    return elapsed, await lag
+
+
+async def main_async(charts: int, bars: int, concurrency: int, workers: int):
+    async def on_loop(*args):
+        return _pyplot_bar(*args)
+
+    threads = ChartRenderer(size=0)
+    processes = ChartRenderer(size=workers)
+    processes.start()
+    # Wait for the workers to be warm so startup is not timed.
+    await asyncio.gather(*(processes.render(render_bar_chart, *_chart(0, 2)) for _ in range(workers)))
+    _pyplot_bar(*_chart(0, 2))
+
+    modes = (
+        ("pyplot", on_loop),
+        ("thread", lambda *a: threads.render(render_bar_chart, *a)),
+        (f"process x{workers}", lambda *a: processes.render(render_bar_chart, *a)),
+    )
+    for name, render in modes:
+        elapsed, lag = await _run(render, charts, bars, concurrency)
+        print(
+            f"{name:12s} {charts / elapsed:7.1f} charts/s   "
+            f"total {elapsed:6.2f} s   max loop lag {lag * 1000:8.1f} ms"
+        )
+    processes.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--charts", type=int, default=64)
+    parser.add_argument("--bars", type=int, default=30)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+    asyncio.run(main_async(args.charts, args.bars, args.concurrency, args.workers))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,250 @@
+"""Chart cost matrix, pyplot vs the chart engine, with regression checks.
+
+Renders bar charts of 10 to 100k bars and tables of 10 to 10k rows with
+each engine:
+
+- pyplot: the original tools, one pyplot bar per label and one table
+  image sized by its row count;
+- engine: what the tools do now, bars aggregated to MAX_BARS and drawn on
+  a Figure, tables split into fixed-size pages (or exported as CSV and
+  HTML above TABLE_IMAGE_MAX_ROWS rows).
+
+Every case runs in a fresh process, so the cold time includes importing
+matplotlib and loading fonts, as for the first chart in a render worker.
+The warm time is the median of --repeats further renders. Peak RSS is the
+process's high-water mark and output size the total bytes produced. The
+concurrency of the render pool is measured by chart_render.py instead.
+
+Results can be saved as a baseline and later runs compared against it;
+the run fails (exit status 1) when any time, peak RSS or output size grows
+by more than --threshold.
+
+Run from the project root:
+
+    python -m Agents.benchmarks.charts --save-baseline charts-baseline.json
+    python -m Agents.benchmarks.charts --baseline charts-baseline.json --threshold 0.25
+"""
+
+import argparse
+import io
+import json
+import multiprocessing
+import resource
+import statistics
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+ENGINES = ("pyplot", "engine")
+METRICS = ("cold_s", "warm_s", "peak_rss_mb", "output_bytes")
+TABLE_COLUMNS = ["Name", "Region", "Units", "Price", "Date"]
+
+
+def _bars(size: int) -> tuple[list, list]:
+    return [f"item {i}" for i in range(size)], [float((i * 37) % 101) for i in range(size)]
+
+
+def _rows(size: int) -> list[list]:
+    regions = ("north", "south", "east", "west")
+    return [
+        [f"item {i}", regions[i % 4], i % 97, i * 1.25, f"2024-01-{i % 28 + 1:02d}"]
+        for i in range(size)
+    ]
+
+
+def _pyplot_bar(size: int) -> int:
+    import matplotlib
+
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    labels, values = _bars(size)
+    plt.figure()
+    plt.bar(labels, values)
+    plt.title("Benchmark")
+    plt.xlabel("Item")
+    plt.ylabel("Value")
+    buffer = io.BytesIO()
+    plt.savefig(buffer, format="png")
+    plt.close()
+    return len(buffer.getvalue())
+
+
+def _pyplot_table(size: int) -> int:
+    import matplotlib
+
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    data = _rows(size)
+    fig, ax = plt.subplots(figsize=(8, len(data) * 0.5))
+    ax.axis("off")
+    table = ax.table(cellText=data, colLabels=TABLE_COLUMNS, loc="center")
+    table.auto_set_font_size(False)
+    table.set_fontsize(10)
+    table.scale(1.2, 1.2)
+    plt.title("Benchmark")
+    buffer = io.BytesIO()
+    plt.savefig(buffer, format="png", bbox_inches="tight")
+    plt.close(fig)
+    return len(buffer.getvalue())
+
+
+def _engine_bar(size: int) -> int:
+    from ..root_agent.sub_agents.data_visualisation_agent.render import render_bar_chart
+
+    labels, values = _bars(size)
+    return len(render_bar_chart(labels, values, "Benchmark", "Item", "Value"))
+
+
+def _engine_table(size: int) -> int:
+    from ..root_agent.sub_agents.data_visualisation_agent.config import (
+        TABLE_IMAGE_MAX_ROWS,
+        TABLE_PAGE_ROWS,
+    )
+    from ..root_agent.sub_agents.data_visualisation_agent.render import render_table_chart
+    from ..root_agent.sub_agents.data_visualisation_agent.table import (
+        format_cells,
+        page_ranges,
+        to_csv,
+        to_html,
+    )
+
+    cells = format_cells(_rows(size), TABLE_COLUMNS)
+    if len(cells) > TABLE_IMAGE_MAX_ROWS:
+        return len(to_csv(cells, TABLE_COLUMNS)) + len(to_html(cells, TABLE_COLUMNS, "Benchmark"))
+    pages = page_ranges(len(cells), TABLE_PAGE_ROWS)
+    page_rows = TABLE_PAGE_ROWS if len(pages) > 1 else max(len(cells), 1)
+    return sum(
+        len(render_table_chart(cells[start:end], TABLE_COLUMNS, "Benchmark", page_rows))
+        for start, end in pages
+    )
+
+
+RENDERERS = {
+    ("pyplot", "bar"): _pyplot_bar,
+    ("pyplot", "table"): _pyplot_table,
+    ("engine", "bar"): _engine_bar,
+    ("engine", "table"): _engine_table,
+}
+
+
+def _measure(engine: str, chart: str, size: int, repeats: int) -> dict:
+    """Runs in a fresh process: one cold render, then `repeats` warm ones."""
+    render = RENDERERS[engine, chart]
+    start = time.perf_counter()
+    output_bytes = render(size)
+    cold = time.perf_counter() - start
+    warm = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        render(size)
+        warm.append(time.perf_counter() - start)
+    return {
+        "engine": engine,
+        "chart": chart,
+        "size": size,
+        "cold_s": cold,
+        "warm_s": statistics.median(warm) if warm else cold,
+        # ru_maxrss is in KiB on Linux.
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "output_bytes": output_bytes,
+    }
+
+
+def _run_case(engine: str, chart: str, size: int, repeats: int, timeout_s: float) -> dict:
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+        return pool.submit(_measure, engine, chart, size, repeats).result(timeout=timeout_s)
+
+
+def regressions(
+    results: list[dict], baseline: list[dict], threshold: float, min_delta_s: float
+) -> list[str]:
+    """Descriptions of the metrics that grew by more than threshold over the baseline."""
+    previous = {(r["engine"], r["chart"], r["size"]): r for r in baseline}
+    found = []
+    for result in results:
+        before = previous.get((result["engine"], result["chart"], result["size"]))
+        if before is None:
+            continue
+        for metric in METRICS:
+            old, new = before[metric], result[metric]
+            # Timing changes smaller than min_delta_s are noise.
+            if metric.endswith("_s") and new - old < min_delta_s:
+                continue
+            if new > old * (1 + threshold):
+                found.append(
+                    f"{result['engine']} {result['chart']} {result['size']}: "
+                    f"{metric} {old:.4g} -> {new:.4g} (+{(new / old - 1) * 100:.0f}%)"
+                )
+    return found
+
+
+def _sizes(text: str) -> list[int]:
+    return [int(size) for size in text.split(",") if size]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--bars", type=_sizes, default=[10, 100, 1_000, 10_000, 100_000])
+    parser.add_argument("--rows", type=_sizes, default=[10, 100, 1_000, 10_000])
+    parser.add_argument("--engines", type=lambda s: s.split(","), default=list(ENGINES))
+    parser.add_argument("--repeats", type=int, default=3)
+    # pyplot above these sizes takes minutes, or fails on the image size.
+    parser.add_argument("--pyplot-max-bars", type=int, default=10_000)
+    parser.add_argument("--pyplot-max-rows", type=int, default=1_000)
+    parser.add_argument("--timeout-s", type=float, default=600)
+    parser.add_argument("--save-baseline", metavar="PATH")
+    parser.add_argument("--baseline", metavar="PATH")
+    parser.add_argument("--threshold", type=float, default=0.25)
+    parser.add_argument("--min-delta-ms", type=float, default=5)
+    args = parser.parse_args()
+
+    limits = {("pyplot", "bar"): args.pyplot_max_bars, ("pyplot", "table"): args.pyplot_max_rows}
+    cases = [
+        (engine, chart, size)
+        for chart, sizes in (("bar", args.bars), ("table", args.rows))
+        for size in sizes
+        for engine in args.engines
+        if size <= limits.get((engine, chart), size)
+    ]
+
+    print(
+        f"{'chart':5s} {'size':>7s} {'engine':7s} {'cold':>9s} {'warm':>9s} "
+        f"{'vs pyplot':>9s} {'peak RSS':>9s} {'output':>10s}"
+    )
+    results = []
+    for engine, chart, size in cases:
+        result = _run_case(engine, chart, size, args.repeats, args.timeout_s)
+        results.append(result)
+        pyplot = next(
+            (r for r in results if (r["engine"], r["chart"], r["size"]) == ("pyplot", chart, size)),
+            None,
+        )
+        speedup = f"{pyplot['warm_s'] / result['warm_s']:8.1f}x" if pyplot else f"{'-':>9s}"
+        print(
+            f"{chart:5s} {size:7d} {engine:7s} {result['cold_s'] * 1000:7.0f}ms "
+            f"{result['warm_s'] * 1000:7.1f}ms {speedup} {result['peak_rss_mb']:7.0f}MB "
+            f"{result['output_bytes'] / 1024:8.0f}KB",
+            flush=True,
+        )
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump({"results": results}, f, indent=2)
+        print(f"Saved baseline to {args.save_baseline}")
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+        found = regressions(results, baseline, args.threshold, args.min_delta_ms / 1000)
+        if found:
+            print(f"Regressions beyond {args.threshold:.0%}:")
+            for line in found:
+                print(f"  {line}")
+            sys.exit(1)
+        print(f"No regressions beyond {args.threshold:.0%} against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""Cold vs warm latency of the local code executor.
+
+Cold: every job starts a fresh worker process, imports NumPy and pandas and
+then runs the snippet. Warm: jobs go to a pool whose workers have already
+imported them.
+
+Run from the project root:
+
+    python -m Agents.benchmarks.code_executor --runs 20
+"""
+
+import argparse
+import statistics
+import time
+
+from ..root_agent.sub_agents.coding_agent.config import WALL_TIME_LIMIT_S
+from ..root_agent.sub_agents.coding_agent.executor import WarmWorkerPool, Worker
+
+SNIPPET = """
+df = pd.DataFrame({"year": np.arange(10), "value": np.arange(10) * 1000})
+print(df["value"].sum(), np.percentile(df["value"], 90))
+"""
+
+
+def _summary(samples: list[float]) -> str:
+    samples = sorted(samples)
+    p95 = samples[min(len(samples) - 1, int(round(0.95 * (len(samples) - 1))))]
+    return (
+        f"median {statistics.median(samples) * 1000:8.1f} ms   "
+        f"p95 {p95 * 1000:8.1f} ms"
+    )
+
+
+def bench_cold(runs: int) -> list[float]:
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        worker = Worker(cpu_time_limit_s=10, memory_limit_mb=1024)
+        try:
+            worker.run({"code": SNIPPET}, WALL_TIME_LIMIT_S)
+        finally:
+            worker.kill()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def bench_warm(runs: int, pool_size: int) -> list[float]:
+    pool = WarmWorkerPool(size=pool_size)
+    pool.start()
+    samples = []
+    try:
+        for _ in range(runs):
+            start = time.perf_counter()
+            pool.run({"code": SNIPPET})
+            samples.append(time.perf_counter() - start)
+    finally:
+        pool.shutdown()
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--pool-size", type=int, default=2)
+    args = parser.parse_args()
+
+    cold = bench_cold(args.runs)
+    warm = bench_warm(args.runs, args.pool_size)
+    print(f"cold ({args.runs} runs): {_summary(cold)}")
+    print(f"warm ({args.runs} runs): {_summary(warm)}")
+    print(f"speedup (median): {statistics.median(cold) / statistics.median(warm):.1f}x")
+
+
+if __name__ == "__main__":
+    main()
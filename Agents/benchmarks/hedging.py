@@ -0,0 +1,109 @@
+"""Tail latency with and without hedging, on the local fake model backend.
+
+The fake model answers in ~100 ms but takes 2 s on 5% of calls. The same
+workload runs against the bare model and through ResilientLlm, and the
+p50/p99 latencies and hedge win rate are printed. A second run makes the
+primary fail to show the circuit breaker failing over to the fallback tier.
+
+Run from the project root:
+
+    python -m Agents.benchmarks.hedging --calls 400
+"""
+
+import argparse
+import asyncio
+import time
+
+from google.adk.models import LlmRequest
+from google.genai import types
+
+from ..root_agent.models import FakeLlm, ResiliencePolicy, ResilientLlm
+from ..root_agent.models.resilient import STATS, circuit_breaker, hedge_win_rate
+
+
+def _request() -> LlmRequest:
+    return LlmRequest(
+        model="fake-pro",
+        contents=[types.Content(role="user", parts=[types.Part(text="ping")])],
+    )
+
+
+def _percentile(samples: list[float], q: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q / 100 * len(ordered)))]
+
+
+async def _run(llm, calls: int, concurrency: int) -> list[float]:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one():
+        async with semaphore:
+            start = time.perf_counter()
+            async for _ in llm.generate_content_async(_request()):
+                pass
+            latencies.append(time.perf_counter() - start)
+
+    await asyncio.gather(*(one() for _ in range(calls)), return_exceptions=True)
+    return latencies
+
+
+def _primary(seed: int, failure_rate: float = 0.0) -> FakeLlm:
+    return FakeLlm(
+        model="fake-pro",
+        latency_s=0.1,
+        tail_latency_s=2.0,
+        tail_probability=0.05,
+        failure_rate=failure_rate,
+        seed=seed,
+    )
+
+
+async def main_async(calls: int, concurrency: int):
+    bare = await _run(_primary(seed=1), calls, concurrency)
+
+    hedged_llm = ResilientLlm(
+        model="fake-pro",
+        agent_name="bench_hedged",
+        primary=_primary(seed=1),
+        policy=ResiliencePolicy(deadline_s=10, hedge_min_samples=20),
+    )
+    hedged = await _run(hedged_llm, calls, concurrency)
+
+    for name, samples in (("bare", bare), ("hedged", hedged)):
+        print(
+            f"{name:7s} p50 {_percentile(samples, 50) * 1000:7.1f} ms   "
+            f"p99 {_percentile(samples, 99) * 1000:7.1f} ms"
+        )
+    stats = STATS["bench_hedged"]
+    print(
+        f"hedges sent: {stats['hedges']}  hedge wins: {stats['hedge_wins']}  "
+        f"win rate: {hedge_win_rate('bench_hedged'):.0%}  "
+        f"extra load: {stats['hedges'] / calls:.1%}"
+    )
+
+    failing = ResilientLlm(
+        model="fake-flaky",
+        agent_name="bench_failover",
+        primary=FakeLlm(model="fake-flaky", latency_s=0.05, failure_rate=1.0),
+        fallback=FakeLlm(model="fake-flash", latency_s=0.02),
+        policy=ResiliencePolicy(deadline_s=1),
+    )
+    await _run(failing, 50, 1)
+    stats = STATS["bench_failover"]
+    print(
+        f"failing primary: {stats['errors']} errors, {stats['failovers']} failovers, "
+        f"breaker {circuit_breaker('fake-flaky').state}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(main_async(args.calls, args.concurrency))
+
+
+if __name__ == "__main__":
+    main()
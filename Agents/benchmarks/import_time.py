@@ -0,0 +1,81 @@
+"""Cold-start import time of the servers, checked against a budget.
+
+Imports a module in a fresh interpreter under `python -X importtime`,
+prints the slowest imports and exits with status 1 when the total exceeds
+the budget, or when a library that should load lazily (on the first tool
+call that needs it) was imported at startup. The import runs in a scratch
+directory so that the session database Agents.api opens is not created
+here.
+
+Run from the project root:
+
+    python -m Agents.benchmarks.import_time --budget-ms 8000
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Libraries only some tools need; importing them at startup is a regression.
+LAZY_MODULES = ("matplotlib", "pandas", "pyarrow")
+
+
+def import_times(module: str) -> list[tuple[int, int, str]]:
+    """(cumulative_us, self_us, name) per import, as reported by -X importtime."""
+    env = {**os.environ, "PYTHONPATH": PROJECT_ROOT, "PYTHONDONTWRITEBYTECODE": "1"}
+    with tempfile.TemporaryDirectory() as cwd:
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+            cwd=cwd,
+            env=env,
+            capture_output=True,
+            text=True,
+        )
+    if result.returncode != 0:
+        raise SystemExit(f"import {module} failed:\n{result.stderr[-2000:]}")
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append((int(cumulative_us), int(self_us), name.strip()))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--module", default="Agents.api")
+    parser.add_argument("--budget-ms", type=float, default=8000)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    rows = import_times(args.module)
+    total_ms = next(c for c, _, name in rows if name == args.module) / 1000
+    project = ("Agents.", args.module)
+    print(f"slowest imports of this project ({args.module}):")
+    for cumulative, _, name in sorted(rows, reverse=True):
+        if name.startswith(project):
+            print(f"  {cumulative / 1000:8.1f} ms  {name}")
+            args.top -= 1
+            if args.top == 0:
+                break
+
+    failures = []
+    eager = sorted({n for _, _, n in rows if n.split(".")[0] in LAZY_MODULES})
+    if eager:
+        failures.append(f"imported at startup: {', '.join(sorted({n.split('.')[0] for n in eager}))}")
+    if total_ms > args.budget_ms:
+        failures.append(f"{total_ms:.0f} ms exceeds the {args.budget_ms:.0f} ms budget")
+
+    print(f"total: {total_ms:.0f} ms (budget {args.budget_ms:.0f} ms)")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,17 @@
+"""Startup and shutdown work shared by the FastAPI and A2A servers."""
+
+from contextlib import asynccontextmanager
+
+from .loop_monitor import monitor_lifespan
+from .root_agent.sub_agents.data_visualisation_agent.render import chart_renderer
+
+
+@asynccontextmanager
+async def app_lifespan(app):
+    """Runs the loop monitor and warms the chart render workers."""
+    async with monitor_lifespan(app):
+        chart_renderer.start()
+        try:
+            yield
+        finally:
+            chart_renderer.shutdown()
@@ -0,0 +1,146 @@
+"""Non-blocking structured logging for the servers.
+
+`setup_logging` replaces `logging.basicConfig`: loggers put records on an
+in-memory queue (`QueueHandler`) and a `QueueListener` thread formats and
+writes them, so a request never waits on stderr. The caller's thread only
+renders the message and any traceback, so the record holds the values as
+they were when logged and no references to the arguments or frames; the
+JSON layout and the write happen on the listener thread.
+
+Each record is written as one JSON object with the invocation and session
+ids of the request that logged it (see `bind_log_context`). DEBUG records
+are sampled: one in LOG_DEBUG_SAMPLE_EVERY per call site is kept.
+
+Settings: LOG_LEVEL (default INFO), LOG_FORMAT ("json" or "text", default
+json) and LOG_DEBUG_SAMPLE_EVERY (default 100; 1 keeps every record).
+"""
+
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import time
+from contextvars import ContextVar
+from typing import Optional
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json")
+LOG_DEBUG_SAMPLE_EVERY = int(os.getenv("LOG_DEBUG_SAMPLE_EVERY", "100"))
+
+invocation_id_var: ContextVar[Optional[str]] = ContextVar("invocation_id", default=None)
+session_id_var: ContextVar[Optional[str]] = ContextVar("session_id", default=None)
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_EXCEPTION_FORMATTER = logging.Formatter()
+
+
+def bind_log_context(
+    session_id: Optional[str] = None, invocation_id: Optional[str] = None
+) -> None:
+    """Tags the current task's log records with these ids."""
+    if session_id is not None:
+        session_id_var.set(session_id)
+    if invocation_id is not None:
+        invocation_id_var.set(invocation_id)
+
+
+class ContextFilter(logging.Filter):
+    """Stamps records with the ids bound to the logging task."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.invocation_id = invocation_id_var.get()
+        record.session_id = session_id_var.get()
+        return True
+
+
+class DebugSampler(logging.Filter):
+    """Keeps one in `every` DEBUG records per call site."""
+
+    def __init__(self, every: int = LOG_DEBUG_SAMPLE_EVERY):
+        super().__init__()
+        self.every = max(1, every)
+        self._seen: dict[tuple[str, int], int] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.DEBUG or self.every == 1:
+            return True
+        site = (record.pathname, record.lineno)
+        seen = self._seen.get(site, 0)
+        self._seen[site] = seen + 1
+        return seen % self.every == 0
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created))
+            + f".{int(record.msecs):03d}Z",
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key in ("invocation_id", "session_id"):
+            value = getattr(record, key, None)
+            if value:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc_info"] = record.exc_text
+        if record.stack_info:
+            entry["stack_info"] = record.stack_info
+        return json.dumps(entry, default=str)
+
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """Enqueues records with their message and traceback rendered.
+
+    Unlike `QueueHandler.prepare`, the record is not formatted: the listener
+    thread's handler still applies its layout.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = _EXCEPTION_FORMATTER.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def setup_logging(level: str = LOG_LEVEL, fmt: str = LOG_FORMAT) -> None:
+    """Routes all logging through a queue to a background writer thread."""
+    global _listener
+    if _listener is not None:
+        return
+
+    records: queue.SimpleQueue = queue.SimpleQueue()
+    handler = DeferredQueueHandler(records)
+    handler.addFilter(DebugSampler())
+    handler.addFilter(ContextFilter())
+
+    stream = logging.StreamHandler()
+    if fmt == "json":
+        stream.setFormatter(JsonFormatter())
+    else:
+        stream.setFormatter(
+            logging.Formatter("%(levelname)s:%(name)s:%(session_id)s:%(message)s")
+        )
+
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(level)
+    # ADK names its loggers "google_adk." + the module name.
+    logging.getLogger("google_adk").setLevel(logging.INFO)
+    # ADK logs the full repr of every event appended to a session at INFO.
+    logging.getLogger("google_adk.google.adk.sessions").setLevel(logging.WARNING)
+
+    _listener = logging.handlers.QueueListener(records, stream, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
@@ -0,0 +1,174 @@
+"""Event-loop lag watchdog.
+
+A task on the loop wakes every LOOP_MONITOR_INTERVAL_S and records how late
+it woke (the scheduling delay every other coroutine suffers too) in the
+`agent_loop_lag_seconds` histogram. A watchdog thread checks the task's
+heartbeat. Once the loop has been stuck for LOOP_STALL_THRESHOLD_S, the
+thread captures the loop thread's stack.
+
+When the loop recovers, the stall is reported with its total duration and
+its culprit. The culprit is the ADK tool being executed if there is one,
+otherwise the innermost frame of this project's code, otherwise the
+innermost frame. Stalls are logged, counted per culprit in
+`agent_loop_stalls_total` and kept for the admin-only `/debug/loop` (see
+admin.py).
+"""
+
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Optional
+
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+
+from .admin import is_admin
+from .metrics import METRICS, Counter, Histogram
+
+logger = logging.getLogger(__name__)
+
+LOOP_MONITOR_INTERVAL_S = float(os.getenv("LOOP_MONITOR_INTERVAL_S", "0.05"))
+LOOP_STALL_THRESHOLD_S = float(os.getenv("LOOP_STALL_THRESHOLD_S", "0.1"))
+MAX_STALL_REPORTS = 100
+
+PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+# ADK's function that runs one tool; its `tool` local names the culprit.
+TOOL_CALL_FUNCTIONS = ("__call_tool_async", "_call_tool_async")
+
+LOOP_LAG = Histogram(
+    "agent_loop_lag_seconds",
+    "How late the event loop ran a timer scheduled for now.",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+)
+LOOP_STALLS = Counter(
+    "agent_loop_stalls_total", "Event loop stalls over the threshold, by culprit.", ("culprit",)
+)
+METRICS.extend([LOOP_LAG, LOOP_STALLS])
+
+
+def _culprit(frames: list) -> str:
+    """Names the tool or function a captured stack was blocked in."""
+    for frame in reversed(frames):
+        if frame.f_code.co_name in TOOL_CALL_FUNCTIONS:
+            tool = frame.f_locals.get("tool")
+            if tool is not None:
+                return f"tool:{tool.name}"
+    for frame in reversed(frames):
+        if frame.f_code.co_filename.startswith(PROJECT_DIR):
+            return f"{frame.f_globals.get('__name__')}.{frame.f_code.co_name}"
+    frame = frames[-1]
+    return f"{frame.f_globals.get('__name__')}.{frame.f_code.co_name}"
+
+
+class LoopMonitor:
+    def __init__(
+        self,
+        interval_s: float = LOOP_MONITOR_INTERVAL_S,
+        threshold_s: float = LOOP_STALL_THRESHOLD_S,
+    ):
+        self.interval_s = interval_s
+        self.threshold_s = threshold_s
+        self.stalls: deque[dict] = deque(maxlen=MAX_STALL_REPORTS)
+        self.max_lag_s = 0.0
+        self._heartbeat = time.monotonic()
+        self._pending: Optional[dict] = None
+        self._loop_thread_id: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stop = threading.Event()
+
+    def start(self) -> None:
+        if self._task is not None:
+            return
+        self._loop_thread_id = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._stop = threading.Event()
+        self._task = asyncio.get_running_loop().create_task(self._tick())
+        threading.Thread(
+            target=self._watch, args=(self._stop,), name="loop-watchdog", daemon=True
+        ).start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _tick(self) -> None:
+        while True:
+            expected = time.monotonic() + self.interval_s
+            await asyncio.sleep(self.interval_s)
+            now = time.monotonic()
+            self._heartbeat = now
+            lag = max(0.0, now - expected)
+            LOOP_LAG.observe(lag)
+            self.max_lag_s = max(self.max_lag_s, lag)
+            if self._pending is not None:
+                self._report(self._pending, lag)
+                self._pending = None
+
+    def _watch(self, stop: threading.Event) -> None:
+        while not stop.wait(self.threshold_s / 2):
+            stalled_for = time.monotonic() - self._heartbeat - self.interval_s
+            if stalled_for < self.threshold_s or self._pending is not None:
+                continue
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if frame is None:
+                continue
+            frames = []
+            while frame is not None:
+                frames.append(frame)
+                frame = frame.f_back
+            frames.reverse()
+            try:
+                culprit = _culprit(frames)
+            except Exception:  # The frames keep running while we look at them.
+                culprit = "unknown"
+            self._pending = {
+                "at": time.time(),
+                "culprit": culprit,
+                "stack": traceback.format_list(
+                    traceback.extract_stack(frames[-1])[-15:]
+                ),
+            }
+
+    def _report(self, stall: dict, lag_s: float) -> None:
+        stall["lag_s"] = lag_s
+        self.stalls.append(stall)
+        LOOP_STALLS.inc(stall["culprit"])
+        logger.warning(
+            "Event loop blocked for %.3fs by %s\n%s",
+            lag_s,
+            stall["culprit"],
+            "".join(stall["stack"]),
+        )
+
+
+loop_monitor = LoopMonitor()
+
+
+@asynccontextmanager
+async def monitor_lifespan(app):
+    """App lifespan that runs the loop monitor while the server is up."""
+    loop_monitor.start()
+    try:
+        yield
+    finally:
+        loop_monitor.stop()
+
+
+async def loop_endpoint(request: Request) -> JSONResponse:
+    if not is_admin(request):
+        return JSONResponse({"detail": "Forbidden"}, status_code=403)
+    return JSONResponse(
+        {
+            "threshold_s": loop_monitor.threshold_s,
+            "max_lag_s": loop_monitor.max_lag_s,
+            "stalls": list(loop_monitor.stalls)[::-1],
+        }
+    )
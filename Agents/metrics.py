@@ -0,0 +1,226 @@
+"""Prometheus-style metrics derived from the runner's event stream.
+
+`observe_stream` wraps the event stream of one invocation and records:
+
+- time to first event and total invocation time;
+- time per agent, attributed to the author of each event (the time since
+  the previous event, excluding the consumer's own work between events);
+- time per tool, from a function call event to its function response;
+- queue wait before the run starts, and the number of active streams.
+
+Metrics are plain Python objects updated without locks: one bisect and two
+list updates per histogram observation. They are updated from the event
+loop thread; an update racing with another thread can at worst lose one
+count. `metrics_endpoint` serves them in the Prometheus text format and can
+be added as a route to both the FastAPI and the A2A Starlette app.
+"""
+
+import time
+from bisect import bisect_left
+from collections.abc import AsyncGenerator, Callable, Iterator
+from contextlib import aclosing
+from typing import Optional
+
+from google.adk.events import Event
+from starlette.requests import Request
+from starlette.responses import PlainTextResponse
+
+from .log_config import bind_log_context
+from .root_agent.models.rate_limit import waiting_calls
+from .root_agent.tool_cache import tool_cache
+from .usage import BUDGET_EXCEEDED
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS_S = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0
+)
+
+
+def _labels(names: tuple[str, ...], values: tuple, extra: str = "") -> str:
+    pairs = [f'{n}="{str(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Histogram:
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = LATENCY_BUCKETS_S,
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = buckets
+        # Per label values: one count per bucket, one for +Inf, then the sum.
+        self._children: dict[tuple, list] = {}
+
+    def observe(self, value: float, *labels) -> None:
+        child = self._children.get(labels)
+        if child is None:
+            child = self._children.setdefault(labels, [0] * (len(self.buckets) + 1) + [0.0])
+        child[bisect_left(self.buckets, value)] += 1
+        child[-1] += value
+
+    def render(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} histogram"
+        for labels, child in list(self._children.items()):
+            cumulative = 0
+            for bound, count in zip((*self.buckets, "+Inf"), child):
+                cumulative += count
+                le = _labels(self.labelnames, labels, f'le="{bound}"')
+                yield f"{self.name}_bucket{le} {cumulative}"
+            suffix = _labels(self.labelnames, labels)
+            yield f"{self.name}_sum{suffix} {child[-1]}"
+            yield f"{self.name}_count{suffix} {cumulative}"
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        collect: Optional[Callable[[], dict[tuple, float]]] = None,
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.collect = collect
+        self._values: dict[tuple, float] = {}
+
+    def inc(self, *labels, amount: float = 1) -> None:
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self) -> dict[tuple, float]:
+        return self.collect() if self.collect else self._values
+
+    def render(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} {self.kind}"
+        for labels, value in list(self.samples().items()):
+            yield f"{self.name}{_labels(self.labelnames, labels)} {value}"
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, *labels, amount: float = 1) -> None:
+        self.inc(*labels, amount=-amount)
+
+
+TIME_TO_FIRST_EVENT = Histogram(
+    "agent_time_to_first_event_seconds",
+    "Time from the start of a run to its first event.",
+    ("app",),
+)
+INVOCATION_TIME = Histogram(
+    "agent_invocation_seconds", "Total time of an invocation.", ("app", "outcome")
+)
+AGENT_TIME = Histogram(
+    "agent_turn_seconds", "Time spent producing each event, by authoring agent.", ("agent",)
+)
+TOOL_TIME = Histogram(
+    "agent_tool_seconds", "Time from a tool call to its response.", ("tool",)
+)
+QUEUE_WAIT = Histogram(
+    "agent_queue_wait_seconds", "Time from receiving a request to starting its run.", ("app",)
+)
+INVOCATIONS = Counter("agent_invocations_total", "Invocations by outcome.", ("app", "outcome"))
+ACTIVE_STREAMS = Gauge("agent_active_streams", "Runs currently streaming events.", ("app",))
+RATE_LIMIT_WAITING = Gauge(
+    "model_rate_limit_waiting",
+    "Model calls waiting for the shared rate limiter.",
+    ("model",),
+    collect=lambda: {(model,): waiting for model, waiting in waiting_calls().items()},
+)
+TOOL_CACHE_LOOKUPS = Counter(
+    "agent_tool_cache_lookups_total",
+    "Memoized tool calls, by whether a cached result was used.",
+    ("tool", "result"),
+    collect=lambda: {
+        (tool, result): stats[counter]
+        for tool, stats in tool_cache.stats().items()
+        for result, counter in (("hit", "hits"), ("miss", "misses"))
+    },
+)
+TOOL_CACHE_ENTRIES = Gauge(
+    "agent_tool_cache_entries",
+    "Cached tool results.",
+    ("tool",),
+    collect=lambda: {(tool,): stats["entries"] for tool, stats in tool_cache.stats().items()},
+)
+
+METRICS = [
+    TIME_TO_FIRST_EVENT,
+    INVOCATION_TIME,
+    AGENT_TIME,
+    TOOL_TIME,
+    QUEUE_WAIT,
+    INVOCATIONS,
+    ACTIVE_STREAMS,
+    RATE_LIMIT_WAITING,
+    TOOL_CACHE_LOOKUPS,
+    TOOL_CACHE_ENTRIES,
+]
+
+
+def render() -> str:
+    """All metrics in the Prometheus text exposition format."""
+    return "\n".join(line for metric in METRICS for line in metric.render()) + "\n"
+
+
+async def metrics_endpoint(request: Request) -> PlainTextResponse:
+    return PlainTextResponse(render(), media_type=CONTENT_TYPE)
+
+
+async def observe_stream(
+    events: AsyncGenerator[Event, None], app: str, queued_at: Optional[float] = None
+) -> AsyncGenerator[Event, None]:
+    """Yields the events of one run while recording its metrics.
+
+    Args:
+        events: The run's event stream.
+        app: The serving app, used as a label ("api" or "a2a").
+        queued_at: `time.perf_counter()` when the request was received.
+    """
+    start = time.perf_counter()
+    if queued_at is not None:
+        QUEUE_WAIT.observe(start - queued_at, app)
+    ACTIVE_STREAMS.inc(app)
+    outcome = "ok"
+    tool_calls: dict[str, tuple[str, float]] = {}
+    last = None
+    try:
+        async with aclosing(events):
+            async for event in events:
+                now = time.perf_counter()
+                if last is None:
+                    TIME_TO_FIRST_EVENT.observe(now - start, app)
+                    bind_log_context(invocation_id=event.invocation_id)
+                AGENT_TIME.observe(now - (last or start), event.author)
+                for response in event.get_function_responses():
+                    name, called_at = tool_calls.pop(response.id, (None, now))
+                    if name:
+                        TOOL_TIME.observe(now - called_at, name)
+                if event.error_code:
+                    outcome = "budget_exceeded" if event.error_code == BUDGET_EXCEEDED else "error"
+                yield event
+                last = time.perf_counter()
+                # Tools run once the generator is resumed.
+                for call in event.get_function_calls():
+                    tool_calls[call.id] = (call.name, last)
+    except Exception:
+        outcome = "error"
+        raise
+    finally:
+        ACTIVE_STREAMS.dec(app)
+        INVOCATION_TIME.observe(time.perf_counter() - start, app, outcome)
+        INVOCATIONS.inc(app, outcome)
@@ -0,0 +1,224 @@
+"""Admin-only, on-demand profiling of a live server.
+
+`POST /debug/profile?engine=...&requests=N&seconds=T` starts a profile that
+ends after N more requests or T seconds, whichever comes first.
+`GET /debug/profile` returns the last result (add `stop=1` to end a
+running profile first). Engines:
+
+- "sampling" (default): a thread samples the event loop thread's stack
+  every PROFILE_SAMPLE_INTERVAL_S. It measures wall-clock time, including
+  time blocked in sync calls, and returns collapsed stacks for
+  flamegraph.pl or speedscope.
+- "cprofile": deterministic profile of the loop thread, returned as a
+  pstats file.
+- "yappi": wall-clock, coroutine-aware profile of all threads, returned as
+  a pstats file. Requires the optional `yappi` package.
+
+Both routes require `Authorization: Bearer $ADMIN_TOKEN` (see admin.py) and
+are disabled when ADMIN_TOKEN is unset. Nothing is hooked while no profile runs: the
+middleware only checks whether one is active once per request.
+"""
+
+import asyncio
+import cProfile
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from typing import Optional
+
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+
+from .admin import is_admin
+
+PROFILE_SAMPLE_INTERVAL_S = 0.005
+MAX_PROFILE_SECONDS = 600.0
+ENGINES = ("sampling", "cprofile", "yappi")
+
+
+def _frame_name(frame) -> str:
+    return f"{frame.f_globals.get('__name__', '?')}:{frame.f_code.co_name}"
+
+
+class SamplingProfile:
+    """Samples one thread's stack from a background thread."""
+
+    def __init__(self, thread_id: int, interval_s: float = PROFILE_SAMPLE_INTERVAL_S):
+        self.thread_id = thread_id
+        self.interval_s = interval_s
+        self.stacks: Counter[str] = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample, name="profiler", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _sample(self) -> None:
+        while not self._stop.wait(self.interval_s):
+            frame = sys._current_frames().get(self.thread_id)
+            names = []
+            while frame is not None:
+                names.append(_frame_name(frame))
+                frame = frame.f_back
+            if names:
+                self.stacks[";".join(reversed(names))] += 1
+
+    def result(self) -> tuple[bytes, str, str]:
+        text = "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+        return text.encode(), "text/plain", "profile.collapsed"
+
+
+class CProfileProfile:
+    """cProfile of the thread it is started in (the event loop thread)."""
+
+    def __init__(self):
+        self.profile = cProfile.Profile()
+
+    def start(self) -> None:
+        self.profile.enable()
+
+    def stop(self) -> None:
+        self.profile.disable()
+
+    def result(self) -> tuple[bytes, str, str]:
+        with tempfile.NamedTemporaryFile(suffix=".pstats") as f:
+            self.profile.dump_stats(f.name)
+            return f.read(), "application/octet-stream", "profile.pstats"
+
+
+class YappiProfile:
+    """yappi in wall-clock mode, which attributes time to coroutines."""
+
+    def __init__(self):
+        import yappi
+
+        self.yappi = yappi
+
+    def start(self) -> None:
+        self.yappi.clear_stats()
+        self.yappi.set_clock_type("wall")
+        self.yappi.start()
+
+    def stop(self) -> None:
+        self.yappi.stop()
+
+    def result(self) -> tuple[bytes, str, str]:
+        with tempfile.NamedTemporaryFile(suffix=".pstats") as f:
+            self.yappi.get_func_stats().save(f.name, type="pstat")
+            self.yappi.clear_stats()
+            return f.read(), "application/octet-stream", "profile.pstats"
+
+
+class Profiler:
+    """The profile currently running, if any, and the last result."""
+
+    def __init__(self):
+        self.active = None
+        self.engine: Optional[str] = None
+        self.requests_left = 0
+        self.started_at = 0.0
+        self.result: Optional[tuple[bytes, str, str]] = None
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+    def start(self, engine: str, requests: int, seconds: float) -> None:
+        """Starts profiling; must be called on the event loop thread."""
+        if engine == "sampling":
+            profile = SamplingProfile(threading.get_ident())
+        elif engine == "cprofile":
+            profile = CProfileProfile()
+        else:
+            profile = YappiProfile()
+        # Only a profile that started is active; a failed start leaves none.
+        profile.start()
+        self.active = profile
+        self.engine = engine
+        self.requests_left = requests
+        self.started_at = time.monotonic()
+        self._timer = asyncio.get_running_loop().call_later(seconds, self.stop)
+
+    def stop(self) -> None:
+        if self.active is None:
+            return
+        profile, self.active = self.active, None
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        profile.stop()
+        self.result = profile.result()
+
+    def request_done(self) -> None:
+        self.requests_left -= 1
+        if self.requests_left <= 0:
+            self.stop()
+
+
+profiler = Profiler()
+
+
+class ProfilingMiddleware:
+    """Counts finished requests towards a running profile."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        await self.app(scope, receive, send)
+        if (
+            profiler.active is not None
+            and scope["type"] == "http"
+            and not scope["path"].startswith("/debug/")
+        ):
+            profiler.request_done()
+
+
+async def profile_endpoint(request: Request) -> Response:
+    if not is_admin(request):
+        return JSONResponse({"detail": "Forbidden"}, status_code=403)
+
+    if request.method == "POST":
+        if profiler.active is not None:
+            return JSONResponse({"detail": "A profile is already running"}, status_code=409)
+        params = request.query_params
+        engine = params.get("engine", "sampling")
+        if engine not in ENGINES:
+            return JSONResponse({"detail": f"engine must be one of {ENGINES}"}, status_code=400)
+        try:
+            requests = int(params.get("requests", "10"))
+            seconds = min(float(params.get("seconds", "60")), MAX_PROFILE_SECONDS)
+        except ValueError:
+            return JSONResponse({"detail": "requests and seconds must be numbers"}, status_code=400)
+        try:
+            profiler.start(engine, requests, seconds)
+        except ImportError:
+            return JSONResponse({"detail": "yappi is not installed"}, status_code=400)
+        except ValueError as e:
+            # e.g. cProfile when another profiler is enabled.
+            return JSONResponse({"detail": f"Could not start profile: {e}"}, status_code=409)
+        return JSONResponse({"engine": engine, "requests": requests, "seconds": seconds})
+
+    if request.query_params.get("stop"):
+        profiler.stop()
+    if profiler.active is not None:
+        return JSONResponse(
+            {
+                "detail": "Profile still running",
+                "engine": profiler.engine,
+                "requests_left": profiler.requests_left,
+                "elapsed_s": time.monotonic() - profiler.started_at,
+            },
+            status_code=409,
+        )
+    if profiler.result is None:
+        return JSONResponse({"detail": "No profile recorded"}, status_code=404)
+    content, media_type, filename = profiler.result
+    return Response(
+        content,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
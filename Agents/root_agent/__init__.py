@@ -1 +1,8 @@
-from .agent import root_agent
\ No newline at end of file
+def __getattr__(name):
+    # Built on first access, so importing a submodule (e.g. in a chart render
+    # worker) does not construct the whole agent tree.
+    if name == "root_agent":
+        from .agent import root_agent
+
+        return root_agent
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
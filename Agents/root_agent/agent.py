@@ -1,15 +1,33 @@
 from google.adk.agents import Agent
 from .prompt import ROOT_AGENT_PROMPT
+from .models import build_model, route_model
 from .sub_agents.transform_agent.agent import transform_2_agent, express_output_key_agent
 from .sub_agents.data_visualisation_agent.agent import data_visualisation_agent
 from .sub_agents.vertex_agent.agent import vertex_agent
 from .sub_agents.calculator_agent.agent import calculator_agent
+from .sub_agents.dataset_agent.agent import dataset_agent
 from google.adk.tools import agent_tool
+from .hooks import install_callbacks
+from .prompt_cache import prefix_cache
+from .tool_cache import tool_cache
+from .sub_agents.transform_agent.variables import attach_variables
 
 root_agent = Agent(
     name="root_agent",
-    model="gemini-2.0-flash",
+    model=build_model("root_agent", "gemini-2.0-flash"),
     description="A root agent that delegates tasks to sub-agents. You can use transform_agent if you need to perform calculations.",
-    sub_agents=[transform_2_agent, express_output_key_agent, data_visualisation_agent, vertex_agent],
+    sub_agents=[transform_2_agent, express_output_key_agent, data_visualisation_agent, vertex_agent, dataset_agent],
     instruction=ROOT_AGENT_PROMPT
-)
\ No newline at end of file
+)
+
+# Read list_of_variables through a view of its stored columns.
+install_callbacks(root_agent, first=True, before_agent_callback=attach_variables)
+
+# Drop memoized tool results that a tool call has made stale.
+install_callbacks(root_agent, first=True, after_tool_callback=tool_cache.after_tool)
+
+# Pick each call's model tier, then reuse the static prompt prefix of every
+# agent across invocations.
+install_callbacks(root_agent, before_model_callback=route_model)
+install_callbacks(root_agent, before_model_callback=prefix_cache.before_model)
+install_callbacks(root_agent, first=True, after_model_callback=prefix_cache.after_model)
\ No newline at end of file
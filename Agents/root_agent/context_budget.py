@@ -0,0 +1,247 @@
+"""Context budgeting for sub-agent model calls.
+
+Without a budget every call resends the whole session history, so token
+counts and latency grow with the session. A ContextBudgeter is used as a
+before_model_callback and rewrites the request in place:
+
+- The last `keep_turns` turns are kept verbatim. A turn starts at each real
+  user message.
+- Older turns are replaced by one rolling summary message. The summary is
+  extractive and built locally, and is extended incrementally as more turns
+  age out, so it costs no extra model call.
+- Large tool outputs (RAG contexts, query results) that the model has already
+  answered from are replaced by a short stub.
+
+Each call logs the estimated tokens saved, and per-agent running totals are
+kept in `STATS`.
+"""
+
+import json
+import logging
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Optional
+
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models import LlmRequest, LlmResponse
+from google.genai import types
+
+logger = logging.getLogger(__name__)
+
+# Rough characters-per-token ratio for Gemini on English text and JSON.
+CHARS_PER_TOKEN = 4
+FOREIGN_EVENT_PREFIX = "For context:"
+SUMMARY_PREFIX = "Summary of the earlier conversation:"
+TOOL_RESULT_MARKER = "tool returned result:"
+
+# Per-agent totals: {"agent_name": {"calls", "tokens_saved", "last_tokens_saved"}}.
+STATS: dict[str, dict[str, int]] = {}
+
+
+def estimate_tokens(contents: list[types.Content]) -> int:
+    """Estimates the prompt tokens of a list of contents from its size."""
+    chars = 0
+    for content in contents:
+        for part in content.parts or []:
+            if part.text:
+                chars += len(part.text)
+            elif part.function_call:
+                chars += len(json.dumps(part.function_call.args or {}, default=str))
+            elif part.function_response:
+                chars += len(json.dumps(part.function_response.response or {}, default=str))
+    return chars // CHARS_PER_TOKEN
+
+
+def _is_turn_start(content: types.Content) -> bool:
+    if content.role != "user" or not content.parts:
+        return False
+    first = content.parts[0]
+    return bool(
+        first.text
+        and not first.text.startswith((FOREIGN_EVENT_PREFIX, SUMMARY_PREFIX))
+    )
+
+
+def split_turns(contents: list[types.Content]) -> list[list[types.Content]]:
+    """Groups contents into turns, each starting at a real user message."""
+    turns: list[list[types.Content]] = []
+    for content in contents:
+        if not turns or _is_turn_start(content):
+            turns.append([])
+        turns[-1].append(content)
+    return turns
+
+
+def _clip(text: str, limit: int) -> str:
+    text = " ".join(text.split())
+    return text if len(text) <= limit else text[: limit - 3] + "..."
+
+
+def summarize_turn(turn: list[types.Content], line_chars: int = 200) -> str:
+    """One or two lines describing a turn: the request and the final answer."""
+    request = ""
+    answer = ""
+    tools = []
+    for content in turn:
+        for part in content.parts or []:
+            if part.function_call:
+                tools.append(part.function_call.name)
+            elif part.text and not part.thought:
+                if content is turn[0] and not request:
+                    request = part.text
+                elif content.role == "model":
+                    answer = part.text
+    lines = [f"- User: {_clip(request, line_chars)}"]
+    if tools:
+        lines.append(f"  Tools used: {', '.join(dict.fromkeys(tools))}")
+    if answer:
+        lines.append(f"  Answer: {_clip(answer, line_chars)}")
+    return "\n".join(lines)
+
+
+def _stub_response(response: dict, size: int) -> dict:
+    """Keeps the small status fields of a tool response and drops the rest."""
+    stub = {
+        key: value
+        for key, value in response.items()
+        if key in ("status", "message") and isinstance(value, str)
+    }
+    stub["omitted"] = f"{size} characters of tool output omitted after use."
+    return stub
+
+
+@dataclass
+class ContextBudget:
+    """Per-agent budget settings. keep_turns must be at least 1."""
+
+    keep_turns: int = 4
+    max_tool_output_chars: int = 2000
+    summary_max_chars: int = 4000
+
+
+@dataclass
+class _SummaryCache:
+    turns: int = 0
+    text: str = ""
+
+
+@dataclass
+class ContextBudgeter:
+    """before_model_callback that trims a request to its context budget."""
+
+    budget: ContextBudget = field(default_factory=ContextBudget)
+    max_sessions: int = 1024
+    _summaries: OrderedDict = field(default_factory=OrderedDict, init=False, repr=False)
+
+    def __call__(
+        self, callback_context: CallbackContext, llm_request: LlmRequest
+    ) -> Optional[LlmResponse]:
+        before = estimate_tokens(llm_request.contents)
+        session_id = callback_context._invocation_context.session.id
+        llm_request.contents = self.apply(
+            (session_id, callback_context.agent_name), llm_request.contents
+        )
+        saved = before - estimate_tokens(llm_request.contents)
+
+        agent_stats = STATS.setdefault(
+            callback_context.agent_name, {"calls": 0, "tokens_saved": 0}
+        )
+        agent_stats["calls"] += 1
+        agent_stats["tokens_saved"] += saved
+        agent_stats["last_tokens_saved"] = saved
+        if saved:
+            logger.info(
+                "Context budget for %s saved ~%d of ~%d tokens",
+                callback_context.agent_name,
+                saved,
+                before,
+            )
+        return None
+
+    def apply(self, key: tuple, contents: list[types.Content]) -> list[types.Content]:
+        """Returns the budgeted contents; `key` identifies the rolling summary."""
+        turns = split_turns(contents)
+        keep = max(1, self.budget.keep_turns)
+        old, recent = turns[:-keep], turns[-keep:]
+
+        result = []
+        if old:
+            result.append(
+                types.Content(
+                    role="user",
+                    parts=[types.Part(text=f"{SUMMARY_PREFIX}\n{self._summary(key, old)}")],
+                )
+            )
+        for i, turn in enumerate(recent):
+            current = i == len(recent) - 1
+            result.extend(self._stub_consumed_outputs(turn, current))
+        return result
+
+    def _summary(self, key: tuple, old_turns: list[list[types.Content]]) -> str:
+        cache = self._summaries.pop(key, None) or _SummaryCache()
+        if cache.turns > len(old_turns):
+            # History got shorter (e.g. a rewind); start over.
+            cache = _SummaryCache()
+        new_lines = [summarize_turn(turn) for turn in old_turns[cache.turns :]]
+        text = "\n".join(filter(None, [cache.text, *new_lines]))
+        # Keep the most recent part of the summary when it outgrows its budget.
+        if len(text) > self.budget.summary_max_chars:
+            text = text[-self.budget.summary_max_chars :]
+            text = text[text.find("\n- ") + 1 :] if "\n- " in text else text
+        cache.turns, cache.text = len(old_turns), text
+
+        self._summaries[key] = cache
+        while len(self._summaries) > self.max_sessions:
+            self._summaries.popitem(last=False)
+        return text
+
+    def _stub_consumed_outputs(
+        self, turn: list[types.Content], current: bool
+    ) -> list[types.Content]:
+        """Stubs large tool outputs that a later model message already used.
+
+        In the current turn only outputs followed by a model message count as
+        consumed; in earlier turns all of them do.
+        """
+        limit = self.budget.max_tool_output_chars
+        last_model = max(
+            (i for i, c in enumerate(turn) if c.role == "model"), default=-1
+        )
+        result = []
+        for i, content in enumerate(turn):
+            if current and i > last_model:
+                result.append(content)
+                continue
+            parts = []
+            changed = False
+            for part in content.parts or []:
+                if part.function_response and part.function_response.response:
+                    size = len(json.dumps(part.function_response.response, default=str))
+                    if size > limit:
+                        part = types.Part(
+                            function_response=types.FunctionResponse(
+                                id=part.function_response.id,
+                                name=part.function_response.name,
+                                response=_stub_response(
+                                    part.function_response.response, size
+                                ),
+                            )
+                        )
+                        changed = True
+                elif (
+                    part.text
+                    and len(part.text) > limit
+                    and content.role == "user"
+                    and content.parts[0].text == FOREIGN_EVENT_PREFIX
+                    and TOOL_RESULT_MARKER in part.text
+                ):
+                    part = types.Part(
+                        text=part.text[:limit]
+                        + f"... [{len(part.text) - limit} characters omitted after use]"
+                    )
+                    changed = True
+                parts.append(part)
+            result.append(
+                types.Content(role=content.role, parts=parts) if changed else content
+            )
+        return result
@@ -0,0 +1,80 @@
+"""Helpers to install callbacks on every agent of the tree.
+
+Cross-cutting behaviour (prompt caching, tracing, accounting) has to reach
+every LlmAgent, including those only reachable through an AgentTool, which
+ADK runs with a separate inner Runner.
+"""
+
+from collections.abc import Iterator
+from typing import Callable
+
+from google.adk.agents import BaseAgent, LlmAgent
+from google.adk.tools.agent_tool import AgentTool
+
+CALLBACK_FIELDS = (
+    "before_agent_callback",
+    "after_agent_callback",
+    "before_model_callback",
+    "after_model_callback",
+    "before_tool_callback",
+    "after_tool_callback",
+)
+
+
+def walk_agents(root: BaseAgent) -> Iterator[BaseAgent]:
+    """Yields every agent reachable from root, each once."""
+    seen = set()
+    stack = [root]
+    while stack:
+        agent = stack.pop()
+        if id(agent) in seen:
+            continue
+        seen.add(id(agent))
+        yield agent
+        stack.extend(reversed(agent.sub_agents))
+        if isinstance(agent, LlmAgent):
+            stack.extend(
+                tool.agent for tool in agent.tools if isinstance(tool, AgentTool)
+            )
+
+
+def add_callback(agent: BaseAgent, field: str, callback: Callable, first: bool = False) -> None:
+    """Adds a callback to one of the agent's callback lists.
+
+    ADK stops at the first callback that returns a value, so observers that
+    always return None should go first and callbacks that may replace the
+    request or response last.
+    """
+    current = getattr(agent, field, None)
+    if current is None:
+        callbacks = []
+    elif isinstance(current, list):
+        callbacks = list(current)
+    else:
+        callbacks = [current]
+    if callback in callbacks:
+        return
+    if first:
+        callbacks.insert(0, callback)
+    else:
+        callbacks.append(callback)
+    setattr(agent, field, callbacks)
+
+
+def install_callbacks(root: BaseAgent, first: bool = False, **callbacks: Callable) -> None:
+    """Adds the given callbacks to every agent in the tree.
+
+    Args:
+        root: The root of the agent tree.
+        first: Whether to run the callbacks before the existing ones.
+        **callbacks: Callback field name to callback, e.g.
+            before_model_callback=...; model and tool callbacks are only
+            added to LlmAgents.
+    """
+    for field in callbacks:
+        if field not in CALLBACK_FIELDS:
+            raise ValueError(f"Unknown callback field: {field}")
+    for agent in walk_agents(root):
+        for field, callback in callbacks.items():
+            if hasattr(agent, field):
+                add_callback(agent, field, callback, first=first)
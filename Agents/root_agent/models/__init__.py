@@ -0,0 +1,78 @@
+"""Model-call layer shared by all agents.
+
+Agents get their model from `build_model`, which wraps the provider model
+with per-agent deadlines, hedging and fail-over (see resilient.py). Every
+provider model goes through the shared per-model rate limiter
+(see rate_limit.py), including hedges and fallback calls. Agents whose
+model has cheaper tiers get a TieredLlm that routes each call (see
+routing.py).
+"""
+
+from google.adk.models import BaseLlm, LLMRegistry
+
+from .config import (
+    AGENT_DEADLINES_S,
+    DEFAULT_DEADLINE_S,
+    FALLBACK_MODELS,
+    MODEL_BACKEND,
+    MODEL_ROUTING,
+    TIER_LADDERS,
+)
+from .fake import FakeLlm
+from .rate_limit import RateLimitedLlm, rate_limiter
+from .resilient import ResiliencePolicy, ResilientLlm
+from .routing import TieredLlm, route_model, tier_policy
+
+
+def new_llm(model: str) -> BaseLlm:
+    """Creates the rate-limited backend model for a model name."""
+    if MODEL_BACKEND == "fake":
+        inner = FakeLlm(model=model)
+    else:
+        inner = LLMRegistry.new_llm(model)
+    return RateLimitedLlm(model=model, inner=inner)
+
+
+def _resilient(agent_name: str, model: str) -> ResilientLlm:
+    fallback = FALLBACK_MODELS.get(model)
+    return ResilientLlm(
+        model=model,
+        agent_name=agent_name,
+        primary=new_llm(model),
+        fallback=new_llm(fallback) if fallback else None,
+        policy=ResiliencePolicy(
+            deadline_s=AGENT_DEADLINES_S.get(agent_name, DEFAULT_DEADLINE_S)
+        ),
+    )
+
+
+def build_model(agent_name: str, model: str) -> BaseLlm:
+    """Returns the model an agent should use.
+
+    Args:
+        agent_name: The agent's name, used for per-agent policy and metrics.
+        model: The model name, e.g. "gemini-2.5-pro". With routing on, this is
+            the top tier the agent escalates to.
+    """
+    cheaper = TIER_LADDERS.get(model, []) if MODEL_ROUTING == "on" else []
+    if not cheaper:
+        return _resilient(agent_name, model)
+    return TieredLlm(
+        model=model,
+        agent_name=agent_name,
+        tiers=[_resilient(agent_name, m) for m in [*cheaper, model]],
+        policy=tier_policy(agent_name),
+    )
+
+
+__all__ = [
+    "FakeLlm",
+    "RateLimitedLlm",
+    "ResilientLlm",
+    "ResiliencePolicy",
+    "TieredLlm",
+    "build_model",
+    "new_llm",
+    "rate_limiter",
+    "route_model",
+]
@@ -0,0 +1,69 @@
+"""Configuration for the model-call layer shared by all agents."""
+
+import os
+
+# "gemini" calls the real models; "fake" uses FakeLlm so the whole agent tree
+# runs offline with synthetic latency (see fake.py).
+MODEL_BACKEND = os.getenv("MODEL_BACKEND", "gemini")
+
+# Faster tier each model fails over to when its circuit breaker is open or a
+# call misses its deadline.
+FALLBACK_MODELS = {
+    "gemini-2.5-pro": "gemini-2.5-flash",
+    "gemini-2.0-flash": "gemini-2.0-flash-lite",
+}
+
+# Per-agent deadline for one model call, in seconds.
+DEFAULT_DEADLINE_S = 90.0
+AGENT_DEADLINES_S = {
+    "root_agent": 30.0,
+    "calculator_agent": 30.0,
+    "express_output_key_agent": 60.0,
+}
+FALLBACK_DEADLINE_S = 45.0
+
+# Hedging: once HEDGE_MIN_SAMPLES latencies are known for an agent, a
+# duplicate request is sent when the first one is slower than this
+# percentile of them; the first answer wins.
+HEDGE_PERCENTILE = 95.0
+HEDGE_MIN_SAMPLES = 20
+LATENCY_WINDOW = 200
+
+# Circuit breaker: open after this many failures within the window, then
+# send everything to the fallback tier until the cooldown has passed.
+BREAKER_FAILURE_THRESHOLD = 5
+BREAKER_WINDOW_S = 60.0
+BREAKER_COOLDOWN_S = 30.0
+
+# Per-model quotas shared by every agent in the process: requests and tokens
+# per minute. Keep these at or below the project's quota for each model.
+MODEL_QUOTAS = {
+    "gemini-2.5-pro": {"rpm": 150, "tpm": 2_000_000},
+    "gemini-2.5-flash": {"rpm": 1000, "tpm": 1_000_000},
+    "gemini-2.0-flash": {"rpm": 2000, "tpm": 4_000_000},
+    "gemini-2.0-flash-lite": {"rpm": 4000, "tpm": 4_000_000},
+}
+DEFAULT_QUOTA = {"rpm": 60, "tpm": 1_000_000}
+# Output tokens assumed for a call that does not set max_output_tokens.
+OUTPUT_TOKEN_ESTIMATE = 1024
+# Retries of a call rejected with 429, queued through the limiter.
+RATE_LIMIT_RETRIES = 2
+
+# Tier routing: "on" (default) lets agents answer on a cheaper tier of their
+# configured model and escalate when the answer fails validation.
+MODEL_ROUTING = os.getenv("MODEL_ROUTING", "on")
+# Cheaper models tried below an agent's configured model, cheapest first.
+TIER_LADDERS = {
+    "gemini-2.5-pro": ["gemini-2.5-flash"],
+}
+# Per-agent overrides of TierPolicy fields (see routing.py).
+AGENT_TIER_POLICIES = {
+    "CodeAgent": {"max_cheap_input_tokens": 3000},
+}
+# USD per million input and output tokens, for cost accounting.
+MODEL_PRICES_PER_M_TOKENS = {
+    "gemini-2.5-pro": (1.25, 10.0),
+    "gemini-2.5-flash": (0.30, 2.50),
+    "gemini-2.0-flash": (0.10, 0.40),
+    "gemini-2.0-flash-lite": (0.075, 0.30),
+}
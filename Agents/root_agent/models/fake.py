@@ -0,0 +1,75 @@
+"""Offline stand-in for Gemini.
+
+FakeLlm answers every request locally after a synthetic delay, with an
+optional slow tail and failure rate, so latency controls (deadlines, hedging,
+fail-over, rate limiting) can be exercised without network access or quota.
+Select it for the whole agent tree with MODEL_BACKEND=fake.
+"""
+
+import asyncio
+import random
+from typing import AsyncGenerator, Optional
+
+from google.adk.models import BaseLlm, LlmRequest, LlmResponse
+from google.genai import types
+from pydantic import PrivateAttr
+
+from ..context_budget import estimate_tokens
+
+
+class FakeLlmError(Exception):
+    """Synthetic provider error raised at `failure_rate`."""
+    pass
+
+
+class FakeLlm(BaseLlm):
+    """A model that echoes the last user message after a synthetic delay."""
+
+    latency_s: float = 0.05
+    """Typical latency; each call takes between 0.5x and 1.5x of it."""
+    tail_latency_s: float = 2.0
+    tail_probability: float = 0.0
+    """Probability that a call takes tail_latency_s instead."""
+    failure_rate: float = 0.0
+    seed: Optional[int] = None
+    calls: int = 0
+
+    _rng: random.Random = PrivateAttr(default=None)
+
+    def model_post_init(self, __context) -> None:
+        self._rng = random.Random(self.seed)
+
+    @classmethod
+    def supported_models(cls) -> list[str]:
+        return [r"fake-.*"]
+
+    def delay(self) -> float:
+        if self._rng.random() < self.tail_probability:
+            return self.tail_latency_s
+        return self.latency_s * (0.5 + self._rng.random())
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        self.calls += 1
+        await asyncio.sleep(self.delay())
+        if self._rng.random() < self.failure_rate:
+            raise FakeLlmError(f"{self.model}: 503 Service Unavailable (fake)")
+
+        last_text = ""
+        for content in reversed(llm_request.contents):
+            texts = [p.text for p in content.parts or [] if p.text]
+            if content.role == "user" and texts:
+                last_text = " ".join(texts)
+                break
+        text = f"[{self.model}] {last_text[:200]}"
+        prompt_tokens = estimate_tokens(llm_request.contents)
+        candidate_tokens = len(text) // 4
+        yield LlmResponse(
+            content=types.Content(role="model", parts=[types.Part(text=text)]),
+            usage_metadata=types.GenerateContentResponseUsageMetadata(
+                prompt_token_count=prompt_tokens,
+                candidates_token_count=candidate_tokens,
+                total_token_count=prompt_tokens + candidate_tokens,
+            ),
+        )
@@ -0,0 +1,218 @@
+"""Process-wide, quota-aware rate limiting per model.
+
+All agents using the same model draw from one pair of token buckets for
+requests per minute and tokens per minute. The cost of a call is estimated
+from its request before it is sent and corrected with the reported usage
+afterwards. Waiters are served first-come first-served, so a large request
+cannot be starved by a stream of small ones.
+
+On a 429 the limiter halves its rate and pauses for the retry delay, then
+recovers additively on successes (AIMD). The rejected call is retried
+through the queue instead of on its own timer, so agents that tripped the
+quota together do not retry together.
+"""
+
+import asyncio
+import logging
+import re
+import time
+from collections.abc import AsyncGenerator
+from typing import Optional
+
+from google.adk.models import BaseLlm, LlmRequest, LlmResponse
+from opentelemetry import trace
+
+from ..context_budget import CHARS_PER_TOKEN, estimate_tokens
+from .config import DEFAULT_QUOTA, MODEL_QUOTAS, OUTPUT_TOKEN_ESTIMATE, RATE_LIMIT_RETRIES
+
+logger = logging.getLogger(__name__)
+
+MIN_SCALE = 0.1
+RECOVERY_STEP = 0.05
+DEFAULT_RETRY_AFTER_S = 5.0
+
+tracer = trace.get_tracer(__name__)
+
+_STATUS_429 = re.compile(r"^\W*(?:Error code: )?429\b")
+
+
+def estimate_request_tokens(llm_request: LlmRequest) -> int:
+    """Input plus expected output tokens of a request."""
+    config = llm_request.config
+    tokens = estimate_tokens(llm_request.contents)
+    if isinstance(config.system_instruction, str):
+        tokens += len(config.system_instruction) // CHARS_PER_TOKEN
+    return tokens + (config.max_output_tokens or OUTPUT_TOKEN_ESTIMATE)
+
+
+def is_rate_limit_error(error: BaseException) -> bool:
+    """Whether error is an HTTP 429 or a RESOURCE_EXHAUSTED status.
+
+    A bare "429" elsewhere in a message (an id, a token count) does not count.
+    """
+    if any(getattr(error, name, None) == 429 for name in ("code", "status_code")):
+        return True
+    if getattr(error, "status", None) == "RESOURCE_EXHAUSTED":
+        return True
+    # Errors that only carry a message, e.g. "429 Too Many Requests".
+    text = str(error)
+    return _STATUS_429.match(text) is not None or "RESOURCE_EXHAUSTED" in text
+
+
+def retry_after_s(error: BaseException) -> float:
+    """The retry delay the provider asked for, if it said."""
+    match = re.search(r"retry(?:Delay| in|_after)['\":\s]*([\d.]+)\s*s", str(error), re.I)
+    return float(match.group(1)) if match else DEFAULT_RETRY_AFTER_S
+
+
+class ModelRateLimiter:
+    """Token buckets for one model's requests and tokens per minute."""
+
+    def __init__(self, rpm: int, tpm: int):
+        self.rpm = rpm
+        self.tpm = tpm
+        self.scale = 1.0
+        self._requests = float(rpm)
+        self._tokens = float(tpm)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock: Optional[asyncio.Lock] = None
+        self._lock_loop = None
+        self.waiting = 0
+        self.stats = {"calls": 0, "waited": 0, "wait_s": 0.0, "rate_limited": 0}
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        elapsed, self._updated = now - self._updated, now
+        if now < self._paused_until:
+            return
+        self._requests = min(
+            self.rpm * self.scale, self._requests + elapsed * self.rpm * self.scale / 60
+        )
+        self._tokens = min(
+            self.tpm * self.scale, self._tokens + elapsed * self.tpm * self.scale / 60
+        )
+
+    def _wait_s(self, cost: int) -> float:
+        now = time.monotonic()
+        if now < self._paused_until:
+            return self._paused_until - now
+        wait_requests = (1 - self._requests) * 60 / (self.rpm * self.scale)
+        wait_tokens = (cost - self._tokens) * 60 / (self.tpm * self.scale)
+        return max(wait_requests, wait_tokens, 0.0)
+
+    def _fifo_lock(self) -> asyncio.Lock:
+        # asyncio.Lock wakes waiters in arrival order, which gives FIFO queueing.
+        loop = asyncio.get_running_loop()
+        if self._lock is None or self._lock_loop is not loop:
+            self._lock, self._lock_loop = asyncio.Lock(), loop
+        return self._lock
+
+    def clamp(self, cost: int) -> int:
+        """cost capped so that a call fits the bucket even at MIN_SCALE."""
+        return min(cost, int(self.tpm * MIN_SCALE))
+
+    async def acquire(self, cost: int) -> None:
+        """Waits until one request and `cost` tokens are available."""
+        cost = self.clamp(cost)
+        start = time.monotonic()
+        self.waiting += 1
+        try:
+            async with self._fifo_lock():
+                while True:
+                    self._refill()
+                    wait = self._wait_s(cost)
+                    if wait <= 0:
+                        break
+                    await asyncio.sleep(wait)
+                self._requests -= 1
+                self._tokens -= cost
+        finally:
+            self.waiting -= 1
+        waited = time.monotonic() - start
+        self.stats["calls"] += 1
+        if waited > 0.001:
+            self.stats["waited"] += 1
+            self.stats["wait_s"] += waited
+
+    def on_success(self, estimated: int, actual: Optional[int]) -> None:
+        """Corrects the token bucket with the real usage and recovers the rate.
+
+        estimated is the cost passed to `acquire`, which took it clamped.
+        """
+        if actual is not None:
+            self._tokens += self.clamp(estimated) - actual
+        self.scale = min(1.0, self.scale + RECOVERY_STEP)
+
+    def on_rate_limited(self, retry_after: float) -> None:
+        """Backs off after a 429: halve the rate and pause for retry_after."""
+        self.stats["rate_limited"] += 1
+        self.scale = max(MIN_SCALE, self.scale / 2)
+        self._paused_until = max(self._paused_until, time.monotonic() + retry_after)
+        self._requests = min(self._requests, 0.0)
+        logger.warning(
+            "Rate limited; pausing %.1fs and scaling to %.0f%% of quota",
+            retry_after,
+            self.scale * 100,
+        )
+
+
+_LIMITERS: dict[str, ModelRateLimiter] = {}
+
+
+def rate_limiter(model: str) -> ModelRateLimiter:
+    """The process-wide limiter for a model name."""
+    if model not in _LIMITERS:
+        quota = MODEL_QUOTAS.get(model, DEFAULT_QUOTA)
+        _LIMITERS[model] = ModelRateLimiter(quota["rpm"], quota["tpm"])
+    return _LIMITERS[model]
+
+
+def waiting_calls() -> dict[str, int]:
+    """Number of calls waiting for each model's limiter."""
+    return {model: limiter.waiting for model, limiter in _LIMITERS.items()}
+
+
+class RateLimitedLlm(BaseLlm):
+    """Sends calls to the inner model through its model's shared limiter."""
+
+    inner: BaseLlm
+    max_retries: int = RATE_LIMIT_RETRIES
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        limiter = rate_limiter(self.inner.model)
+        cost = estimate_request_tokens(llm_request)
+        for attempt in range(self.max_retries + 1):
+            # Not the current span: it stays open across yields to the caller.
+            span = tracer.start_span(
+                f"model_call {self.inner.model}",
+                attributes={"gen_ai.request.model": self.inner.model, "attempt": attempt},
+            )
+            try:
+                waited = time.monotonic()
+                await limiter.acquire(cost)
+                span.set_attribute("rate_limit_wait_s", time.monotonic() - waited)
+                yielded = False
+                usage = None
+                try:
+                    async for llm_response in self.inner.generate_content_async(
+                        llm_request, stream=stream
+                    ):
+                        yielded = True
+                        usage = llm_response.usage_metadata or usage
+                        yield llm_response
+                except Exception as e:
+                    span.record_exception(e)
+                    span.set_status(trace.StatusCode.ERROR)
+                    if not is_rate_limit_error(e):
+                        raise
+                    limiter.on_rate_limited(retry_after_s(e))
+                    if yielded or attempt == self.max_retries:
+                        raise
+                    continue
+                limiter.on_success(cost, usage.total_token_count if usage else None)
+                return
+            finally:
+                span.end()
@@ -0,0 +1,297 @@
+"""Tail-latency control for model calls.
+
+ResilientLlm wraps an agent's model with:
+
+- a per-agent deadline for each call;
+- hedging: once enough latencies are known for the agent, a duplicate
+  request is sent when the first one is slower than a percentile of them,
+  and the first answer wins;
+- a circuit breaker per model: after repeated failures or timeouts, calls go
+  straight to a faster fallback tier until a cooldown has passed;
+- counters per agent in `STATS`, including the hedge win rate.
+
+Streaming calls get the deadline and fail-over (before the first chunk) but
+are not hedged.
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from collections.abc import AsyncGenerator
+from dataclasses import dataclass
+from typing import Optional
+
+from google.adk.models import BaseLlm, LlmRequest, LlmResponse
+from pydantic import Field
+
+from ..prompt_cache import prefix_cache
+from .config import (
+    BREAKER_COOLDOWN_S,
+    BREAKER_FAILURE_THRESHOLD,
+    BREAKER_WINDOW_S,
+    DEFAULT_DEADLINE_S,
+    FALLBACK_DEADLINE_S,
+    HEDGE_MIN_SAMPLES,
+    HEDGE_PERCENTILE,
+    LATENCY_WINDOW,
+)
+
+logger = logging.getLogger(__name__)
+
+# Per-agent counters: calls, hedges, hedge_wins, timeouts, errors, failovers.
+STATS: dict[str, dict[str, int]] = {}
+
+
+def hedge_win_rate(agent_name: str) -> float:
+    """Fraction of hedged calls of an agent where the duplicate answered first."""
+    stats = STATS.get(agent_name, {})
+    return stats.get("hedge_wins", 0) / stats["hedges"] if stats.get("hedges") else 0.0
+
+
+class LatencyWindow:
+    """The most recent successful call latencies of one agent and model."""
+
+    def __init__(self, size: int = LATENCY_WINDOW):
+        self.samples: deque[float] = deque(maxlen=size)
+
+    def add(self, latency_s: float) -> None:
+        self.samples.append(latency_s)
+
+    def percentile(self, q: float) -> float:
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(q / 100 * len(ordered)))]
+
+    def __len__(self) -> int:
+        return len(self.samples)
+
+
+class CircuitBreaker:
+    """Closed -> open after repeated failures -> half-open after a cooldown."""
+
+    def __init__(
+        self,
+        failure_threshold: int = BREAKER_FAILURE_THRESHOLD,
+        window_s: float = BREAKER_WINDOW_S,
+        cooldown_s: float = BREAKER_COOLDOWN_S,
+    ):
+        self.failure_threshold = failure_threshold
+        self.window_s = window_s
+        self.cooldown_s = cooldown_s
+        self.state = "closed"
+        self.opened_at = 0.0
+        self.opens = 0
+        self._failures: deque[float] = deque()
+        self._trial_in_flight = False
+
+    def allow(self) -> bool:
+        """Whether a call may go to the protected model now."""
+        if self.state == "open":
+            if time.monotonic() - self.opened_at < self.cooldown_s:
+                return False
+            self.state = "half_open"
+            self._trial_in_flight = False
+        if self.state == "half_open":
+            if self._trial_in_flight:
+                return False
+            self._trial_in_flight = True
+        return True
+
+    def end_call(self) -> None:
+        """Ends a call let through by `allow`, whatever its outcome.
+
+        A half-open trial that was cancelled or closed early recorded neither
+        success nor failure; the next call becomes the trial instead.
+        """
+        self._trial_in_flight = False
+
+    def record_success(self) -> None:
+        self.state = "closed"
+        self._failures.clear()
+
+    def record_failure(self) -> None:
+        now = time.monotonic()
+        self._failures.append(now)
+        while self._failures and now - self._failures[0] > self.window_s:
+            self._failures.popleft()
+        if self.state == "half_open" or len(self._failures) >= self.failure_threshold:
+            if self.state != "open":
+                self.opens += 1
+                logger.warning("Circuit breaker opened after %d failures", len(self._failures))
+            self.state = "open"
+            self.opened_at = now
+
+
+_BREAKERS: dict[str, CircuitBreaker] = {}
+_LATENCIES: dict[tuple[str, str], LatencyWindow] = {}
+
+
+def circuit_breaker(model: str) -> CircuitBreaker:
+    """The process-wide breaker for a model name."""
+    return _BREAKERS.setdefault(model, CircuitBreaker())
+
+
+@dataclass
+class ResiliencePolicy:
+    deadline_s: float = DEFAULT_DEADLINE_S
+    fallback_deadline_s: float = FALLBACK_DEADLINE_S
+    hedge: bool = True
+    hedge_percentile: float = HEDGE_PERCENTILE
+    hedge_min_samples: int = HEDGE_MIN_SAMPLES
+
+
+def _copy_request(llm_request: LlmRequest, model: str) -> LlmRequest:
+    """A copy that the backend may mutate without affecting other attempts."""
+    config = llm_request.config.model_copy(deep=True)
+    if model != llm_request.model and config.cached_content:
+        prefix_cache.restore(config)
+    return llm_request.model_copy(
+        update={"model": model, "contents": list(llm_request.contents), "config": config}
+    )
+
+
+async def _collect(llm: BaseLlm, llm_request: LlmRequest) -> list[LlmResponse]:
+    return [r async for r in llm.generate_content_async(llm_request, stream=False)]
+
+
+class ResilientLlm(BaseLlm):
+    """Wraps a model with deadlines, hedging and fail-over to a faster tier."""
+
+    agent_name: str
+    primary: BaseLlm
+    fallback: Optional[BaseLlm] = None
+    policy: ResiliencePolicy = Field(default_factory=ResiliencePolicy)
+
+    @property
+    def stats(self) -> dict[str, int]:
+        return STATS.setdefault(
+            self.agent_name,
+            dict.fromkeys(
+                ("calls", "hedges", "hedge_wins", "timeouts", "errors", "failovers"), 0
+            ),
+        )
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        stats = self.stats
+        stats["calls"] += 1
+        breaker = circuit_breaker(self.primary.model)
+        deadline = time.monotonic() + self.policy.deadline_s
+
+        if self.fallback is None or breaker.allow():
+            yielded = False
+            try:
+                if stream:
+                    async for llm_response in self._stream(llm_request, deadline):
+                        yielded = True
+                        yield llm_response
+                else:
+                    for llm_response in await self._hedged(llm_request, deadline):
+                        yield llm_response
+                breaker.record_success()
+                return
+            except Exception as e:
+                breaker.record_failure()
+                stats[
+                    "timeouts"
+                    if isinstance(e, (TimeoutError, asyncio.TimeoutError))
+                    else "errors"
+                ] += 1
+                if self.fallback is None or yielded:
+                    raise
+                logger.warning(
+                    "%s call for %s failed (%r); failing over to %s",
+                    self.primary.model,
+                    self.agent_name,
+                    e,
+                    self.fallback.model,
+                )
+            finally:
+                # Also on CancelledError and GeneratorExit, which skip both records.
+                breaker.end_call()
+
+        stats["failovers"] += 1
+        fallback_request = _copy_request(llm_request, self.fallback.model)
+        responses = await asyncio.wait_for(
+            _collect(self.fallback, fallback_request), self.policy.fallback_deadline_s
+        )
+        for llm_response in responses:
+            yield llm_response
+
+    async def _stream(
+        self, llm_request: LlmRequest, deadline: float
+    ) -> AsyncGenerator[LlmResponse, None]:
+        responses = self.primary.generate_content_async(
+            _copy_request(llm_request, self.primary.model), stream=True
+        )
+        try:
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise TimeoutError(f"Deadline of {self.policy.deadline_s}s exceeded")
+                try:
+                    llm_response = await asyncio.wait_for(
+                        responses.__anext__(), remaining
+                    )
+                except StopAsyncIteration:
+                    return
+                yield llm_response
+        finally:
+            await responses.aclose()
+
+    async def _hedged(self, llm_request: LlmRequest, deadline: float) -> list[LlmResponse]:
+        """Runs the call, adding one duplicate once it is slower than usual."""
+        stats = self.stats
+        window = _LATENCIES.setdefault(
+            (self.agent_name, self.primary.model), LatencyWindow()
+        )
+        hedge_after = None
+        if self.policy.hedge and len(window) >= self.policy.hedge_min_samples:
+            hedge_after = window.percentile(self.policy.hedge_percentile)
+
+        start = time.monotonic()
+        primary = asyncio.create_task(
+            _collect(self.primary, _copy_request(llm_request, self.primary.model))
+        )
+        pending = {primary}
+        hedge = None
+        error: Optional[BaseException] = None
+        try:
+            while pending:
+                now = time.monotonic()
+                remaining = deadline - now
+                if remaining <= 0:
+                    raise TimeoutError(f"Deadline of {self.policy.deadline_s}s exceeded")
+                timeout = remaining
+                if hedge is None and hedge_after is not None:
+                    timeout = min(remaining, max(0.0, start + hedge_after - now))
+
+                done, pending = await asyncio.wait(
+                    pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge:
+                            stats["hedge_wins"] += 1
+                        window.add(time.monotonic() - start)
+                        return task.result()
+                    error = task.exception()
+
+                if (
+                    not done
+                    and hedge is None
+                    and hedge_after is not None
+                    and time.monotonic() - start >= hedge_after
+                ):
+                    stats["hedges"] += 1
+                    hedge = asyncio.create_task(
+                        _collect(
+                            self.primary, _copy_request(llm_request, self.primary.model)
+                        )
+                    )
+                    pending.add(hedge)
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
@@ -0,0 +1,262 @@
+"""Per-call model tier routing.
+
+An agent configured with a model that has cheaper tiers (TIER_LADDERS) gets
+a TieredLlm. Before each call `route_model` picks the cheapest tier that
+the call's local features allow:
+
+- the estimated input tokens are below the policy's limit;
+- no tool that needs the top tier is declared;
+- the cheap tier's recent failure rate for the agent is low.
+
+A cheap-tier answer that fails validation (an error, an empty answer, a call
+to an undeclared tool, or invalid JSON for a response schema) is retried
+once on the top tier and counts as a failure. Validators outside the model
+layer report failures with `record_validation_failure`; a re-ask whose
+request names the agent's configured model goes to the top tier.
+
+`STATS` holds per-agent call counts, tiers used, escalations and the cost
+and latency against sending every call to the top tier (see `savings`).
+"""
+
+import json
+import logging
+import time
+from collections import deque
+from collections.abc import AsyncGenerator
+from dataclasses import dataclass, field
+from typing import Optional
+
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models import BaseLlm, LlmRequest, LlmResponse
+from google.genai import types
+from pydantic import Field
+
+from .config import AGENT_TIER_POLICIES, MODEL_PRICES_PER_M_TOKENS
+from .rate_limit import estimate_request_tokens
+
+logger = logging.getLogger(__name__)
+
+# Per-agent counters: calls, escalations, validation_failures, cost_usd,
+# top_tier_cost_usd, and per-model calls and latency_s under "tiers".
+STATS: dict[str, dict] = {}
+
+
+def _stats(agent_name: str) -> dict:
+    return STATS.setdefault(
+        agent_name,
+        {
+            "calls": 0,
+            "escalations": 0,
+            "validation_failures": 0,
+            "cost_usd": 0.0,
+            "top_tier_cost_usd": 0.0,
+            "tiers": {},
+        },
+    )
+
+
+def call_cost_usd(model: str, usage: Optional[types.GenerateContentResponseUsageMetadata]) -> float:
+    """Price of one call from its reported usage; 0 for unknown models."""
+    if usage is None or model not in MODEL_PRICES_PER_M_TOKENS:
+        return 0.0
+    input_price, output_price = MODEL_PRICES_PER_M_TOKENS[model]
+    output_tokens = (usage.candidates_token_count or 0) + (usage.thoughts_token_count or 0)
+    return ((usage.prompt_token_count or 0) * input_price + output_tokens * output_price) / 1e6
+
+
+def savings(agent_name: str) -> dict[str, Optional[float]]:
+    """Cost and latency saved by routing, against the top tier for every call.
+
+    Latency savings are only known once the top tier has answered some calls.
+    """
+    stats = _stats(agent_name)
+    tiers = stats["tiers"]
+    top = next((m for m, t in tiers.items() if t.get("top")), None)
+    latency_saved = None
+    if top and tiers[top]["calls"]:
+        top_mean = tiers[top]["latency_s"] / tiers[top]["calls"]
+        latency_saved = sum(
+            t["calls"] * top_mean - t["latency_s"] for m, t in tiers.items() if m != top
+        )
+    return {
+        "cost_saved_usd": stats["top_tier_cost_usd"] - stats["cost_usd"],
+        "latency_saved_s": latency_saved,
+    }
+
+
+@dataclass
+class TierPolicy:
+    max_cheap_input_tokens: int = 6000
+    top_tier_tools: frozenset[str] = frozenset()
+    """Tools whose calls are always planned on the top tier."""
+    max_failure_rate: float = 0.25
+    """Above this recent cheap-tier failure rate, calls start on the top tier."""
+    min_failure_samples: int = 5
+    failure_window_s: float = 600.0
+
+
+@dataclass
+class _Outcomes:
+    """Recent cheap-tier outcomes of one agent, as (time, failed)."""
+
+    samples: deque = field(default_factory=deque)
+
+    def add(self, failed: bool, window_s: float) -> None:
+        now = time.monotonic()
+        self.samples.append((now, failed))
+        while self.samples and now - self.samples[0][0] > window_s:
+            self.samples.popleft()
+
+    def failure_rate(self, window_s: float) -> tuple[float, int]:
+        now = time.monotonic()
+        recent = [failed for t, failed in self.samples if now - t <= window_s]
+        return (sum(recent) / len(recent) if recent else 0.0), len(recent)
+
+
+_OUTCOMES: dict[str, _Outcomes] = {}
+
+
+def validation_error(llm_request: LlmRequest, responses: list[LlmResponse]) -> Optional[str]:
+    """Why a non-streamed answer is unusable, or None if it passes."""
+    parts = [p for r in responses if r.content for p in r.content.parts or []]
+    errors = [r.error_code for r in responses if r.error_code]
+    if errors:
+        return f"error {errors[0]}"
+    if not parts:
+        return "empty answer"
+    for part in parts:
+        if part.function_call and part.function_call.name not in llm_request.tools_dict:
+            return f"call to undeclared tool {part.function_call.name!r}"
+    if llm_request.config.response_schema and not any(p.function_call for p in parts):
+        try:
+            json.loads("".join(p.text or "" for p in parts))
+        except ValueError:
+            return "answer is not valid JSON"
+    return None
+
+
+def _tag(llm_response: LlmResponse, model: str) -> LlmResponse:
+    """Records which tier answered, for validators after the model call."""
+    llm_response.custom_metadata = {**(llm_response.custom_metadata or {}), "model": model}
+    return llm_response
+
+
+class TieredLlm(BaseLlm):
+    """An agent's models from cheapest to its configured (top) tier."""
+
+    agent_name: str
+    tiers: list[BaseLlm]
+    policy: TierPolicy = Field(default_factory=TierPolicy)
+
+    @property
+    def top(self) -> BaseLlm:
+        return self.tiers[-1]
+
+    def choose(self, llm_request: LlmRequest) -> BaseLlm:
+        """The cheapest tier the request's features allow."""
+        policy = self.policy
+        if estimate_request_tokens(llm_request) > policy.max_cheap_input_tokens:
+            return self.top
+        if policy.top_tier_tools & llm_request.tools_dict.keys():
+            return self.top
+        outcomes = _OUTCOMES.setdefault(self.agent_name, _Outcomes())
+        rate, samples = outcomes.failure_rate(policy.failure_window_s)
+        if samples >= policy.min_failure_samples and rate > policy.max_failure_rate:
+            return self.top
+        return self.tiers[0]
+
+    def record_outcome(self, failed: bool) -> None:
+        _OUTCOMES.setdefault(self.agent_name, _Outcomes()).add(
+            failed, self.policy.failure_window_s
+        )
+
+    def _record_call(
+        self,
+        llm: BaseLlm,
+        latency_s: float,
+        responses: list[LlmResponse],
+        replaces_top_call: bool = True,
+    ):
+        stats = _stats(self.agent_name)
+        tier = stats["tiers"].setdefault(
+            llm.model, {"calls": 0, "latency_s": 0.0, "top": llm is self.top}
+        )
+        tier["calls"] += 1
+        tier["latency_s"] += latency_s
+        usage = next((r.usage_metadata for r in reversed(responses) if r.usage_metadata), None)
+        stats["cost_usd"] += call_cost_usd(llm.model, usage)
+        if replaces_top_call:
+            stats["top_tier_cost_usd"] += call_cost_usd(self.top.model, usage)
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        stats = _stats(self.agent_name)
+        stats["calls"] += 1
+        llm = next((t for t in self.tiers if t.model == llm_request.model), None)
+        if llm is None:
+            llm = self.choose(llm_request)
+
+        start = time.monotonic()
+        if stream or llm is self.top:
+            responses = []
+            async for llm_response in llm.generate_content_async(llm_request, stream=stream):
+                responses.append(llm_response)
+                yield _tag(llm_response, llm.model)
+            self._record_call(llm, time.monotonic() - start, responses)
+            return
+
+        responses = [r async for r in llm.generate_content_async(llm_request)]
+        error = validation_error(llm_request, responses)
+        self._record_call(llm, time.monotonic() - start, responses, error is None)
+        self.record_outcome(failed=error is not None)
+        if error is None:
+            for llm_response in responses:
+                yield _tag(llm_response, llm.model)
+            return
+
+        stats["escalations"] += 1
+        logger.info(
+            "%s answer for %s failed validation (%s); escalating to %s",
+            llm.model,
+            self.agent_name,
+            error,
+            self.top.model,
+        )
+        start = time.monotonic()
+        responses = [r async for r in self.top.generate_content_async(llm_request)]
+        self._record_call(self.top, time.monotonic() - start, responses)
+        for llm_response in responses:
+            yield _tag(llm_response, self.top.model)
+
+
+def tier_policy(agent_name: str) -> TierPolicy:
+    return TierPolicy(**AGENT_TIER_POLICIES.get(agent_name, {}))
+
+
+def route_model(
+    callback_context: CallbackContext, llm_request: LlmRequest
+) -> Optional[LlmResponse]:
+    """before_model_callback that sets the request's model to the routed tier.
+
+    Install it after callbacks that trim the request and before the prefix
+    cache, which caches per model.
+    """
+    llm = callback_context._invocation_context.agent.canonical_model
+    if isinstance(llm, TieredLlm):
+        llm_request.model = llm.choose(llm_request).model
+    return None
+
+
+def record_validation_failure(llm: BaseLlm, llm_response: LlmResponse) -> None:
+    """Reports an answer of `llm` that failed a validator outside the model."""
+    if not isinstance(llm, TieredLlm):
+        return
+    stats = _stats(llm.agent_name)
+    stats["validation_failures"] += 1
+    if (llm_response.custom_metadata or {}).get("model") != llm.top.model:
+        stats["escalations"] += 1
+        # The top tier is asked again, so this answer saved nothing.
+        stats["top_tier_cost_usd"] -= call_cost_usd(llm.top.model, llm_response.usage_metadata)
+        llm.record_outcome(failed=True)
+
@@ -7,5 +7,6 @@ You have access to two tools:
 - `transform_agent2`: for transforming calculations done by coding_agent and put them in output_key.
 - `express_output_key_agent`: for expressing the output_key from transform_agent2 in a poem.
 - `data_visualisation_agent`: for visualising the data from output_key.
+- `dataset_agent`: for questions about CSV or Parquet files the user uploaded (filtering, grouping, sums, percentiles).
 Based on the user's query, you should use the appropriate tool to perform the task.
 """
\ No newline at end of file
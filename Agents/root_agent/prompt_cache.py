@@ -0,0 +1,340 @@
+"""Static prompt prefix caching.
+
+The agent prompts and tool schemas are the same on every call; only the
+state values substituted into the instruction (such as `{list_of_variables}`)
+and the history change. Before each model call the request is split into:
+
+- a stable prefix: the system instruction with its state placeholders
+  replaced by references, plus the tool declarations;
+- a dynamic suffix: the substituted state values, sent as the first message
+  of the conversation, followed by the history.
+
+The prefix is stored with the provider's context-caching API and reused by
+name through `cached_content`. The cache key is a hash of the model, prefix
+text and tool schemas. When a prompt module changes (a deploy, or a reload
+under `adk web`), the key changes, a new cache is created and the old one is
+deleted. Prefixes below the provider's minimum size are not cached
+explicitly, but keeping them first and stable still lets Gemini's implicit
+caching apply.
+
+The backend is chosen with PROMPT_CACHE_BACKEND: "off" (default; split
+only, no explicit cache), "gemini" (paid server-side caches, opt-in) or
+"local" (an in-memory stand-in for tests).
+"""
+
+import asyncio
+import hashlib
+import itertools
+import json
+import logging
+import os
+import re
+import time
+from dataclasses import dataclass
+from typing import Optional, Protocol
+
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.agents.readonly_context import ReadonlyContext
+from google.adk.models import LlmRequest, LlmResponse
+from google.adk.utils.instructions_utils import inject_session_state
+from google.genai import types
+
+from .context_budget import CHARS_PER_TOKEN
+
+logger = logging.getLogger(__name__)
+
+PROMPT_CACHE_BACKEND = os.getenv("PROMPT_CACHE_BACKEND", "off")
+CACHE_TTL_S = 3600
+# Explicit caches below this size are rejected by the provider.
+MIN_CACHE_TOKENS = 1024
+# Recreate a cache this long before it expires.
+REFRESH_MARGIN_S = 60
+
+_PLACEHOLDER = re.compile(r"{+[^{}]*}+")
+_STATE_PREFIXES = ("app", "user", "temp")
+STATE_VALUES_PREFIX = "Current values from the session state:"
+
+
+def _state_name(match: re.Match) -> Optional[str]:
+    """Returns the state key of an ADK placeholder, or None if it is not one."""
+    name = match.group().lstrip("{").rstrip("}").strip().removesuffix("?")
+    parts = name.split(":")
+    if len(parts) == 1 and name.isidentifier():
+        return name
+    if len(parts) == 2 and parts[0] in _STATE_PREFIXES and parts[1].isidentifier():
+        return name
+    return None
+
+
+async def split_instruction(
+    callback_context: CallbackContext, system_instruction: str
+) -> tuple[str, str]:
+    """Splits the rendered system instruction into static and dynamic parts.
+
+    Returns:
+        The system instruction with state values replaced by references, and
+        the text carrying those values ("" if the instruction has none).
+    """
+    invocation_context = callback_context._invocation_context
+    template = getattr(invocation_context.agent, "instruction", None)
+    if not isinstance(template, str):
+        return system_instruction, ""
+    names = list(dict.fromkeys(
+        name for name in map(_state_name, _PLACEHOLDER.finditer(template)) if name
+    ))
+    if not names:
+        return system_instruction, ""
+
+    rendered = await inject_session_state(template, ReadonlyContext(invocation_context))
+    if rendered not in system_instruction:
+        return system_instruction, ""
+
+    def _reference(match: re.Match) -> str:
+        name = _state_name(match)
+        return f"<{name}> (given in the first message)" if name else match.group()
+
+    static = system_instruction.replace(
+        rendered, _PLACEHOLDER.sub(_reference, template), 1
+    )
+    state = invocation_context.session.state
+    values = "\n".join(
+        f"<{name}>\n{state.get(name, '')}\n</{name}>" for name in names
+    )
+    return static, f"{STATE_VALUES_PREFIX}\n{values}"
+
+
+class PrefixCacheBackend(Protocol):
+    """Where cached prefixes live."""
+
+    async def create(
+        self,
+        model: str,
+        system_instruction: str,
+        tools: list,
+        tool_config: Optional[types.ToolConfig],
+        ttl_s: int,
+    ) -> str:
+        """Stores a prefix and returns the name to pass as cached_content."""
+        ...
+
+    async def delete(self, name: str) -> None:
+        ...
+
+
+class LocalPrefixCacheBackend:
+    """In-memory stand-in for the provider cache, for tests and local runs."""
+
+    def __init__(self):
+        self.entries: dict[str, tuple[str, str, list, Optional[types.ToolConfig]]] = {}
+        self._ids = itertools.count(1)
+
+    async def create(self, model, system_instruction, tools, tool_config, ttl_s):
+        name = f"cachedContents/local-{next(self._ids)}"
+        self.entries[name] = (model, system_instruction, tools, tool_config)
+        return name
+
+    async def delete(self, name):
+        self.entries.pop(name, None)
+
+
+class GeminiPrefixCacheBackend:
+    """Gemini / Vertex AI context caching through google-genai."""
+
+    def __init__(self):
+        self._client = None
+
+    @property
+    def client(self):
+        if self._client is None:
+            from google import genai
+
+            self._client = genai.Client()
+        return self._client
+
+    async def create(self, model, system_instruction, tools, tool_config, ttl_s):
+        cached = await self.client.aio.caches.create(
+            model=model,
+            config=types.CreateCachedContentConfig(
+                system_instruction=system_instruction,
+                tools=tools or None,
+                tool_config=tool_config,
+                ttl=f"{ttl_s}s",
+                display_name="zadkguide-prompt-prefix",
+            ),
+        )
+        return cached.name
+
+    async def delete(self, name):
+        await self.client.aio.caches.delete(name=name)
+
+
+@dataclass
+class _Entry:
+    name: Optional[str]
+    expires_at: float
+
+
+class PrefixCache:
+    """Splits requests into a cached static prefix and a dynamic suffix.
+
+    Use `before_model` as a before_model_callback (after any callback that
+    edits the request) and `after_model` as an after_model_callback (first,
+    so it always sees the usage metadata).
+    """
+
+    def __init__(
+        self,
+        backend: Optional[PrefixCacheBackend],
+        ttl_s: int = CACHE_TTL_S,
+        min_tokens: int = MIN_CACHE_TOKENS,
+    ):
+        self.backend = backend
+        self.ttl_s = ttl_s
+        self.min_tokens = min_tokens
+        self.stats = {
+            "hits": 0,
+            "created": 0,
+            "too_small": 0,
+            "errors": 0,
+            "cached_tokens": 0,
+            "prompt_tokens": 0,
+        }
+        self._entries: dict[str, _Entry] = {}
+        self._prefixes: dict[str, tuple[str, list, Optional[types.ToolConfig]]] = {}
+        self._current_key: dict[str, str] = {}
+        self._locks: dict[str, asyncio.Lock] = {}
+
+    async def before_model(
+        self, callback_context: CallbackContext, llm_request: LlmRequest
+    ) -> Optional[LlmResponse]:
+        config = llm_request.config
+        if not isinstance(config.system_instruction, str) or config.cached_content:
+            return None
+
+        static, dynamic = await split_instruction(
+            callback_context, config.system_instruction
+        )
+        config.system_instruction = static
+        if dynamic:
+            llm_request.contents.insert(
+                0, types.Content(role="user", parts=[types.Part(text=dynamic)])
+            )
+
+        if self.backend is None:
+            return None
+        tools = list(config.tools or [])
+        # The tool config is cached with the tools, so it is part of the key.
+        tool_config = config.tool_config
+        tool_schemas = json.dumps(
+            [t.model_dump(exclude_none=True, mode="json") for t in tools]
+            + [tool_config.model_dump(exclude_none=True, mode="json") if tool_config else None],
+            sort_keys=True,
+        )
+        if (len(static) + len(tool_schemas)) // CHARS_PER_TOKEN < self.min_tokens:
+            self.stats["too_small"] += 1
+            return None
+
+        key = hashlib.sha256(
+            "\0".join([llm_request.model or "", static, tool_schemas]).encode()
+        ).hexdigest()
+        name = await self._get_or_create(
+            callback_context.agent_name,
+            key,
+            llm_request.model,
+            static,
+            tools,
+            tool_config,
+        )
+        if name:
+            # The provider rejects requests repeating what the cache holds.
+            config.cached_content = name
+            config.system_instruction = None
+            config.tools = None
+            config.tool_config = None
+        return None
+
+    def after_model(
+        self, callback_context: CallbackContext, llm_response: LlmResponse
+    ) -> Optional[LlmResponse]:
+        usage = llm_response.usage_metadata
+        if usage and not llm_response.partial:
+            self.stats["cached_tokens"] += usage.cached_content_token_count or 0
+            self.stats["prompt_tokens"] += usage.prompt_token_count or 0
+        return None
+
+    def restore(self, config: types.GenerateContentConfig) -> None:
+        """Puts the cached prefix back into a config, e.g. to call another model.
+
+        Cached contents are tied to one model, so a request that fails over to
+        a different tier must carry its prefix inline again.
+        """
+        prefix = self._prefixes.get(config.cached_content or "")
+        if prefix:
+            config.system_instruction, tools, tool_config = prefix
+            config.tools = list(tools) or None
+            config.tool_config = tool_config
+        config.cached_content = None
+
+    async def _get_or_create(
+        self,
+        agent_name: str,
+        key: str,
+        model: str,
+        static: str,
+        tools: list,
+        tool_config: Optional[types.ToolConfig],
+    ) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry and entry.expires_at - REFRESH_MARGIN_S > time.time():
+            if entry.name:
+                self.stats["hits"] += 1
+            return entry.name
+
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            entry = self._entries.get(key)
+            if entry and entry.expires_at - REFRESH_MARGIN_S > time.time():
+                return entry.name
+            try:
+                name = await self.backend.create(
+                    model, static, tools, tool_config, self.ttl_s
+                )
+                self._prefixes[name] = (static, tools, tool_config)
+                self.stats["created"] += 1
+                logger.info("Cached prompt prefix for %s as %s", agent_name, name)
+            except Exception as e:
+                # Remember the failure for a TTL instead of retrying every call.
+                logger.warning("Prompt prefix caching failed for %s: %s", agent_name, e)
+                self.stats["errors"] += 1
+                name = None
+            self._entries[key] = _Entry(name, time.time() + self.ttl_s)
+
+        previous = self._current_key.get(agent_name)
+        self._current_key[agent_name] = key
+        if previous and previous != key:
+            await self._drop(previous)
+        return name
+
+    async def _drop(self, key: str) -> None:
+        """Deletes a prefix that is no longer current, e.g. after a prompt change."""
+        if key in self._current_key.values():
+            return
+        entry = self._entries.pop(key, None)
+        self._locks.pop(key, None)
+        if entry and entry.name:
+            self._prefixes.pop(entry.name, None)
+            try:
+                await self.backend.delete(entry.name)
+            except Exception as e:
+                logger.debug("Could not delete cached prefix %s: %s", entry.name, e)
+
+
+def _backend_from_env() -> Optional[PrefixCacheBackend]:
+    if PROMPT_CACHE_BACKEND == "local":
+        return LocalPrefixCacheBackend()
+    if PROMPT_CACHE_BACKEND == "gemini":
+        return GeminiPrefixCacheBackend()
+    return None
+
+
+prefix_cache = PrefixCache(_backend_from_env())
@@ -1,15 +1,24 @@
 from google.adk.agents import Agent
 from .prompt import CODING_AGENT_PROMPT
-# from google.adk.code_executors import BuiltInCodeExecutor
-from google.adk.agents import Agent
-# from google.adk.tools import CodeExecutionTool
+from ...models import build_model
+from .config import CODE_EXECUTOR_BACKEND
+from .executor import WarmPoolCodeExecutor
 
 from google.adk.code_executors import BuiltInCodeExecutor
 
+if CODE_EXECUTOR_BACKEND == "builtin":
+    code_executor = BuiltInCodeExecutor()
+else:
+    code_executor = WarmPoolCodeExecutor()
+
 coding_agent = Agent(
-    model='gemini-2.5-pro',
-    description='An agent that can perform calculations using built in code executor.',
+    model=build_model("CodeAgent", "gemini-2.5-pro"),
+    description='An agent that can perform calculations by executing Python code.',
     name='CodeAgent',
-    code_executor=BuiltInCodeExecutor(),
-    instruction=CODING_AGENT_PROMPT
+    code_executor=code_executor,
+    instruction=CODING_AGENT_PROMPT,
+    # Runs the local executor's jobs in a thread rather than on the event loop.
+    after_model_callback=(
+        code_executor.prepare if isinstance(code_executor, WarmPoolCodeExecutor) else None
+    ),
 )
\ No newline at end of file
@@ -0,0 +1,182 @@
+"""Persistent result cache for code executions.
+
+A result is keyed on the hash of the normalized code plus the hash of the
+data the code can read (its input files and, when referenced, the session
+state). Entries live in a small SQLite file so they survive restarts, and are
+evicted least-recently-used first once the entry count or the on-disk quota
+is exceeded.
+"""
+
+import ast
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# Code importing these modules or calling these attributes can give a
+# different answer on every run, so its results are never cached.
+NONDETERMINISTIC_MODULES = {"random", "time", "datetime", "uuid", "secrets"}
+NONDETERMINISTIC_ATTRIBUTES = {"random", "now", "today", "utcnow"}
+
+
+def _is_deterministic(tree: ast.AST) -> bool:
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            modules = {alias.name.split(".")[0] for alias in node.names}
+        elif isinstance(node, ast.ImportFrom):
+            modules = {(node.module or "").split(".")[0]}
+        elif isinstance(node, ast.Attribute):
+            if node.attr in NONDETERMINISTIC_ATTRIBUTES:
+                return False
+            continue
+        else:
+            continue
+        if modules & NONDETERMINISTIC_MODULES:
+            return False
+    return True
+
+
+def normalize_code(code: str) -> tuple[str, bool, bool]:
+    """Returns a canonical form of the code plus what it depends on.
+
+    Round-tripping through the AST drops comments, blank lines and formatting
+    differences, so cosmetically different snippets share a cache entry.
+
+    Returns:
+        The normalized code, whether it is deterministic, and whether it reads
+        the session `state`.
+    """
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        lines = [line.rstrip() for line in code.strip().splitlines()]
+        return "\n".join(line for line in lines if line), True, False
+    reads_state = any(
+        isinstance(node, ast.Name) and node.id == "state" for node in ast.walk(tree)
+    )
+    return ast.unparse(tree), _is_deterministic(tree), reads_state
+
+
+def cache_key(code: str, input_files: list[tuple[str, str]], state: dict) -> Optional[str]:
+    """Builds the cache key, or returns None if the code must not be cached.
+
+    Args:
+        code: The code to execute.
+        input_files: (name, base64 content) pairs available to the code.
+        state: The session state snapshot exposed to the code.
+
+    Returns:
+        A hex digest, or None for code that looks nondeterministic.
+    """
+    normalized, deterministic, reads_state = normalize_code(code)
+    if not deterministic:
+        return None
+
+    data = hashlib.sha256()
+    for name, content in sorted(input_files):
+        data.update(name.encode())
+        data.update(hashlib.sha256(content.encode()).digest())
+    # Only code that reads the state depends on it.
+    if reads_state:
+        data.update(json.dumps(state, sort_keys=True, default=str).encode())
+
+    key = hashlib.sha256()
+    key.update(hashlib.sha256(normalized.encode()).digest())
+    key.update(data.digest())
+    return key.hexdigest()
+
+
+class CodeExecutionCache:
+    """LRU cache of execution results, bounded by entry count and disk quota."""
+
+    def __init__(self, path: str, max_entries: int, max_bytes: int):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            " key TEXT PRIMARY KEY,"
+            " value BLOB NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " last_access REAL NOT NULL)"
+        )
+        self._db.execute(
+            "CREATE INDEX IF NOT EXISTS results_last_access ON results (last_access)"
+        )
+
+    def get(self, key: str) -> Optional[dict]:
+        """Returns the cached result for key and marks it as recently used."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT value FROM results WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self._db.execute(
+                "UPDATE results SET last_access = ? WHERE key = ?", (time.time(), key)
+            )
+            self.hits += 1
+        return json.loads(zlib.decompress(row[0]))
+
+    def put(self, key: str, result: dict) -> None:
+        """Stores a result, then evicts old entries until within bounds."""
+        value = zlib.compress(json.dumps(result).encode())
+        if len(value) > self.max_bytes:
+            return
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO results (key, value, size, last_access)"
+                " VALUES (?, ?, ?, ?)",
+                (key, value, len(value), time.time()),
+            )
+            self._evict()
+
+    def _evict(self) -> None:
+        count, total = self._db.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results"
+        ).fetchone()
+        if count <= self.max_entries and total <= self.max_bytes:
+            return
+        evicted = 0
+        for key, size in self._db.execute(
+            "SELECT key, size FROM results ORDER BY last_access"
+        ).fetchall():
+            if count <= self.max_entries and total <= self.max_bytes:
+                break
+            self._db.execute("DELETE FROM results WHERE key = ?", (key,))
+            count -= 1
+            total -= size
+            evicted += 1
+        logger.debug("Evicted %d code execution cache entries", evicted)
+
+    def stats(self) -> dict:
+        with self._lock:
+            count, total = self._db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results"
+            ).fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "entries": count,
+            "bytes": total,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._db.execute("DELETE FROM results")
@@ -0,0 +1,30 @@
+"""Configuration for the coding agent's code executor."""
+
+import os
+
+# Which executor runs the code written by the coding agent:
+# - "local": the warm process pool in executor.py (NumPy and pandas preloaded).
+# - "builtin": Gemini's BuiltInCodeExecutor, which runs inside the model call.
+CODE_EXECUTOR_BACKEND = os.getenv("CODE_EXECUTOR_BACKEND", "local")
+
+# Warm pool sizing.
+POOL_SIZE = int(os.getenv("CODE_EXECUTOR_POOL_SIZE", "2"))
+# A worker is replaced after this many jobs so leaked state cannot pile up.
+MAX_JOBS_PER_WORKER = 50
+
+# Per-job limits.
+CPU_TIME_LIMIT_S = 10
+MEMORY_LIMIT_MB = 1024
+WALL_TIME_LIMIT_S = 30.0
+# Maximum time a fresh worker may take to import its preloaded modules.
+WORKER_STARTUP_TIMEOUT_S = 60.0
+
+# Result cache for code executions (see cache.py). Set CODE_EXECUTOR_CACHE=0
+# to always execute.
+CACHE_ENABLED = os.getenv("CODE_EXECUTOR_CACHE", "1") != "0"
+CACHE_PATH = os.getenv(
+    "CODE_EXECUTOR_CACHE_PATH",
+    os.path.join(os.path.expanduser("~"), ".cache", "zadkguide", "code_results.db"),
+)
+CACHE_MAX_ENTRIES = 5000
+CACHE_MAX_BYTES = 256 * 1024 * 1024
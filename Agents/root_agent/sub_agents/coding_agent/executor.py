@@ -0,0 +1,347 @@
+"""Local code executor backed by a pool of pre-warmed worker processes.
+
+Each worker is a separate interpreter (see worker.py) that has already
+imported NumPy and pandas, so a job only pays for running the snippet itself.
+Jobs run with CPU, memory and wall-clock limits and without network access.
+Unlike BuiltInCodeExecutor, the code runs on this host and can read the
+session state, which is exposed to the snippet as the `state` dict.
+Successful results are memoized (see cache.py), so a repeated snippet over
+the same data returns without touching the pool.
+
+ADK calls `execute_code` synchronously from the event loop, so a job run
+there would stall every other request for up to WALL_TIME_LIMIT_S. The
+coding agent therefore installs `prepare` as an after_model_callback: it
+runs the response's code block in a thread and keeps the result, which
+`execute_code` then returns at once. Only code that skips the callback
+(ADK's data file preprocessing) still runs on the loop.
+"""
+
+import asyncio
+import atexit
+import copy
+import json
+import logging
+import os
+import queue
+import select
+import subprocess
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.code_executors import BaseCodeExecutor
+from google.adk.code_executors.code_execution_utils import (
+    CodeExecutionInput,
+    CodeExecutionResult,
+    CodeExecutionUtils,
+    File,
+)
+from google.adk.code_executors.code_executor_context import CodeExecutorContext
+from google.adk.models import LlmResponse
+from pydantic import Field, PrivateAttr
+
+from ..transform_agent.variables import expand_variables
+from .cache import CodeExecutionCache, cache_key
+from .config import (
+    CACHE_ENABLED,
+    CACHE_MAX_BYTES,
+    CACHE_MAX_ENTRIES,
+    CACHE_PATH,
+    CPU_TIME_LIMIT_S,
+    MAX_JOBS_PER_WORKER,
+    MEMORY_LIMIT_MB,
+    POOL_SIZE,
+    WALL_TIME_LIMIT_S,
+    WORKER_STARTUP_TIMEOUT_S,
+)
+
+logger = logging.getLogger(__name__)
+
+# Results run ahead by `prepare` that ADK has not asked for yet.
+MAX_PREPARED_RESULTS = 32
+
+WORKER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "worker.py")
+
+
+class WorkerError(Exception):
+    """Raised when a worker dies or exceeds its wall-clock limit."""
+    pass
+
+
+class Worker:
+    """A single worker process speaking the line-based JSON protocol."""
+
+    def __init__(self, cpu_time_limit_s: int, memory_limit_mb: int):
+        limits = {
+            "cpu_time_limit_s": cpu_time_limit_s,
+            "memory_limit_mb": memory_limit_mb,
+        }
+        env = dict(os.environ)
+        # One BLAS thread per worker: the pool provides the parallelism, and
+        # per-thread arenas would otherwise eat into the memory limit.
+        env.update(
+            OMP_NUM_THREADS="1",
+            OPENBLAS_NUM_THREADS="1",
+            MKL_NUM_THREADS="1",
+            MPLBACKEND="Agg",
+        )
+        self.process = subprocess.Popen(
+            [sys.executable, "-u", WORKER_SCRIPT, json.dumps(limits)],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            env=env,
+            text=True,
+            encoding="utf-8",
+        )
+        self.ready = False
+        self.jobs = 0
+
+    def _read_line(self, timeout: float) -> dict:
+        ready, _, _ = select.select([self.process.stdout], [], [], timeout)
+        if not ready:
+            raise WorkerError(f"Worker did not answer within {timeout:.1f}s.")
+        line = self.process.stdout.readline()
+        if not line:
+            raise WorkerError(
+                f"Worker exited with code {self.process.wait()} "
+                "(CPU or memory limit exceeded, or crashed)."
+            )
+        return json.loads(line)
+
+    def wait_ready(self, timeout: float = WORKER_STARTUP_TIMEOUT_S) -> None:
+        """Blocks until the worker has finished importing its modules."""
+        if not self.ready:
+            self._read_line(timeout)
+            self.ready = True
+
+    def run(self, job: dict, timeout: float) -> dict:
+        """Sends a job to the worker and waits for its result."""
+        self.wait_ready()
+        self.jobs += 1
+        try:
+            self.process.stdin.write(json.dumps(job) + "\n")
+            self.process.stdin.flush()
+        except BrokenPipeError as e:
+            raise WorkerError("Worker is no longer running.") from e
+        return self._read_line(timeout)
+
+    def kill(self) -> None:
+        if self.process.poll() is None:
+            self.process.kill()
+        self.process.wait()
+
+
+class WarmWorkerPool:
+    """A fixed-size pool of warm workers; each job gets a worker to itself."""
+
+    def __init__(
+        self,
+        size: int = POOL_SIZE,
+        cpu_time_limit_s: int = CPU_TIME_LIMIT_S,
+        memory_limit_mb: int = MEMORY_LIMIT_MB,
+        wall_time_limit_s: float = WALL_TIME_LIMIT_S,
+        max_jobs_per_worker: int = MAX_JOBS_PER_WORKER,
+    ):
+        self.size = size
+        self.cpu_time_limit_s = cpu_time_limit_s
+        self.memory_limit_mb = memory_limit_mb
+        self.wall_time_limit_s = wall_time_limit_s
+        self.max_jobs_per_worker = max_jobs_per_worker
+        self._idle: "queue.Queue[Worker]" = queue.Queue()
+        self._workers: set[Worker] = set()
+        self._lock = threading.Lock()
+        self._started = False
+
+    def _spawn(self) -> Worker:
+        worker = Worker(self.cpu_time_limit_s, self.memory_limit_mb)
+        self._workers.add(worker)
+        return worker
+
+    def _retire(self, worker: Worker) -> None:
+        worker.kill()
+        self._workers.discard(worker)
+
+    def start(self, wait: bool = True) -> None:
+        """Spawns the workers; with wait=True, blocks until all are warm."""
+        with self._lock:
+            if self._started:
+                return
+            workers = [self._spawn() for _ in range(self.size)]
+            self._started = True
+        if wait:
+            for worker in workers:
+                worker.wait_ready()
+        for worker in workers:
+            self._idle.put(worker)
+        logger.info("Started %d warm code executor workers", self.size)
+
+    def run(self, job: dict) -> dict:
+        """Runs a job on the next idle worker, replacing it if it fails."""
+        self.start(wait=False)
+        worker = self._idle.get()
+        try:
+            return worker.run(job, self.wall_time_limit_s)
+        except WorkerError as e:
+            logger.warning("Code executor worker failed: %s", e)
+            self._retire(worker)
+            worker = self._spawn()
+            return {"stdout": "", "stderr": str(e), "output_files": [], "error": True}
+        finally:
+            if worker.jobs >= self.max_jobs_per_worker:
+                self._retire(worker)
+                worker = self._spawn()
+            self._idle.put(worker)
+
+    def shutdown(self) -> None:
+        for worker in list(self._workers):
+            self._retire(worker)
+        self._started = False
+
+
+class WarmPoolCodeExecutor(BaseCodeExecutor):
+    """Runs the coding agent's code blocks in a local warm process pool."""
+
+    # Every job starts from a clean namespace in whichever worker is free.
+    stateful: bool = Field(default=False, frozen=True, exclude=True)
+
+    pool_size: int = POOL_SIZE
+    cpu_time_limit_s: int = CPU_TIME_LIMIT_S
+    memory_limit_mb: int = MEMORY_LIMIT_MB
+    wall_time_limit_s: float = WALL_TIME_LIMIT_S
+
+    use_cache: bool = CACHE_ENABLED
+    cache_path: str = CACHE_PATH
+
+    _pool: Optional[WarmWorkerPool] = PrivateAttr(default=None)
+    _cache: Optional[CodeExecutionCache] = PrivateAttr(default=None)
+    _prepared: "OrderedDict[tuple[str, str], dict]" = PrivateAttr(
+        default_factory=OrderedDict
+    )
+
+    @property
+    def pool(self) -> WarmWorkerPool:
+        """The worker pool, created on first use so imports stay cheap."""
+        if self._pool is None:
+            self._pool = WarmWorkerPool(
+                size=self.pool_size,
+                cpu_time_limit_s=self.cpu_time_limit_s,
+                memory_limit_mb=self.memory_limit_mb,
+                wall_time_limit_s=self.wall_time_limit_s,
+            )
+            atexit.register(self._pool.shutdown)
+        return self._pool
+
+    @property
+    def cache(self) -> Optional[CodeExecutionCache]:
+        """The result cache, or None when caching is disabled."""
+        if self.use_cache and self._cache is None:
+            self._cache = CodeExecutionCache(
+                self.cache_path, CACHE_MAX_ENTRIES, CACHE_MAX_BYTES
+            )
+        return self._cache
+
+    def warm_up(self) -> None:
+        """Starts the workers ahead of the first request."""
+        self.pool.start()
+
+    async def prepare(
+        self, callback_context: CallbackContext, llm_response: LlmResponse
+    ) -> Optional[LlmResponse]:
+        """after_model_callback that runs the response's code off the event loop.
+
+        The code block is found as ADK will find it, run in a thread, and
+        its result kept for `execute_code`.
+        """
+        invocation_context = callback_context._invocation_context
+        if llm_response.partial or not llm_response.content:
+            return None
+        executor_context = CodeExecutorContext(invocation_context.session.state)
+        if (
+            executor_context.get_error_count(invocation_context.invocation_id)
+            >= self.error_retry_attempts
+        ):
+            return None
+        code = CodeExecutionUtils.extract_code_and_truncate_content(
+            copy.deepcopy(llm_response.content), self.code_block_delimiters
+        )
+        if not code:
+            return None
+        job = _job(invocation_context, code, executor_context.get_input_files())
+        result = await asyncio.to_thread(self._run, job)
+        self._prepared[invocation_context.invocation_id, code] = result
+        while len(self._prepared) > MAX_PREPARED_RESULTS:
+            self._prepared.popitem(last=False)
+        return None
+
+    def execute_code(
+        self,
+        invocation_context: InvocationContext,
+        code_execution_input: CodeExecutionInput,
+    ) -> CodeExecutionResult:
+        result = self._prepared.pop(
+            (invocation_context.invocation_id, code_execution_input.code), None
+        )
+        if result is None:
+            logger.debug("Running code on the event loop")
+            result = self._run(
+                _job(
+                    invocation_context,
+                    code_execution_input.code,
+                    code_execution_input.input_files,
+                )
+            )
+        return CodeExecutionResult(
+            stdout=result["stdout"],
+            stderr=result["stderr"],
+            output_files=[
+                File(name=f["name"], content=f["content"], mime_type=f["mime_type"])
+                for f in result["output_files"]
+            ],
+        )
+
+    def _run(self, job: dict) -> dict:
+        """Runs a job, or returns its cached result; safe to call from threads."""
+        cache = self.cache
+        key = None
+        if cache is not None:
+            key = cache_key(
+                job["code"],
+                [(f["name"], f["content"]) for f in job["files"]],
+                job["state"],
+            )
+        result = cache.get(key) if key else None
+        if result is not None:
+            logger.debug("Code execution cache hit %s", key[:12])
+        else:
+            start = time.perf_counter()
+            result = self.pool.run(job)
+            logger.debug("Code execution took %.3fs", time.perf_counter() - start)
+            if key and not result["error"]:
+                cache.put(key, result)
+        return result
+
+
+def _job(invocation_context: InvocationContext, code: str, input_files: list[File]) -> dict:
+    return {
+        "code": code,
+        "files": [{"name": f.name, "content": _to_base64(f.content)} for f in input_files],
+        "state": session_state_snapshot(invocation_context),
+    }
+
+
+def session_state_snapshot(invocation_context: InvocationContext) -> dict:
+    """Returns a JSON-safe copy of the session state for the code to read."""
+    state = expand_variables(dict(invocation_context.session.state))
+    return json.loads(json.dumps(state, default=str))
+
+
+def _to_base64(content) -> str:
+    """File contents arrive base64-encoded, as str or bytes."""
+    if isinstance(content, bytes):
+        return content.decode("ascii")
+    return content
@@ -0,0 +1,166 @@
+"""Worker process for the warm code executor pool.
+
+This file is started as a standalone script, never imported as part of the
+package, so a worker only pays for the interpreter, NumPy and pandas and not
+for the whole agent tree.
+
+Protocol: the parent writes one JSON job per line on stdin and the worker
+answers with one JSON result per line on its original stdout. The code being
+run gets its own in-memory stdout/stderr, and file descriptor 1 is pointed at
+/dev/null so stray writes cannot corrupt the protocol stream.
+"""
+
+import base64
+import contextlib
+import io
+import json
+import mimetypes
+import os
+import socket
+import sys
+import tempfile
+import traceback
+
+try:
+    import resource
+except ImportError:  # Not available on Windows.
+    resource = None
+
+PRELOADED_MODULES = {"np": "numpy", "pd": "pandas"}
+
+
+def _isolate_network():
+    """Best-effort removal of network access for this process.
+
+    A fresh network namespace (Linux, unprivileged user namespaces) leaves the
+    process with only a downed loopback device. It must happen before any
+    thread is started, i.e. before NumPy spins up its BLAS pool. The socket
+    guard below covers platforms where namespaces are unavailable.
+    """
+    if hasattr(os, "unshare"):
+        try:
+            os.unshare(os.CLONE_NEWUSER | os.CLONE_NEWNET)
+        except OSError:
+            pass
+
+    def _blocked(*args, **kwargs):
+        raise PermissionError("Network access is disabled in the code executor.")
+
+    for name in ("connect", "connect_ex", "bind", "sendto", "sendmsg"):
+        setattr(socket.socket, name, _blocked)
+    socket.create_connection = _blocked
+    socket.getaddrinfo = _blocked
+
+
+def _apply_memory_limit(memory_limit_mb):
+    if resource is None or not memory_limit_mb:
+        return
+    limit = memory_limit_mb * 1024 * 1024
+    _, hard = resource.getrlimit(resource.RLIMIT_AS)
+    if hard != resource.RLIM_INFINITY:
+        limit = min(limit, hard)
+    resource.setrlimit(resource.RLIMIT_AS, (limit, hard))
+
+
+@contextlib.contextmanager
+def _cpu_limit(cpu_time_limit_s):
+    """Limits the CPU seconds available to the next job.
+
+    RLIMIT_CPU counts the whole process lifetime, so the soft limit is set
+    relative to what the worker has already used. Crossing it raises SIGXCPU,
+    which terminates the worker; the pool then replaces it.
+    """
+    if resource is None or not cpu_time_limit_s:
+        yield
+        return
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    used = int(usage.ru_utime + usage.ru_stime)
+    _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+    resource.setrlimit(resource.RLIMIT_CPU, (used + cpu_time_limit_s + 1, hard))
+    try:
+        yield
+    finally:
+        resource.setrlimit(resource.RLIMIT_CPU, (hard, hard))
+
+
+def _run_job(job, preloaded, cpu_time_limit_s):
+    """Executes one job in a scratch directory and collects its outputs."""
+    stdout = io.StringIO()
+    stderr = io.StringIO()
+    with tempfile.TemporaryDirectory(prefix="code_exec_") as workdir:
+        input_names = set()
+        for file in job.get("files", []):
+            path = os.path.join(workdir, os.path.basename(file["name"]))
+            with open(path, "wb") as f:
+                f.write(base64.b64decode(file["content"]))
+            input_names.add(os.path.basename(path))
+
+        namespace = {"__name__": "__main__", "state": job.get("state", {})}
+        namespace.update(preloaded)
+
+        error = False
+        cwd = os.getcwd()
+        os.chdir(workdir)
+        try:
+            with _cpu_limit(cpu_time_limit_s), contextlib.redirect_stdout(
+                stdout
+            ), contextlib.redirect_stderr(stderr):
+                exec(compile(job["code"], "<code>", "exec"), namespace)
+        except BaseException:
+            error = True
+            stderr.write(traceback.format_exc(limit=-3))
+        finally:
+            os.chdir(cwd)
+
+        output_files = []
+        for name in sorted(os.listdir(workdir)):
+            path = os.path.join(workdir, name)
+            if name in input_names or not os.path.isfile(path):
+                continue
+            with open(path, "rb") as f:
+                content = base64.b64encode(f.read()).decode("ascii")
+            output_files.append(
+                {
+                    "name": name,
+                    "content": content,
+                    "mime_type": mimetypes.guess_type(name)[0]
+                    or "application/octet-stream",
+                }
+            )
+
+    return {
+        "stdout": stdout.getvalue(),
+        "stderr": stderr.getvalue(),
+        "output_files": output_files,
+        "error": error,
+    }
+
+
+def main():
+    limits = json.loads(sys.argv[1]) if len(sys.argv) > 1 else {}
+
+    # Keep the real stdout for the protocol and silence fd 1 for user code.
+    protocol = os.fdopen(os.dup(1), "w", encoding="utf-8")
+    devnull = os.open(os.devnull, os.O_WRONLY)
+    os.dup2(devnull, 1)
+    os.close(devnull)
+
+    _isolate_network()
+    preloaded = {
+        alias: __import__(module) for alias, module in PRELOADED_MODULES.items()
+    }
+    _apply_memory_limit(limits.get("memory_limit_mb"))
+
+    protocol.write(json.dumps({"ready": True}) + "\n")
+    protocol.flush()
+
+    for line in sys.stdin:
+        if not line.strip():
+            continue
+        result = _run_job(json.loads(line), preloaded, limits.get("cpu_time_limit_s"))
+        protocol.write(json.dumps(result) + "\n")
+        protocol.flush()
+
+
+if __name__ == "__main__":
+    main()
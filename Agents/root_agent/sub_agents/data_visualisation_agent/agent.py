@@ -1,11 +1,14 @@
 from google.adk.agents import Agent
 from .prompt import DATA_VISUALISATION_AGENT_PROMPT
-from .tools import create_bar_chart, create_table_chart
+from ...models import build_model
+from .tools import create_bar_chart, create_table_chart, create_time_series_chart
+from ...context_budget import ContextBudget, ContextBudgeter
 
 data_visualisation_agent = Agent(
     name="data_visualisation_agent",
-    model="gemini-2.5-pro",
+    model=build_model("data_visualisation_agent", "gemini-2.5-pro"),
     description="An agent that can visualise data.",
     instruction=DATA_VISUALISATION_AGENT_PROMPT,
-    tools=[create_bar_chart, create_table_chart],
+    tools=[create_bar_chart, create_table_chart, create_time_series_chart],
+    before_model_callback=ContextBudgeter(ContextBudget(keep_turns=2)),
 )
\ No newline at end of file
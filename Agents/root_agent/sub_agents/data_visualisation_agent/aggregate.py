@@ -0,0 +1,97 @@
+"""Reduces bar chart input of any size to a bounded number of bars.
+
+Categorical data is summed per label with a vectorized group-by. Beyond
+`max_bars` categories, the largest `max_bars - 1` are kept and the rest
+are summed into one "Other" bar. Ordered data (e.g. a time series) keeps
+its order and is downsampled with Largest-Triangle-Three-Buckets, which
+keeps the peaks and troughs that plain striding would drop.
+
+Input may be lists or NumPy arrays. The rendering cost then depends on
+`max_bars`, not on the input size.
+"""
+
+from typing import Sequence
+
+import numpy as np
+
+OTHER_LABEL = "Other"
+
+
+def group_sum(labels: np.ndarray, values: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Sums values per label, in order of each label's first appearance."""
+    import pandas as pd
+
+    # Hash-based, unlike np.unique, which sorts the labels.
+    codes, unique = pd.factorize(labels)
+    return np.asarray(unique), np.bincount(codes, weights=values, minlength=len(unique))
+
+
+def top_n(
+    labels: np.ndarray, values: np.ndarray, n: int, other_label: str = OTHER_LABEL
+) -> tuple[np.ndarray, np.ndarray]:
+    """Keeps the n - 1 largest bars, in their input order, plus an "Other" bar."""
+    if len(values) <= n:
+        return labels, values
+    keep = np.sort(np.argpartition(-values, n - 2)[: n - 1])
+    rest = np.ones(len(values), dtype=bool)
+    rest[keep] = False
+    return (
+        np.append(labels[keep].astype(object), other_label),
+        np.append(values[keep], values[rest].sum()),
+    )
+
+
+def lttb(values: np.ndarray, n_out: int) -> np.ndarray:
+    """Indices of n_out points chosen by Largest-Triangle-Three-Buckets.
+
+    The first and last points are always kept. Each bucket in between
+    contributes the point forming the largest triangle with the point kept
+    from the previous bucket and the mean of the next bucket.
+    """
+    n = len(values)
+    if n_out >= n:
+        return np.arange(n)
+    if n_out < 3:
+        return np.array([0, n - 1][: max(n_out, 0)], dtype=int)
+    x = np.arange(n, dtype=float)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    indices = np.empty(n_out, dtype=int)
+    indices[0], indices[-1] = 0, n - 1
+    previous = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        next_x = x[end:next_end].mean() if next_end > end else x[-1]
+        next_y = values[end:next_end].mean() if next_end > end else values[-1]
+        area = np.abs(
+            (x[previous] - next_x) * (values[start:end] - values[previous])
+            - (x[previous] - x[start:end]) * (next_y - values[previous])
+        )
+        previous = start + int(np.argmax(area))
+        indices[i + 1] = previous
+    return indices
+
+
+def prepare_bars(
+    labels: Sequence, values: Sequence, max_bars: int, ordered: bool = False
+) -> tuple[np.ndarray, np.ndarray]:
+    """Returns at most max_bars (label, value) bars for the input.
+
+    Args:
+        labels: One label per value.
+        values: The bar heights.
+        max_bars: Maximum number of bars to draw.
+        ordered: Whether the input is a series whose order matters (e.g. by
+            time). Ordered input is downsampled instead of aggregated.
+    """
+    labels = np.asarray(labels)
+    values = np.asarray(values, dtype=float)
+    if len(labels) != len(values):
+        raise ValueError(f"Got {len(labels)} labels for {len(values)} values.")
+    if ordered:
+        if len(values) > max_bars:
+            keep = lttb(values, max_bars)
+            return labels[keep], values[keep]
+        return labels, values
+    labels, values = group_sum(labels.astype(str).astype(object), values)
+    return top_n(labels, values, max_bars)
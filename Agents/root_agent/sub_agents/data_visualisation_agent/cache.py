@@ -0,0 +1,189 @@
+"""Content-addressed naming and file cache of rendered charts.
+
+A chart is keyed on the hash of its type, data, labels and styling (plus
+the renderer version), so an identical request returns the existing file
+without rendering, and different data under the same title gets a file of
+its own. Files live in one directory per session, so sessions never share
+or overwrite each other's charts. A small SQLite index tracks them and
+evicts the least recently used once the entry count or disk quota is
+exceeded.
+
+The servers save charts as session artifacts instead (see tools.py), under
+the same content-addressed names; the file cache serves tools called
+without an artifact service.
+"""
+
+import functools
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+from .config import CHART_CACHE_MAX_BYTES, CHART_CACHE_MAX_ENTRIES, CHARTS_DIR
+from .render import RENDER_VERSION
+
+logger = logging.getLogger(__name__)
+
+MIME_TYPES = {
+    "png": "image/png",
+    "svg": "image/svg+xml",
+    "csv": "text/csv",
+    "html": "text/html",
+}
+
+
+def _encode(value):
+    # NumPy arrays: hash the buffer rather than printing (and truncating) it.
+    if hasattr(value, "dtype") and hasattr(value, "tobytes"):
+        if value.dtype.kind == "O":
+            return value.tolist()
+        digest = hashlib.sha256(value.tobytes()).hexdigest()
+        return f"{value.dtype}{value.shape}:{digest}"
+    return str(value)
+
+
+def chart_key(kind: str, /, **spec) -> str:
+    """Hex digest identifying a chart by everything that affects its pixels."""
+    canonical = json.dumps(
+        {"kind": kind, "version": RENDER_VERSION, "spec": spec}, sort_keys=True, default=_encode
+    )
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def chart_filename(name: str, key: str, extension: str) -> str:
+    """A file or artifact name that is readable and unique per chart key."""
+    slug = re.sub(r"[^A-Za-z0-9_.-]+", "_", name)[:64]
+    return f"{slug}-{key[:16]}.{extension}"
+
+
+def session_namespace(session_id: str) -> str:
+    """A directory name for a session that is safe whatever the session id."""
+    return hashlib.sha256(session_id.encode()).hexdigest()[:16]
+
+
+class ChartCache:
+    """LRU cache of chart files, bounded by entry count and disk quota."""
+
+    def __init__(self, root: str, max_entries: int, max_bytes: int):
+        self.root = root
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+        self._db = sqlite3.connect(
+            os.path.join(root, "index.db"), check_same_thread=False, isolation_level=None
+        )
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS charts ("
+            " namespace TEXT NOT NULL,"
+            " key TEXT NOT NULL,"
+            " path TEXT NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " last_access REAL NOT NULL,"
+            " PRIMARY KEY (namespace, key))"
+        )
+        self._db.execute(
+            "CREATE INDEX IF NOT EXISTS charts_last_access ON charts (last_access)"
+        )
+
+    def get(self, namespace: str, key: str) -> Optional[str]:
+        """Returns the path of a cached chart and marks it as recently used."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT path FROM charts WHERE namespace = ? AND key = ?", (namespace, key)
+            ).fetchone()
+            if row is not None and not os.path.exists(row[0]):
+                self._db.execute(
+                    "DELETE FROM charts WHERE namespace = ? AND key = ?", (namespace, key)
+                )
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+            self._db.execute(
+                "UPDATE charts SET last_access = ? WHERE namespace = ? AND key = ?",
+                (time.time(), namespace, key),
+            )
+            self.hits += 1
+        return row[0]
+
+    def put(self, namespace: str, key: str, name: str, data: bytes, extension: str = "png") -> str:
+        """Writes a chart file, then evicts old charts until within bounds.
+
+        Args:
+            namespace: The session's directory, from `session_namespace`.
+            key: The chart's `chart_key`.
+            name: A human-readable name for the file, e.g. the title.
+            data: The rendered chart or table export.
+            extension: The file extension, a key of MIME_TYPES.
+
+        Returns:
+            The path of the written file.
+        """
+        directory = os.path.join(self.root, namespace)
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, chart_filename(name, key, extension))
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO charts (namespace, key, path, size, last_access)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (namespace, key, path, len(data), time.time()),
+            )
+            self._evict()
+        return path
+
+    def _evict(self) -> None:
+        count, total = self._db.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM charts"
+        ).fetchone()
+        if count <= self.max_entries and total <= self.max_bytes:
+            return
+        evicted = 0
+        for namespace, key, path, size in self._db.execute(
+            "SELECT namespace, key, path, size FROM charts ORDER BY last_access"
+        ).fetchall():
+            if count <= self.max_entries and total <= self.max_bytes:
+                break
+            self._db.execute(
+                "DELETE FROM charts WHERE namespace = ? AND key = ?", (namespace, key)
+            )
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            count -= 1
+            total -= size
+            evicted += 1
+        logger.debug("Evicted %d cached charts", evicted)
+
+    def stats(self) -> dict:
+        with self._lock:
+            count, total = self._db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM charts"
+            ).fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "entries": count,
+            "bytes": total,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+@functools.cache
+def chart_cache() -> ChartCache:
+    """The process-wide chart cache, created on the first chart."""
+    return ChartCache(CHARTS_DIR, CHART_CACHE_MAX_ENTRIES, CHART_CACHE_MAX_BYTES)
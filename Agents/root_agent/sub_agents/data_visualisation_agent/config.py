@@ -0,0 +1,28 @@
+"""Configuration for the data visualisation agent's chart rendering."""
+
+import os
+
+# Charts render in this many worker processes (see render.py). 0 renders in
+# a thread of the server process instead.
+RENDER_POOL_SIZE = int(os.getenv("CHART_RENDER_POOL_SIZE", "2"))
+# Maximum time a tool waits for one chart.
+RENDER_TIMEOUT_S = 30.0
+
+# Bar charts draw at most this many bars by default (top categories plus
+# "Other", or a downsampled series; see aggregate.py), and never more than
+# MAX_BARS_LIMIT, so render time does not grow with the input.
+MAX_BARS = 30
+MAX_BARS_LIMIT = 500
+
+# Rendered charts, one directory per session (see cache.py).
+CHARTS_DIR = os.getenv(
+    "CHARTS_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "charts")
+)
+CHART_CACHE_MAX_ENTRIES = 2000
+CHART_CACHE_MAX_BYTES = 256 * 1024 * 1024
+
+# Tables are drawn as page images of TABLE_PAGE_ROWS rows each, all the same
+# size. Above TABLE_IMAGE_MAX_ROWS rows they are written as CSV and HTML
+# files instead (see table.py).
+TABLE_PAGE_ROWS = 25
+TABLE_IMAGE_MAX_ROWS = 250
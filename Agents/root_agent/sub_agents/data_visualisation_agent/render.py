@@ -0,0 +1,231 @@
+"""Chart rendering off the event loop.
+
+The render functions build each chart on its own `matplotlib.figure.Figure`
+with the Agg canvas and return the image bytes, PNG or SVG. They touch no
+pyplot state, so concurrent renders cannot draw into each other's figures.
+
+`ChartRenderer` runs them in a pool of worker processes, so a render takes
+neither the event loop nor the server's GIL. Workers are spawned (not
+forked from the threaded server) and warmed by importing matplotlib and
+drawing a throwaway chart, which also loads the font cache. This module
+must stay cheap to import: workers import it by name.
+"""
+
+import asyncio
+import atexit
+import functools
+import io
+import logging
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, List, Optional, Sequence
+
+from .config import MAX_BARS, RENDER_POOL_SIZE, RENDER_TIMEOUT_S, TABLE_PAGE_ROWS
+
+logger = logging.getLogger(__name__)
+
+# Part of every chart cache key; bump it when a change alters the output.
+RENDER_VERSION = 3
+# Up to this many bars are drawn as labelled bars; longer series as one
+# filled step patch with SERIES_TICK_LABELS x tick labels.
+MAX_LABELLED_BARS = 40
+SERIES_TICK_LABELS = 12
+# More labelled bars than this get rotated labels.
+UNROTATED_LABELS = 8
+# Table pages: the height of a row and of the title band, in inches.
+TABLE_ROW_HEIGHT_IN = 0.3
+TABLE_TITLE_HEIGHT_IN = 0.6
+# Per image format; SVG omits its timestamp so identical charts are identical.
+_METADATA = {"png": {}, "svg": {"Date": None}}
+
+
+def _image(fig, image_format: str = "png", **save_kwargs) -> bytes:
+    import matplotlib
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    FigureCanvasAgg(fig)
+    buffer = io.BytesIO()
+    # SVG keeps text as text rather than glyph paths: smaller and selectable.
+    with matplotlib.rc_context({"svg.fonttype": "none", "svg.hashsalt": "chart"}):
+        fig.savefig(buffer, format=image_format, metadata=_METADATA[image_format], **save_kwargs)
+    return buffer.getvalue()
+
+
+def render_bar_chart(
+    labels: Sequence,
+    values: Sequence[float],
+    title: str,
+    x_label: str,
+    y_label: str,
+    max_bars: int = MAX_BARS,
+    ordered: bool = False,
+    image_format: str = "png",
+) -> bytes:
+    """Draws at most max_bars bars, aggregating or downsampling the input."""
+    from matplotlib.figure import Figure
+
+    from .aggregate import prepare_bars
+
+    labels, values = prepare_bars(labels, values, max_bars, ordered)
+    fig = Figure()
+    ax = fig.add_subplot(111)
+    if len(labels) <= MAX_LABELLED_BARS:
+        ax.bar([str(label) for label in labels], values)
+        if len(labels) > UNROTATED_LABELS:
+            ax.tick_params(axis="x", labelrotation=45)
+    else:
+        # One filled step patch instead of hundreds of bar patches.
+        positions = range(len(labels))
+        ax.stairs(values, [p - 0.5 for p in range(len(labels) + 1)], fill=True)
+        step = -(-len(labels) // SERIES_TICK_LABELS)
+        ax.set_xticks(
+            positions[::step],
+            [str(label) for label in labels[::step]],
+            rotation=45,
+            ha="right",
+        )
+    ax.set_title(title)
+    ax.set_xlabel(x_label)
+    ax.set_ylabel(y_label)
+    if len(labels) > UNROTATED_LABELS:
+        fig.tight_layout()
+    return _image(fig, image_format)
+
+
+def render_time_series(
+    times: Sequence,
+    values: Sequence[Sequence[float]],
+    names: Sequence[str],
+    title: str,
+    x_label: str,
+    y_label: str,
+    kind: str = "line",
+    image_format: str = "png",
+) -> bytes:
+    """Draws one line, or one bar per period, for each named series.
+
+    values has one row per time and one column per name; NaN marks a time
+    without a value, which lines skip and bars leave empty.
+    """
+    import numpy as np
+    from matplotlib.figure import Figure
+
+    times = np.asarray(times, dtype="datetime64[D]")
+    values = np.asarray(values, dtype=float).reshape(len(times), len(names))
+    fig = Figure()
+    ax = fig.add_subplot(111)
+    if kind == "bar":
+        positions = np.arange(len(times))
+        width = 0.8 / max(len(names), 1)
+        for j, name in enumerate(names):
+            ax.bar(positions - 0.4 + width * (j + 0.5), values[:, j], width, label=name)
+        step = -(-len(times) // SERIES_TICK_LABELS)
+        ax.set_xticks(
+            positions[::step],
+            [str(time) for time in times[::step]],
+            rotation=45 if len(times) > UNROTATED_LABELS else 0,
+            ha="right" if len(times) > UNROTATED_LABELS else "center",
+        )
+    else:
+        for j, name in enumerate(names):
+            present = ~np.isnan(values[:, j])
+            ax.plot(
+                times[present],
+                values[present, j],
+                marker="o" if present.sum() <= MAX_LABELLED_BARS else None,
+                label=name,
+            )
+        fig.autofmt_xdate()
+    if len(names) > 1:
+        ax.legend()
+    ax.set_title(title)
+    ax.set_xlabel(x_label)
+    ax.set_ylabel(y_label)
+    fig.tight_layout()
+    return _image(fig, image_format)
+
+
+def render_table_chart(
+    data: List[List[str]],
+    columns: List[str],
+    title: str,
+    page_rows: int = TABLE_PAGE_ROWS,
+    image_format: str = "png",
+) -> bytes:
+    """Draws one page of a table on a figure sized for page_rows rows.
+
+    The figure size does not depend on len(data), so every page of a table
+    is the same size and a short last page is padded below.
+    """
+    from matplotlib.figure import Figure
+
+    height = (page_rows + 1) * TABLE_ROW_HEIGHT_IN + TABLE_TITLE_HEIGHT_IN
+    fig = Figure(figsize=(8, height))
+    ax = fig.add_axes((0.02, 0.02, 0.96, 1 - TABLE_TITLE_HEIGHT_IN / height - 0.02))
+    ax.set_axis_off()
+
+    # Rows keep the same height on every page: the table fills the share of
+    # the axes that its rows would take on a full page.
+    cells = data or [[""] * len(columns)]
+    share = (len(cells) + 1) / (page_rows + 1)
+    table = ax.table(cellText=cells, colLabels=columns, bbox=(0, 1 - share, 1, share))
+    table.auto_set_font_size(False)
+    table.set_fontsize(10)
+
+    fig.suptitle(title)
+    return _image(fig, image_format)
+
+
+def _warm_up() -> None:
+    render_bar_chart(["a"], [1.0], "warm-up", "x", "y")
+
+
+class ChartRenderer:
+    """Async front end to a pool of warm chart rendering processes."""
+
+    def __init__(self, size: int = RENDER_POOL_SIZE, timeout_s: float = RENDER_TIMEOUT_S):
+        self.size = size
+        self.timeout_s = timeout_s
+        self._pool: Optional[Executor] = None
+        atexit.register(self.shutdown)
+
+    def start(self) -> None:
+        """Spawns and warms the workers in the background; returns at once."""
+        if self._pool is not None or self.size <= 0:
+            return
+        self._pool = ProcessPoolExecutor(
+            max_workers=self.size,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_warm_up,
+        )
+        # One job per worker makes the pool spawn all of them now.
+        for _ in range(self.size):
+            self._pool.submit(int)
+        logger.info("Started %d chart render workers", self.size)
+
+    async def render(self, fn: Callable[..., bytes], *args, **kwargs) -> bytes:
+        """Runs `fn(*args, **kwargs)` in a worker and returns the image bytes."""
+        job = functools.partial(fn, *args, **kwargs)
+        if self.size <= 0:
+            return await asyncio.wait_for(asyncio.to_thread(job), self.timeout_s)
+        try:
+            return await self._submit(job)
+        except BrokenProcessPool:
+            # A worker died (e.g. killed for memory); start a fresh pool.
+            logger.warning("Chart render pool broke; restarting it")
+            self.shutdown()
+            return await self._submit(job)
+
+    async def _submit(self, job: Callable[[], bytes]) -> bytes:
+        self.start()
+        future = asyncio.get_running_loop().run_in_executor(self._pool, job)
+        return await asyncio.wait_for(future, self.timeout_s)
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+chart_renderer = ChartRenderer()
@@ -0,0 +1,83 @@
+"""Time series from the session's `list_of_variables`.
+
+The transform agents store `list_of_variables` as typed columns, which
+the session state refers to (see transform_agent/variables.py); older
+sessions hold the canonical JSON of `Data` or a list of `Variable` dicts
+(a session's initial state). Columns are read directly, other values are
+validated, and the rows are then pivoted to one column per variable over a time index and
+optionally resampled to a calendar frequency, all with vectorized pandas
+operations, so the model never has to copy the data into tool arguments.
+"""
+
+from typing import Any, List, Optional
+
+from ..transform_agent.parsing import DATA_ADAPTER, parse_data, repair_data
+from ..transform_agent.variables import STATE_KEY, variables_view
+
+# Resampling frequencies the tool accepts, as pandas offset aliases
+# (periods are labelled by their first day).
+FREQUENCIES = {"day": "D", "week": "W-MON", "month": "MS", "quarter": "QS", "year": "YS"}
+AGGREGATIONS = ("sum", "mean", "min", "max", "last")
+
+
+def variables_frame(raw: Any):
+    """The `Variable` rows of a state value as a (variable, value, time) DataFrame.
+
+    Raises:
+        OutputRepairError: If a JSON string value is not valid `Data`.
+        pydantic.ValidationError: If a list or dict value is not valid `Data`.
+        VariablesUnavailableError: If the store does not hold the columns a
+            reference points to.
+    """
+    import numpy as np
+    import pandas as pd
+
+    view = variables_view(raw)
+    if view is not None:
+        columns = view.columns
+        return pd.DataFrame(
+            {
+                "variable": np.asarray(columns.names, dtype=object)[
+                    np.asarray(columns.codes, dtype=np.int64)
+                ],
+                "value": np.asarray(columns.values, dtype=np.int64),
+                "time": np.asarray(columns.days, dtype="datetime64[D]").astype(
+                    "datetime64[ns]"
+                ),
+            }
+        )
+    if isinstance(raw, str):
+        data = parse_data(raw)
+    else:
+        data = DATA_ADAPTER.validate_python(repair_data(raw))
+    frame = pd.DataFrame(
+        [v.model_dump() for v in data.list_of_variables], columns=["variable", "value", "time"]
+    )
+    frame["time"] = pd.to_datetime(frame["time"], format="%Y-%m-%d")
+    return frame
+
+
+def pivot_series(
+    frame,
+    variables: Optional[List[str]] = None,
+    freq: str = "",
+    agg: str = "sum",
+):
+    """One column per variable, indexed by time and sorted.
+
+    Values of a variable at the same time are summed. With a freq (a key of
+    FREQUENCIES), each variable is resampled with agg; periods without data
+    are NaN, as are times at which a variable has no value.
+    """
+    if variables:
+        frame = frame[frame["variable"].isin(variables)]
+    table = frame.pivot_table(
+        index="time", columns="variable", values="value", aggfunc="sum", sort=True
+    )
+    if variables:
+        table = table.reindex(columns=[v for v in variables if v in table.columns])
+    if freq:
+        resampled = table.resample(FREQUENCIES[freq])
+        # min_count keeps empty periods as gaps rather than zeros.
+        table = resampled.sum(min_count=1) if agg == "sum" else resampled.agg(agg)
+    return table.astype(float)
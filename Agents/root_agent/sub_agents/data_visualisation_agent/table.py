@@ -0,0 +1,61 @@
+"""Table layout helpers: column-wise cell text, pages and text exports.
+
+Cell text is computed one column at a time: each column's formatter is
+chosen once from its values (numeric columns get a compact number
+format, the rest `str`), then applied to the whole column. Rows are then
+sliced into pages of a fixed number of rows, or written out as CSV and
+HTML when there are too many rows for images to be useful.
+"""
+
+import csv
+import html
+import io
+from numbers import Number
+from typing import Callable, List, Sequence
+
+
+def _formatter(column: Sequence) -> Callable[[object], str]:
+    present = [value for value in column if value is not None and value != ""]
+    if present and all(
+        isinstance(value, Number) and not isinstance(value, bool) for value in present
+    ):
+        # Drops float noise such as 0.1 + 0.2 == 0.30000000000000004.
+        return lambda value: "" if value is None or value == "" else f"{value:.10g}"
+    return lambda value: "" if value is None else str(value)
+
+
+def format_cells(data: List[List], columns: List[str]) -> List[List[str]]:
+    """Cell text for data, with short rows padded and long rows truncated."""
+    width = len(columns)
+    cells_by_column = []
+    for j in range(width):
+        column = [row[j] if j < len(row) else "" for row in data]
+        cells_by_column.append(list(map(_formatter(column), column)))
+    return [list(row) for row in zip(*cells_by_column)] if width else [[] for _ in data]
+
+
+def page_ranges(rows: int, page_rows: int) -> List[tuple[int, int]]:
+    """(start, end) row slices of each page; a table with no rows has one page."""
+    return [(start, min(start + page_rows, rows)) for start in range(0, rows, page_rows)] or [(0, 0)]
+
+
+def to_csv(cells: List[List[str]], columns: List[str]) -> bytes:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    writer.writerows(cells)
+    return buffer.getvalue().encode()
+
+
+def to_html(cells: List[List[str]], columns: List[str], title: str) -> bytes:
+    head = "".join(f"<th>{html.escape(c)}</th>" for c in columns)
+    body = "\n".join(
+        "<tr>" + "".join(f"<td>{html.escape(cell)}</td>" for cell in row) + "</tr>"
+        for row in cells
+    )
+    return (
+        f"<!DOCTYPE html>\n<html><head><meta charset=\"utf-8\">"
+        f"<title>{html.escape(title)}</title></head><body>\n"
+        f"<h1>{html.escape(title)}</h1>\n<table>\n<thead><tr>{head}</tr></thead>\n"
+        f"<tbody>\n{body}\n</tbody>\n</table>\n</body></html>\n"
+    ).encode()
@@ -1,22 +1,102 @@
-import matplotlib.pyplot as plt
-import os
-from typing import List
-import pandas as pd
-from google.adk.tools import agent_tool
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, List, Optional, Tuple
+from google.adk.tools.tool_context import ToolContext
+from google.genai import types
 
-# Ensure the 'charts' directory exists
-CHARTS_DIR = os.path.join(os.path.dirname(__file__), 'charts')
-os.makedirs(CHARTS_DIR, exist_ok=True)
+from ..transform_agent.variables import VariablesUnavailableError
+from .cache import MIME_TYPES, chart_cache, chart_filename, chart_key, session_namespace
+from .config import MAX_BARS, MAX_BARS_LIMIT, TABLE_IMAGE_MAX_ROWS, TABLE_PAGE_ROWS
+from .render import chart_renderer, render_bar_chart, render_table_chart, render_time_series
+from .series import AGGREGATIONS, FREQUENCIES, STATE_KEY, pivot_series, variables_frame
+from .table import format_cells, page_ranges, to_csv, to_html
 
-def create_bar_chart(
+logger = logging.getLogger(__name__)
+
+IMAGE_FORMATS = ("png", "svg")
+
+
+async def _save(
+    tool_context: Optional[ToolContext],
+    name: str,
+    key: str,
+    extension: str,
+    produce: Callable[[], Awaitable[bytes]],
+) -> str:
+    """Saves a chart once per session and returns its artifact name.
+
+    With the runner's artifact service, the chart becomes a session
+    artifact; one with the same key is reused, not rendered again, and
+    announced again in this event so that clients receive it. Without one
+    (e.g. a tool called directly), it goes to the file cache and the file
+    path is returned instead.
+    """
+    invocation = tool_context._invocation_context if tool_context else None
+    if invocation is None or invocation.artifact_service is None:
+        cache = chart_cache()
+        namespace = session_namespace(invocation.session.id if invocation else "")
+        file_path = cache.get(namespace, key)
+        if file_path is None:
+            file_path = cache.put(namespace, key, name, await produce(), extension)
+        return file_path
+
+    filename = chart_filename(name, key, extension)
+    versions = await invocation.artifact_service.list_versions(
+        app_name=invocation.app_name,
+        user_id=invocation.user_id,
+        session_id=invocation.session.id,
+        filename=filename,
+    )
+    if versions:
+        logger.debug("Chart artifact hit %s", filename)
+        tool_context.actions.artifact_delta[filename] = max(versions)
+    else:
+        artifact = types.Part.from_bytes(data=await produce(), mime_type=MIME_TYPES[extension])
+        await tool_context.save_artifact(filename, artifact)
+    return filename
+
+
+async def _chart(
+    tool_context: Optional[ToolContext],
+    render: Callable[..., bytes],
+    image_format: str,
+    **spec,
+) -> str:
+    """Saves the chart, rendering it only if this session lacks it."""
+    key = chart_key(render.__name__, image_format=image_format, **spec)
+    return await _save(
+        tool_context,
+        spec["title"],
+        key,
+        image_format,
+        lambda: chart_renderer.render(render, image_format=image_format, **spec),
+    )
+
+
+def _unsupported_format(image_format: str) -> Optional[str]:
+    if image_format in IMAGE_FORMATS:
+        return None
+    return f"Unsupported image_format {image_format!r}; use one of {', '.join(IMAGE_FORMATS)}."
+
+
+async def create_bar_chart(
     labels: List[str],
     values: List[float],
     title: str = "Bar Chart",
     x_label: str = "X-axis",
-    y_label: str = "Y-axis"
+    y_label: str = "Y-axis",
+    max_bars: int = MAX_BARS,
+    ordered: bool = False,
+    image_format: str = "png",
+    tool_context: Optional[ToolContext] = None,
 ) -> str:
     """
-    Creates a bar chart and saves it as a PNG file.
+    Creates a bar chart and saves it as an image artifact.
+
+    Unless ordered, values with the same label are summed, and with more
+    than max_bars labels the largest categories are drawn and the rest are
+    summed into "Other". An ordered series keeps one bar per value and is
+    downsampled instead, keeping its peaks.
 
     Args:
         labels: A list of strings for the x-axis labels.
@@ -24,87 +104,206 @@ def create_bar_chart(
         title: The title of the chart.
         x_label: The label for the x-axis.
         y_label: The label for the y-axis.
+        max_bars: The maximum number of bars to draw (at most 500).
+        ordered: True if the labels are a sequence whose order matters, such
+            as years or dates.
+        image_format: "png", or "svg" for a vector image that stays sharp
+            when scaled; best for small charts.
 
     Returns:
-        The file path of the generated chart image.
+        The artifact name of the generated chart image.
     """
-    plt.figure()
-    plt.bar(labels, values)
-    plt.title(title)
-    plt.xlabel(x_label)
-    plt.ylabel(y_label)
-    
-    file_path = os.path.join(CHARTS_DIR, f"{title.replace(' ', '_')}.png")
-    plt.savefig(file_path)
-    plt.close()
-    
-    return f"Chart saved at: {file_path}"
-
-def create_table_chart(
+    error = _unsupported_format(image_format)
+    if error:
+        return error
+    name = await _chart(
+        tool_context,
+        render_bar_chart,
+        image_format,
+        labels=labels,
+        values=values,
+        title=title,
+        x_label=x_label,
+        y_label=y_label,
+        max_bars=min(max(max_bars, 2), MAX_BARS_LIMIT),
+        ordered=ordered,
+    )
+
+    return f"Chart saved as: {name}"
+
+
+def _state_series(
+    raw: Any, variables: Optional[List[str]], freq: str, agg: str
+) -> Tuple[Any, Any, List[str]]:
+    """(times, values, names) of list_of_variables, pivoted and resampled."""
+    table = pivot_series(variables_frame(raw), variables, freq, agg)
+    return table.index.values.astype("datetime64[D]"), table.to_numpy(), list(table.columns)
+
+
+async def create_time_series_chart(
+    title: str = "Time Series",
+    variables: Optional[List[str]] = None,
+    kind: str = "line",
+    freq: str = "",
+    agg: str = "sum",
+    y_label: str = "Value",
+    image_format: str = "png",
+    tool_context: Optional[ToolContext] = None,
+) -> str:
+    """
+    Charts variables from list_of_variables over time, reading the data itself.
+
+    The data comes from the session's list_of_variables; never pass the
+    data, only which variables to chart and how. Values of a variable at
+    the same date are summed.
+
+    Args:
+        title: The title of the chart.
+        variables: The variable names to chart, one line or bar series each.
+            Leave empty to chart every variable.
+        kind: "line" or "bar".
+        freq: Resample to "day", "week", "month", "quarter" or "year".
+            Leave empty to keep the original dates.
+        agg: How values are combined within each period when resampling:
+            "sum", "mean", "min", "max" or "last".
+        y_label: The label for the y-axis.
+        image_format: "png", or "svg" for a vector image.
+
+    Returns:
+        The artifact name of the generated chart image and a summary of the
+        series drawn.
+    """
+    error = _unsupported_format(image_format)
+    if error:
+        return error
+    if kind not in ("line", "bar"):
+        return f"Unsupported kind {kind!r}; use line or bar."
+    if freq and freq not in FREQUENCIES:
+        return f"Unsupported freq {freq!r}; use one of {', '.join(FREQUENCIES)}."
+    if agg not in AGGREGATIONS:
+        return f"Unsupported agg {agg!r}; use one of {', '.join(AGGREGATIONS)}."
+    raw = tool_context.state.get(STATE_KEY) if tool_context else None
+    if not raw:
+        return "There is no list_of_variables data in this session to chart."
+
+    try:
+        times, values, names = await asyncio.to_thread(
+            _state_series, raw, variables, freq, agg
+        )
+    except ValueError as e:
+        return f"list_of_variables is not valid: {e}"
+    except VariablesUnavailableError as e:
+        return f"list_of_variables cannot be read on this server: {e}"
+    if not names:
+        return f"None of {variables} are in list_of_variables."
+    missing = [v for v in variables or [] if v not in names]
+    periods = "periods" if freq else "dates"
+    if kind == "bar" and len(times) * len(names) > MAX_BARS_LIMIT:
+        return (
+            f"{len(names)} series over {len(times)} {periods} is too many bars; "
+            f"use a coarser freq, fewer variables or kind='line'."
+        )
+
+    name = await _chart(
+        tool_context,
+        render_time_series,
+        image_format,
+        times=times,
+        values=values,
+        names=names,
+        title=title,
+        x_label="Date",
+        y_label=y_label,
+        kind=kind,
+    )
+    summary = (
+        f"Chart saved as: {name}\n"
+        f"{len(names)} series ({', '.join(names)}) over {len(times)} {periods} "
+        f"from {times[0]} to {times[-1]}."
+    )
+    if missing:
+        summary += f" Not in list_of_variables: {', '.join(missing)}."
+    return summary
+
+
+async def create_table_chart(
     data: List[List[str]],
     columns: List[str],
-    title: str = "Table"
+    title: str = "Table",
+    image_format: str = "png",
+    tool_context: Optional[ToolContext] = None,
 ) -> str:
     """
-    Creates a table chart and saves it as a PNG file.
+    Creates a table chart and saves it as one or more image artifacts.
+
+    Each page holds up to 25 rows. Tables with more than 250 rows are saved
+    as a CSV artifact and an HTML artifact instead of images.
 
     Args:
         data: A list of lists representing the table rows.
         columns: A list of strings for the column headers.
         title: The title of the table.
+        image_format: "png", or "svg" for vector page images.
 
     Returns:
-        The file path of the generated chart image.
+        The number of pages, and the row range and artifact name of each
+        page (or the CSV and HTML artifact names for large tables).
     """
-    plt.figure(figsize=(8, len(data) * 0.5))
-    ax = plt.subplot(111, frame_on=False)
-    ax.xaxis.set_visible(False)
-    ax.yaxis.set_visible(False)
-    
-    table = ax.table(cellText=data, colLabels=columns, loc='center')
-    table.auto_set_font_size(False)
-    table.set_fontsize(10)
-    table.scale(1.2, 1.2)
-    
-    plt.title(title)
-    
-    file_path = os.path.join(CHARTS_DIR, f"{title.replace(' ', '_')}.png")
-    plt.savefig(file_path, bbox_inches='tight', pad_inches=0.05)
-    plt.close()
-    
-    return f"Table chart saved at: {file_path}"
-
-# if __name__ == "__main__":
-#     # This block of code will only run when you execute this script directly.
-#     # It will NOT run when the agent imports these functions.
-#     print("--- Testing visualization tools ---")
-
-#     # 1. Test the bar chart tool
-#     print("\nTesting create_bar_chart...")
-#     bar_labels = ["Apples", "Bananas", "Oranges"]
-#     bar_values = [10, 15, 7]
-#     bar_result = create_bar_chart(
-#         labels=bar_labels,
-#         values=bar_values,
-#         title="Fruit Sales",
-#         x_label="Fruit",
-#         y_label="Quantity Sold"
-#     )
-#     print(f"Bar chart test complete. {bar_result}")
-
-#     # 2. Test the table chart tool
-#     print("\nTesting create_table_chart...")
-#     table_columns = ["Product", "Price", "In Stock"]
-#     table_data = [
-#         ["Laptop", "$1200", "Yes"],
-#         ["Mouse", "$25", "Yes"],
-#         ["Keyboard", "$75", "No"]
-#     ]
-#     table_result = create_table_chart(
-#         data=table_data,
-#         columns=table_columns,
-#         title="Inventory"
-#     )
-#     print(f"Table chart test complete. {table_result}")
-
-#     print("\n\nAll tests finished. Check the 'charts' directory for the output images.")
+    error = _unsupported_format(image_format)
+    if error:
+        return error
+    cells = format_cells(data, columns)
+    if len(cells) > TABLE_IMAGE_MAX_ROWS:
+        spec = dict(data=cells, columns=columns, title=title)
+        csv_name, html_name = await asyncio.gather(
+            _save(
+                tool_context,
+                title,
+                chart_key("to_csv", **spec),
+                "csv",
+                lambda: asyncio.to_thread(to_csv, cells, columns),
+            ),
+            _save(
+                tool_context,
+                title,
+                chart_key("to_html", **spec),
+                "html",
+                lambda: asyncio.to_thread(to_html, cells, columns, title),
+            ),
+        )
+        return (
+            f"Table has {len(cells)} rows, too many for images; "
+            f"saved as CSV: {csv_name} and as HTML: {html_name}"
+        )
+
+    pages = page_ranges(len(cells), TABLE_PAGE_ROWS)
+    if len(pages) == 1:
+        # A single page is sized to its rows.
+        name = await _chart(
+            tool_context,
+            render_table_chart,
+            image_format,
+            data=cells,
+            columns=columns,
+            title=title,
+            page_rows=max(len(cells), 1),
+        )
+        return f"Table chart saved as: {name}"
+
+    names = await asyncio.gather(
+        *(
+            _chart(
+                tool_context,
+                render_table_chart,
+                image_format,
+                data=cells[start:end],
+                columns=columns,
+                title=f"{title} (rows {start + 1}-{end} of {len(cells)})",
+            )
+            for start, end in pages
+        )
+    )
+    lines = [
+        f"- rows {start + 1}-{end}: {name}" for (start, end), name in zip(pages, names)
+    ]
+    return f"Table chart saved as {len(pages)} pages:\n" + "\n".join(lines)
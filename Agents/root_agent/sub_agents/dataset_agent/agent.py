@@ -0,0 +1,14 @@
+from google.adk.agents import Agent
+from .prompt import DATASET_AGENT_PROMPT
+from ...models import build_model
+from .tools import describe_dataset, ingest_dataset, query_dataset
+from ...context_budget import ContextBudget, ContextBudgeter
+
+dataset_agent = Agent(
+    name="dataset_agent",
+    model=build_model("dataset_agent", "gemini-2.5-pro"),
+    description="An agent that loads uploaded CSV or Parquet files and answers questions about them with local aggregate queries.",
+    instruction=DATASET_AGENT_PROMPT,
+    tools=[ingest_dataset, describe_dataset, query_dataset],
+    before_model_callback=ContextBudgeter(ContextBudget(keep_turns=3)),
+)
@@ -0,0 +1,21 @@
+"""Configuration for the dataset agent's columnar store."""
+
+import os
+import tempfile
+
+# Ingested datasets are kept here as Arrow IPC files, one directory per
+# session, and memory-mapped for queries (see store.py). They can be
+# rebuilt from the session's artifacts, so any local scratch disk will do.
+DATASETS_DIR = os.getenv(
+    "DATASETS_DIR", os.path.join(tempfile.gettempdir(), "zadkguide-datasets")
+)
+# Memory-mapped datasets kept open per process.
+OPEN_DATASETS = 16
+
+# Rows returned to the model: a sample on ingestion, and at most
+# QUERY_MAX_ROWS result rows per query (QUERY_DEFAULT_ROWS unless asked).
+SAMPLE_ROWS = 5
+QUERY_DEFAULT_ROWS = 20
+QUERY_MAX_ROWS = 100
+# Most frequent values listed per text column by describe_dataset.
+TOP_VALUES = 5
@@ -0,0 +1,271 @@
+"""Columnar dataset storage and vectorized aggregate queries.
+
+Uploaded CSV or Parquet bytes are parsed once into an Arrow table and
+written as an uncompressed Arrow IPC file. Queries memory-map that file,
+so opening a dataset reads no data up front and the OS page cache is
+shared between queries, sessions and worker processes. Filters, group-bys
+and aggregates run in Arrow compute kernels; only the small result is
+converted to Python for the model.
+
+pyarrow is imported on first use, like the other heavy tool libraries.
+"""
+
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, List, Optional
+
+from .config import OPEN_DATASETS, TOP_VALUES
+
+# Parquet files start (and end) with this magic number.
+PARQUET_MAGIC = b"PAR1"
+
+_FILTER = re.compile(
+    r"^\s*([A-Za-z_][\w .-]*?)\s*(==|!=|>=|<=|>|<|=| in | contains )\s*(.+?)\s*$"
+)
+_COMPARISONS = {
+    "==": "equal",
+    "=": "equal",
+    "!=": "not_equal",
+    ">": "greater",
+    ">=": "greater_equal",
+    "<": "less",
+    "<=": "less_equal",
+}
+# Aggregate name -> Arrow hash aggregate function.
+AGGREGATES = {
+    "count": "count",
+    "count_distinct": "count_distinct",
+    "sum": "sum",
+    "mean": "mean",
+    "min": "min",
+    "max": "max",
+    "stddev": "stddev",
+}
+_PERCENTILE = re.compile(r"^p(\d{1,2}(?:\.\d+)?)$")
+
+
+class QueryError(ValueError):
+    """Raised for a query the dataset cannot answer, with a message for the model."""
+    pass
+
+
+def read_upload(data: bytes):
+    """Parses CSV or Parquet bytes (told apart by the Parquet magic number)."""
+    import pyarrow as pa
+
+    if data[:4] == PARQUET_MAGIC:
+        import pyarrow.parquet as pq
+
+        return pq.read_table(pa.BufferReader(data))
+    import pyarrow.csv as csv
+
+    return csv.read_csv(pa.BufferReader(data))
+
+
+def write_dataset(table, path: str) -> None:
+    """Writes table as an Arrow IPC file, atomically."""
+    import pyarrow as pa
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with pa.OSFile(tmp_path, "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table, max_chunksize=64 * 1024)
+    os.replace(tmp_path, path)
+
+
+_open_lock = threading.Lock()
+_open_tables: "OrderedDict[str, Any]" = OrderedDict()
+
+
+def open_dataset(path: str):
+    """The table in an Arrow IPC file, memory-mapped rather than read.
+
+    The last OPEN_DATASETS tables stay open; the mapping is zero-copy, so
+    this costs address space, not memory.
+    """
+    import pyarrow as pa
+
+    with _open_lock:
+        table = _open_tables.get(path)
+        if table is not None:
+            _open_tables.move_to_end(path)
+            return table
+    table = pa.ipc.open_file(pa.memory_map(path, "r")).read_all()
+    with _open_lock:
+        _open_tables[path] = table
+        while len(_open_tables) > OPEN_DATASETS:
+            _open_tables.popitem(last=False)
+    return table
+
+
+def _scalar(table, column: str, text: str):
+    import pyarrow as pa
+
+    try:
+        value = json.loads(text)
+    except ValueError:
+        value = text.strip("'\"")
+    field_type = table.schema.field(column).type
+    try:
+        if isinstance(value, list):
+            return pa.array(value).cast(field_type)
+        return pa.scalar(value).cast(field_type)
+    except (pa.ArrowInvalid, pa.ArrowNotImplementedError) as e:
+        raise QueryError(f"Cannot compare column {column} ({field_type}) with {text}: {e}")
+
+
+def parse_filter(table, text: str):
+    """An Arrow expression for a filter such as "units > 10" or "region in ["a", "b"]"."""
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    match = _FILTER.match(text)
+    if match is None:
+        raise QueryError(
+            f"Cannot parse filter {text!r}; use 'column op value' with op one of "
+            "==, !=, >, >=, <, <=, in, contains."
+        )
+    column, op, value = match.group(1).strip(), match.group(2).strip(), match.group(3)
+    _check_columns(table, [column])
+    if op == "contains":
+        return pc.match_substring(pc.field(column), value.strip("'\""))
+    if op == "in":
+        values = _scalar(table, column, value)
+        if not isinstance(values, pa.Array):
+            raise QueryError(f'"in" needs a list of values, e.g. {column} in ["a", "b"].')
+        return pc.field(column).isin(values)
+    return getattr(pc, _COMPARISONS[op])(pc.field(column), _scalar(table, column, value))
+
+
+def _check_columns(table, columns: List[str]) -> None:
+    missing = [c for c in columns if c not in table.column_names]
+    if missing:
+        raise QueryError(
+            f"Unknown columns {missing}; the columns are {table.column_names}."
+        )
+
+
+def parse_aggregate(text: str) -> tuple[str, Optional[str], Any]:
+    """(output name, column, Arrow aggregate) for e.g. "count", "sum:units" or "p95:price"."""
+    name, _, column = text.partition(":")
+    name, column = name.strip().lower(), column.strip() or None
+    percentile = _PERCENTILE.match(name)
+    if percentile:
+        import pyarrow.compute as pc
+
+        q = float(percentile.group(1)) / 100
+        aggregate = ("tdigest", pc.TDigestOptions(q=q))
+    elif name in AGGREGATES:
+        aggregate = (AGGREGATES[name], None)
+    else:
+        raise QueryError(
+            f"Unknown aggregate {name!r}; use count, count_distinct, sum, mean, "
+            "min, max, stddev or a percentile such as p50 or p95."
+        )
+    if column is None and name != "count":
+        raise QueryError(f"Aggregate {name!r} needs a column, e.g. {name}:column.")
+    return (f"{name}_{column}" if column else name), column, aggregate
+
+
+def _aggregate(table, group_by: List[str], aggregates: List[str]):
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    specs = [parse_aggregate(text) for text in aggregates]
+    _check_columns(table, [column for _, column, _ in specs if column])
+    # count without a column counts rows, nulls included, of any column;
+    # count:column counts that column's non-null values.
+    any_column = group_by[0] if group_by else table.column_names[0]
+    result = table.group_by(group_by, use_threads=False).aggregate(
+        [
+            (any_column, function, pc.CountOptions(mode="all"))
+            if function == "count" and column is None
+            else (column, function, options)
+            for _, column, (function, options) in specs
+        ]
+    )
+    # Output names ("sum_units", ...) by position: Arrow names outputs by
+    # column and function, which repeats for e.g. p50 and p95 of a column,
+    # and older pyarrow versions put the keys after the aggregates.
+    names = [name for name, _, _ in specs]
+    keys_first = result.column_names[: len(group_by)] == group_by
+    result = result.rename_columns(group_by + names if keys_first else names + group_by)
+    for name in names:
+        column = result[name]
+        if pa.types.is_list(column.type) or pa.types.is_fixed_size_list(column.type):
+            # Grouped percentiles come as one-element lists.
+            result = result.set_column(
+                result.column_names.index(name), name, pc.list_flatten(column)
+            )
+    return result.select(group_by + names)
+
+
+def query(
+    table,
+    filters: Optional[List[str]] = None,
+    group_by: Optional[List[str]] = None,
+    aggregates: Optional[List[str]] = None,
+    order_by: str = "",
+    descending: bool = True,
+    limit: int = 20,
+) -> dict:
+    """Filters, groups and aggregates table, returning at most limit rows.
+
+    Without aggregates, the filtered rows themselves are returned. Grouped
+    results are ordered by their first aggregate unless order_by is given.
+    Percentiles are approximate (t-digest); the other aggregates are exact.
+    """
+    for text in filters or []:
+        table = table.filter(parse_filter(table, text))
+    matched = table.num_rows
+    group_by = list(group_by or [])
+    _check_columns(table, group_by)
+
+    if aggregates:
+        result = _aggregate(table, group_by, aggregates)
+        if not order_by and group_by:
+            order_by = result.column_names[len(group_by)]
+    elif group_by:
+        raise QueryError("group_by needs at least one aggregate, e.g. count or sum:column.")
+    else:
+        result = table
+
+    if order_by:
+        _check_columns(result, [order_by])
+        result = result.sort_by([(order_by, "descending" if descending else "ascending")])
+    return {
+        "matched_rows": matched,
+        "result_rows": result.num_rows,
+        "truncated": result.num_rows > limit,
+        "rows": result.slice(0, limit).to_pylist(),
+    }
+
+
+def describe(table) -> List[dict]:
+    """Per-column type, null count, and min/max/mean or most frequent values."""
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    columns = []
+    for name, column in zip(table.column_names, table.columns):
+        summary = {"name": name, "type": str(column.type), "nulls": column.null_count}
+        if pa.types.is_integer(column.type) or pa.types.is_floating(column.type):
+            min_max = pc.min_max(column).as_py()
+            summary.update(min=min_max["min"], max=min_max["max"], mean=pc.mean(column).as_py())
+        elif pa.types.is_temporal(column.type):
+            min_max = pc.min_max(column).as_py()
+            summary.update(min=str(min_max["min"]), max=str(min_max["max"]))
+        else:
+            counts = pc.value_counts(column)
+            order = pc.array_sort_indices(counts.field("counts"), order="descending")
+            top = counts.take(order[:TOP_VALUES])
+            summary.update(
+                distinct=len(counts),
+                top_values={str(v["values"]): v["counts"] for v in top.to_pylist()},
+            )
+        columns.append(summary)
+    return columns
@@ -0,0 +1,215 @@
+"""Tools for loading uploaded datasets and querying them locally.
+
+A dataset is an uploaded CSV or Parquet file, saved as a session artifact
+by the runner. `ingest_dataset` converts it once to a memory-mapped Arrow
+file and records it in the session state under `datasets`; the query tools
+then answer from that file and return only small summaries, so the data
+itself never passes through the model. When a worker lacks the local file
+(e.g. after a restart, or on another replica), it is rebuilt from the
+artifact.
+"""
+
+import asyncio
+import datetime
+import decimal
+import functools
+import hashlib
+import logging
+import os
+from typing import List, Optional
+
+from google.adk.tools.tool_context import ToolContext
+
+from ..data_visualisation_agent.cache import session_namespace
+from .config import DATASETS_DIR, QUERY_DEFAULT_ROWS, QUERY_MAX_ROWS, SAMPLE_ROWS
+from .store import QueryError, describe, open_dataset, query, read_upload, write_dataset
+
+logger = logging.getLogger(__name__)
+
+STATE_KEY = "datasets"
+
+
+def _tool_errors(tool):
+    """Turns the errors of a dataset tool into an error result for the model."""
+
+    @functools.wraps(tool)
+    async def wrapper(*args, **kwargs) -> dict:
+        try:
+            return await tool(*args, **kwargs)
+        except ImportError as e:
+            logger.error("Dataset tools are unavailable: %s", e)
+            return {
+                "status": "error",
+                "message": "Datasets are not available: the pyarrow package is not installed.",
+            }
+        except (ValueError, NotImplementedError, OSError) as e:
+            # QueryError, and Arrow's errors for unparseable files.
+            return {"status": "error", "message": str(e)}
+
+    return wrapper
+
+
+def _jsonable(value):
+    if isinstance(value, (datetime.date, datetime.time, datetime.timedelta, decimal.Decimal)):
+        return str(value)
+    if isinstance(value, bytes):
+        return value.hex()
+    return value
+
+
+def _rows(rows: List[dict]) -> List[dict]:
+    return [{k: _jsonable(v) for k, v in row.items()} for row in rows]
+
+
+def _path(tool_context: ToolContext, artifact_name: str, version: int) -> str:
+    namespace = session_namespace(tool_context._invocation_context.session.id)
+    digest = hashlib.sha256(f"{artifact_name}:{version}".encode()).hexdigest()[:16]
+    return os.path.join(DATASETS_DIR, namespace, f"{digest}.arrow")
+
+
+async def _build(tool_context: ToolContext, artifact_name: str, version: Optional[int]):
+    """Converts an uploaded artifact into its Arrow file; returns (table, version)."""
+    invocation = tool_context._invocation_context
+    if invocation.artifact_service is None:
+        raise QueryError("No artifact service is configured, so files cannot be uploaded.")
+    if version is None:
+        versions = await invocation.artifact_service.list_versions(
+            app_name=invocation.app_name,
+            user_id=invocation.user_id,
+            session_id=invocation.session.id,
+            filename=artifact_name,
+        )
+        if not versions:
+            names = await tool_context.list_artifacts()
+            raise QueryError(f"No artifact {artifact_name!r}; the artifacts are {names}.")
+        version = max(versions)
+    artifact = await tool_context.load_artifact(artifact_name, version)
+    if artifact is None or artifact.inline_data is None:
+        raise QueryError(f"Artifact {artifact_name!r} version {version} has no file data.")
+    path = _path(tool_context, artifact_name, version)
+
+    def convert():
+        write_dataset(read_upload(artifact.inline_data.data), path)
+        return open_dataset(path)
+
+    return await asyncio.to_thread(convert), version
+
+
+async def _open(tool_context: ToolContext, dataset_name: str):
+    datasets = tool_context.state.get(STATE_KEY) or {}
+    entry = datasets.get(dataset_name)
+    if entry is None:
+        raise QueryError(
+            f"No dataset {dataset_name!r}; the datasets are {sorted(datasets)}. "
+            "Use ingest_dataset to load an uploaded file first."
+        )
+    path = _path(tool_context, entry["artifact"], entry["version"])
+    if os.path.exists(path):
+        return await asyncio.to_thread(open_dataset, path)
+    logger.info("Rebuilding dataset %s from its artifact", dataset_name)
+    table, _ = await _build(tool_context, entry["artifact"], entry["version"])
+    return table
+
+
+@_tool_errors
+async def ingest_dataset(
+    artifact_name: str, dataset_name: str, tool_context: ToolContext
+) -> dict:
+    """Loads an uploaded CSV or Parquet file as a dataset that can be queried.
+
+    Args:
+        artifact_name (str): The artifact name of the uploaded file, as given
+            in the user's message (e.g. "Uploaded file: <artifact name>").
+        dataset_name (str): A short name to refer to the dataset by in queries.
+        tool_context (ToolContext): The tool context.
+
+    Returns:
+        dict: The row count, the column names and types, and a few sample rows.
+    """
+    table, version = await _build(tool_context, artifact_name, None)
+    datasets = dict(tool_context.state.get(STATE_KEY) or {})
+    datasets[dataset_name] = {
+        "artifact": artifact_name,
+        "version": version,
+        "rows": table.num_rows,
+        "columns": table.column_names,
+    }
+    tool_context.state[STATE_KEY] = datasets
+    return {
+        "status": "success",
+        "dataset": dataset_name,
+        "rows": table.num_rows,
+        "columns": {field.name: str(field.type) for field in table.schema},
+        "sample": _rows(table.slice(0, SAMPLE_ROWS).to_pylist()),
+    }
+
+
+@_tool_errors
+async def describe_dataset(dataset_name: str, tool_context: ToolContext) -> dict:
+    """Summarizes each column of a dataset.
+
+    Args:
+        dataset_name (str): The name given to the dataset by ingest_dataset.
+        tool_context (ToolContext): The tool context.
+
+    Returns:
+        dict: The row count and, per column, its type, null count and either
+        min, max and mean (numbers, dates) or the most frequent values.
+    """
+    table = await _open(tool_context, dataset_name)
+    columns = await asyncio.to_thread(describe, table)
+    return {
+        "status": "success",
+        "dataset": dataset_name,
+        "rows": table.num_rows,
+        "columns": [{k: _jsonable(v) for k, v in c.items()} for c in columns],
+    }
+
+
+@_tool_errors
+async def query_dataset(
+    dataset_name: str,
+    filters: Optional[List[str]] = None,
+    group_by: Optional[List[str]] = None,
+    aggregates: Optional[List[str]] = None,
+    order_by: str = "",
+    descending: bool = True,
+    limit: int = QUERY_DEFAULT_ROWS,
+    tool_context: Optional[ToolContext] = None,
+) -> dict:
+    """Filters, groups and aggregates a dataset locally and returns a small result.
+
+    Args:
+        dataset_name (str): The name given to the dataset by ingest_dataset.
+        filters (list[str]): Conditions that rows must all meet, each
+            "column op value" with op one of ==, !=, >, >=, <, <=, in,
+            contains; e.g. "units > 10", "region in ["north", "south"]",
+            "date >= 2024-01-01".
+        group_by (list[str]): Columns to group by; needs aggregates.
+        aggregates (list[str]): "count", or "function:column" with function
+            one of sum, mean, min, max, stddev, count, count_distinct, or a
+            percentile such as p50 or p95 (approximate); e.g. "sum:units".
+            Without aggregates, the matching rows are returned.
+        order_by (str): A result column to sort by, e.g. "sum_units". Grouped
+            results are sorted by their first aggregate by default.
+        descending (bool): Whether to sort in descending order.
+        limit (int): The maximum number of result rows returned (at most 100).
+        tool_context (ToolContext): The tool context.
+
+    Returns:
+        dict: The number of matching rows, the number of result rows, whether
+        the result was truncated to limit, and the result rows.
+    """
+    table = await _open(tool_context, dataset_name)
+    result = await asyncio.to_thread(
+        query,
+        table,
+        filters,
+        group_by,
+        aggregates,
+        order_by,
+        descending,
+        min(max(limit, 1), QUERY_MAX_ROWS),
+    )
+    result["rows"] = _rows(result["rows"])
+    return {"status": "success", "dataset": dataset_name, **result}
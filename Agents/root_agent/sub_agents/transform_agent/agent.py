@@ -1,53 +1,38 @@
 from google.adk.agents import Agent
 from .prompt import TRANSFORM_AGENT_PROMPT
+from ...models import build_model
 from ..coding_agent.agent import coding_agent
 from google.adk.tools import agent_tool
-from pydantic import BaseModel, Field
-
-
-class Variable(BaseModel):
-    variable: str = Field(
-        description="The variable name. Should be concise and descriptive. Should be in snake_case."
-    )
-    value: int = Field(
-        description="The value of the variable. Should be an integer."
-    )
-    time: str = Field(
-        description="The time of the variable. Should be in the format of YYYY-MM-DD."
-    )
-
-
-class Data(BaseModel):
-    list_of_variables: list[Variable] = Field(
-        description="The list of variables. Should be a list of Variable objects."
-    )
-
-
-class Poem(BaseModel):
-    poem: str = Field(description="A poem with values")
+from .schemas import Variable, Data, Poem
+from .parsing import validate_list_of_variables
+from ...context_budget import ContextBudget, ContextBudgeter
 
 
 transform_agent = Agent(
     name="transform_agent",
-    model="gemini-2.5-pro",
+    model=build_model("transform_agent", "gemini-2.5-pro"),
     description="An agent that can perform calculations using coding agent as tool.",
     instruction=TRANSFORM_AGENT_PROMPT,
     tools=[agent_tool.AgentTool(coding_agent)],
+    before_model_callback=ContextBudgeter(ContextBudget(keep_turns=3)),
 )
 
 transform_2_agent = Agent(
     name="transform_2_agent",
-    model="gemini-2.5-pro",
+    model=build_model("transform_2_agent", "gemini-2.5-pro"),
     description="An agent that uses transform_agent to perform calculations using coding agent as tool. Your ultimate role is to transform output from coding agent into list of variables that get saved in output_key.",
     instruction=TRANSFORM_AGENT_PROMPT,
     sub_agents=[transform_agent],
-    output_key="list_of_variables",
+    # validate_list_of_variables stores the answer under list_of_variables.
+    before_model_callback=ContextBudgeter(ContextBudget(keep_turns=3)),
+    after_model_callback=validate_list_of_variables,
 )
 
 express_output_key_agent = Agent(
     name="express_output_key_agent",
-    model="gemini-2.5-pro",
+    model=build_model("express_output_key_agent", "gemini-2.5-pro"),
     description="An agent that make a poem with values found in output_key {list_of_variables}",
     instruction="Simple agent to express saved output_key {list_of_variables} in a poem.",
     output_key="poem",
+    before_model_callback=ContextBudgeter(ContextBudget(keep_turns=2)),
 ) 
\ No newline at end of file
@@ -0,0 +1,337 @@
+"""Local parsing, repair and validation of transform_2_agent's output.
+
+The final answer of transform_2_agent is stored under `list_of_variables`
+(see variables.py). Before that happens, the answer is pulled out of whatever text the model
+wrapped it in, common mistakes are repaired locally, and the result is
+validated strictly against `Data`. Only when local repair fails is the model
+asked again, once, with the validation errors and a response schema; that
+re-ask goes to the agent's top model tier.
+"""
+
+import json
+import logging
+import math
+import re
+from datetime import datetime
+from typing import Any, Optional
+
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models import LlmRequest, LlmResponse
+from google.genai import types
+from pydantic import TypeAdapter, ValidationError
+
+from ...models.routing import record_validation_failure
+from .schemas import Data
+from .variables import record_variables
+
+logger = logging.getLogger(__name__)
+
+# Compiled once; building the validator is the expensive part.
+DATA_ADAPTER = TypeAdapter(Data)
+
+_FENCE = re.compile(r"```(?:json|JSON)?\s*\n?(.*?)(?:```|$)", re.DOTALL)
+_TRAILING_COMMA = re.compile(r",\s*([}\]])")
+_NUMBER = re.compile(r"^\(?-?\d+(?:\.\d+)?\)?$")
+_SUFFIXES = {"k": 10**3, "m": 10**6, "mm": 10**6, "b": 10**9, "bn": 10**9}
+
+DATE_FORMATS = (
+    "%Y-%m-%d",
+    "%Y/%m/%d",
+    "%Y.%m.%d",
+    "%Y%m%d",
+    "%d.%m.%Y",
+    "%m/%d/%Y",
+    "%d/%m/%Y",
+    "%B %d, %Y",
+    "%b %d, %Y",
+    "%d %B %Y",
+    "%d %b %Y",
+    "%B %Y",
+    "%b %Y",
+    "%Y-%m",
+    "%Y/%m",
+    "%Y",
+)
+
+KEY_ALIASES = {
+    "variable": ("variable", "name", "variable_name", "key", "label"),
+    "value": ("value", "val", "amount", "total", "result"),
+    "time": ("time", "date", "timestamp", "period", "year"),
+}
+
+
+class OutputRepairError(ValueError):
+    """Raised when the model output cannot be turned into valid `Data`."""
+    pass
+
+
+def extract_json(text: str) -> Any:
+    """Extracts the first JSON value from fenced, chatty or truncated text.
+
+    Args:
+        text: The raw model output.
+
+    Returns:
+        The decoded JSON value.
+
+    Raises:
+        OutputRepairError: If no JSON object or array can be recovered.
+    """
+    fenced = _FENCE.search(text)
+    if fenced and fenced.group(1).strip():
+        text = fenced.group(1)
+    starts = [i for i in (text.find("{"), text.find("[")) if i != -1]
+    if not starts:
+        raise OutputRepairError("No JSON object or array found in the output.")
+    candidate = _balance(text[min(starts):])
+    candidate = _TRAILING_COMMA.sub(r"\1", candidate)
+    try:
+        return json.loads(candidate)
+    except json.JSONDecodeError:
+        pass
+    # Python-style literals: single quotes, True/False/None.
+    pythonish = (
+        candidate.replace("'", '"')
+        .replace("True", "true")
+        .replace("False", "false")
+        .replace("None", "null")
+    )
+    try:
+        return json.loads(pythonish)
+    except json.JSONDecodeError as e:
+        raise OutputRepairError(f"Output is not valid JSON: {e}") from e
+
+
+def _balance(text: str) -> str:
+    """Cuts text at the end of its first JSON value, closing it if truncated."""
+    stack = []
+    in_string = False
+    escaped = False
+    last_complete = 0
+    # Stack depth inside the outermost open array: a cut is only made
+    # between its elements, so a half-written element is dropped whole.
+    array_depth = None
+    for i, char in enumerate(text):
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+            continue
+        if char == '"':
+            in_string = True
+        elif char in "{[":
+            stack.append("}" if char == "{" else "]")
+            if char == "[" and array_depth is None:
+                array_depth = len(stack)
+        elif char in "}]":
+            if stack:
+                stack.pop()
+            if not stack:
+                return text[: i + 1]
+            if array_depth is not None and len(stack) <= array_depth:
+                last_complete = i + 1
+                if len(stack) < array_depth:
+                    array_depth = None
+        elif char == "," and array_depth is not None and len(stack) == array_depth:
+            last_complete = i
+    # Truncated output: drop the unfinished element and close what is open.
+    head = text[:last_complete] if last_complete else text
+    depth = []
+    in_string = escaped = False
+    for char in head:
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char in "{[":
+            depth.append("}" if char == "{" else "]")
+        elif char in "}]" and depth:
+            depth.pop()
+    return head.rstrip().rstrip(",") + "".join(reversed(depth))
+
+
+def repair_int(value: Any) -> Any:
+    """Turns "1,200", "$3.5k", "12%" or 10.0 into an int; else returns value.
+
+    NaN and infinities are returned as they are, for validation to reject.
+    """
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, float):
+        return round(value) if math.isfinite(value) else value
+    if not isinstance(value, str):
+        return value
+    cleaned = re.sub(r"[\s,_$€£%]", "", value).lower()
+    multiplier = 1
+    for suffix in sorted(_SUFFIXES, key=len, reverse=True):
+        if cleaned.endswith(suffix) and _NUMBER.match(cleaned[: -len(suffix)]):
+            cleaned, multiplier = cleaned[: -len(suffix)], _SUFFIXES[suffix]
+            break
+    if not _NUMBER.match(cleaned):
+        return value
+    negative = cleaned.startswith("(") and cleaned.endswith(")")
+    number = float(cleaned.strip("()")) * multiplier
+    if not math.isfinite(number):
+        return value
+    return -round(number) if negative else round(number)
+
+
+def repair_date(value: Any) -> Any:
+    """Normalizes common date spellings to YYYY-MM-DD; else returns value."""
+    if isinstance(value, int) and 1000 <= value <= 9999:
+        return f"{value}-01-01"
+    if not isinstance(value, str):
+        return value
+    text = value.strip()
+    # ISO datetimes: keep the date part.
+    if re.match(r"^\d{4}-\d{2}-\d{2}[T ]", text):
+        text = text[:10]
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(text, fmt).date().isoformat()
+        except ValueError:
+            continue
+    return value
+
+
+def repair_name(value: Any) -> Any:
+    """Converts a variable name to snake_case."""
+    if not isinstance(value, str):
+        return value
+    name = re.sub(r"([a-z0-9])([A-Z])", r"\1_\2", value.strip())
+    return re.sub(r"[^0-9a-zA-Z]+", "_", name).strip("_").lower() or value
+
+
+def repair_data(raw: Any) -> Any:
+    """Repairs the decoded output into the shape of `Data` where possible."""
+    if isinstance(raw, dict) and "list_of_variables" in raw:
+        items = raw["list_of_variables"]
+    elif isinstance(raw, list):
+        items = raw
+    elif isinstance(raw, dict) and any(k in raw for k in KEY_ALIASES["variable"]):
+        items = [raw]
+    else:
+        return raw
+    if isinstance(items, str):
+        items = extract_json(items)
+    if not isinstance(items, list):
+        return raw
+
+    repaired = []
+    for item in items:
+        if not isinstance(item, dict):
+            repaired.append(item)
+            continue
+        fields = {}
+        for field, aliases in KEY_ALIASES.items():
+            for alias in aliases:
+                if alias in item:
+                    fields[field] = item[alias]
+                    break
+        if "variable" in fields:
+            fields["variable"] = repair_name(fields["variable"])
+        if "value" in fields:
+            fields["value"] = repair_int(fields["value"])
+        if "time" in fields:
+            fields["time"] = repair_date(fields["time"])
+        repaired.append(fields)
+    return {"list_of_variables": repaired}
+
+
+def parse_data(text: str) -> Data:
+    """Extracts, repairs and strictly validates a `Data` value from text.
+
+    Raises:
+        OutputRepairError: If the text cannot be turned into valid `Data`.
+    """
+    repaired = repair_data(extract_json(text))
+    try:
+        return DATA_ADAPTER.validate_python(repaired, strict=True)
+    except ValidationError as e:
+        raise OutputRepairError(str(e)) from e
+
+
+async def _reask(callback_context: CallbackContext, text: str, error: str) -> str:
+    """Asks the agent's top-tier model once more, constrained by the `Data` schema."""
+    llm = callback_context._invocation_context.agent.canonical_model
+    llm_request = LlmRequest(
+        model=llm.model,
+        contents=[
+            types.Content(
+                role="user",
+                parts=[
+                    types.Part(
+                        text=(
+                            "Convert this output into the required JSON. Use integer "
+                            "values and YYYY-MM-DD dates.\n\n"
+                            f"Output:\n{text}\n\nValidation errors:\n{error}"
+                        )
+                    )
+                ],
+            )
+        ],
+        config=types.GenerateContentConfig(
+            response_mime_type="application/json",
+            response_schema=Data,
+        ),
+    )
+    answer = ""
+    async for llm_response in llm.generate_content_async(llm_request):
+        if llm_response.content and llm_response.content.parts:
+            answer += "".join(p.text or "" for p in llm_response.content.parts)
+    return answer
+
+
+async def validate_list_of_variables(
+    callback_context: CallbackContext, llm_response: LlmResponse
+) -> Optional[LlmResponse]:
+    """after_model_callback that guarantees valid `list_of_variables` output.
+
+    Intermediate responses (partial chunks, function calls, agent transfers)
+    pass through untouched. A final text answer is replaced by the canonical
+    JSON of the validated `Data`, and its variables are stored. If
+    neither local repair nor one re-ask produce valid data, the text is
+    replaced by an error so nothing invalid reaches the session state.
+    """
+    content = llm_response.content
+    if llm_response.partial or not content or not content.parts:
+        return None
+    if any(part.function_call for part in content.parts):
+        return None
+    text = "".join(part.text or "" for part in content.parts if not part.thought)
+    if not text.strip():
+        return None
+
+    try:
+        data = parse_data(text)
+    except OutputRepairError as e:
+        logger.info("Local repair of list_of_variables failed, re-asking: %s", e)
+        record_validation_failure(
+            callback_context._invocation_context.agent.canonical_model, llm_response
+        )
+        try:
+            data = parse_data(await _reask(callback_context, text, str(e)))
+        except OutputRepairError as e2:
+            logger.warning("list_of_variables is still invalid after re-ask: %s", e2)
+            return LlmResponse(
+                error_code="INVALID_OUTPUT",
+                error_message=f"Could not produce a valid list_of_variables: {e2}",
+            )
+
+    record_variables(callback_context, data)
+    return LlmResponse(
+        content=types.Content(
+            role=content.role or "model",
+            parts=[types.Part(text=data.model_dump_json())],
+        ),
+        usage_metadata=llm_response.usage_metadata,
+        custom_metadata=llm_response.custom_metadata,
+    )
@@ -5,12 +5,15 @@ Example:
 Input:
 {
     "variable": "revenue_year1",
-    "value": "10000"
+    "value": "10000",
+    "time": "2023-12-31"
 }
 
 Output:
 {
-    "list_of_variables": [{"variable": "x", "value": "10"}]
+    "list_of_variables": [{"variable": "revenue_year1", "value": 10000, "time": "2023-12-31"}]
 }
 
+Values are integers and times are dates in the format YYYY-MM-DD.
+
 """
\ No newline at end of file
@@ -0,0 +1,35 @@
+"""Structured output schemas for the transform agents."""
+
+from datetime import date
+
+from pydantic import BaseModel, Field, field_validator
+
+
+class Variable(BaseModel):
+    variable: str = Field(
+        description="The variable name. Should be concise and descriptive. Should be in snake_case."
+    )
+    value: int = Field(
+        description="The value of the variable. Should be an integer."
+    )
+    time: str = Field(
+        description="The time of the variable. Should be in the format of YYYY-MM-DD.",
+        pattern=r"^\d{4}-\d{2}-\d{2}$",
+    )
+
+    @field_validator("time")
+    @classmethod
+    def _real_date(cls, value: str) -> str:
+        # The pattern alone lets through dates such as 2023-13-45.
+        date.fromisoformat(value)
+        return value
+
+
+class Data(BaseModel):
+    list_of_variables: list[Variable] = Field(
+        description="The list of variables. Should be a list of Variable objects."
+    )
+
+
+class Poem(BaseModel):
+    poem: str = Field(description="A poem with values")
@@ -0,0 +1,440 @@
+"""Columnar storage of `list_of_variables`, persisted as deltas.
+
+Stored as `Data` JSON in the session state, every variable costs some 60
+bytes, and every answer of transform_2_agent rewrote the whole value in
+the `sessions` table. Instead, the variables are kept as typed columns:
+names dictionary-encoded, integer values and dates (days since the epoch)
+in arrays, row for row and in the answer's order. Each answer replaces the
+variables, as before, and is stored in a SQLite store as one compactly
+encoded delta: only the rows it appends when it extends the previous
+answer, else a snapshot of all its rows. The session state holds a small
+reference to the latest delta, so the state row stays the same small size
+however many variables an answer holds.
+
+A reference whose deltas are not in the store (another host's file, a
+deleted one) raises `VariablesUnavailableError` when read rather than
+reading as no variables.
+
+Agents read the state through `VariablesView`, a dict holding the
+reference whose `str()` is the canonical `Data` JSON, so instructions
+such as `{list_of_variables}` render as before. `attach_variables`, a
+before_agent_callback on every agent, turns a reference read from the
+session service into a view. Sessions whose state still holds JSON or a
+list of dicts keep working until the next answer replaces them.
+"""
+
+import datetime
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from collections.abc import Iterator
+from typing import Any, Optional
+
+from google.adk.agents.callback_context import CallbackContext
+
+from .schemas import Data
+
+logger = logging.getLogger(__name__)
+
+STATE_KEY = "list_of_variables"
+VARIABLES_DB_PATH = os.getenv("VARIABLES_DB_PATH", "./agent_variables.db")
+# Folded columns kept in memory, per session and delta.
+LOADED_SESSIONS = 64
+
+# Marks a state value as a reference to the store.
+REF_FORMAT = "variable_columns/1"
+_EPOCH = datetime.date(1970, 1, 1).toordinal()
+
+
+class VariablesUnavailableError(RuntimeError):
+    """The store does not hold the deltas a variables reference points to."""
+
+
+def _put_varint(out: bytearray, n: int) -> None:
+    while n > 0x7F:
+        out.append((n & 0x7F) | 0x80)
+        n >>= 7
+    out.append(n)
+
+
+def _get_varint(data: bytes, pos: int) -> tuple[int, int]:
+    n = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        n |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return n, pos
+        shift += 7
+
+
+def _zigzag(n: int) -> int:
+    return n * 2 if n >= 0 else -n * 2 - 1
+
+
+def _unzigzag(n: int) -> int:
+    return n >> 1 if not n & 1 else -((n + 1) >> 1)
+
+
+class VariableColumns:
+    """`Variable` rows as typed columns, in order and duplicates included.
+
+    `codes` index into `names`; `values` are int64 and `days` are days since
+    1970-01-01.
+    """
+
+    __slots__ = ("names", "codes", "values", "days", "_codes")
+
+    def __init__(self, names=None, codes=None, values=None, days=None):
+        self.names: list[str] = list(names or [])
+        self.codes = array("i", codes or [])
+        self.values = array("q", values or [])
+        self.days = array("i", days or [])
+        self._codes: Optional[dict] = None
+
+    @classmethod
+    def from_rows(cls, rows) -> "VariableColumns":
+        """Columns of `Variable` dicts or models."""
+        columns = cls()
+        for row in rows:
+            if not isinstance(row, dict):
+                row = row.model_dump()
+            columns.append(
+                row["variable"],
+                row["value"],
+                datetime.date.fromisoformat(row["time"]).toordinal() - _EPOCH,
+            )
+        return columns
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def append(self, name: str, value: int, day: int) -> None:
+        if not -(2**63) <= value < 2**63:
+            raise ValueError(f"The value of {name} does not fit in 64 bits: {value}")
+        if self._codes is None:
+            self._codes = {name: code for code, name in enumerate(self.names)}
+        code = self._codes.get(name)
+        if code is None:
+            code = self._codes[name] = len(self.names)
+            self.names.append(name)
+        self.codes.append(code)
+        self.values.append(value)
+        self.days.append(day)
+
+    def rows(self) -> Iterator[tuple[str, int, int]]:
+        """(variable, value, days since the epoch) per row."""
+        names = self.names
+        for code, value, day in zip(self.codes, self.values, self.days):
+            yield names[code], value, day
+
+    def copy(self) -> "VariableColumns":
+        return VariableColumns(self.names, self.codes, self.values, self.days)
+
+    def appended(self, new: "VariableColumns") -> Optional["VariableColumns"]:
+        """The rows new has after these columns' rows; None unless it starts with them."""
+        if len(new) < len(self):
+            return None
+        rows = new.rows()
+        for row, new_row in zip(self.rows(), rows):
+            if row != new_row:
+                return None
+        delta = VariableColumns()
+        for name, value, day in rows:
+            delta.append(name, value, day)
+        return delta
+
+    def encode(self) -> bytes:
+        """Names length-prefixed; codes as varints; values and day gaps zigzag varints."""
+        out = bytearray()
+        _put_varint(out, len(self.names))
+        for name in self.names:
+            encoded = name.encode()
+            _put_varint(out, len(encoded))
+            out += encoded
+        _put_varint(out, len(self.values))
+        for code in self.codes:
+            _put_varint(out, code)
+        for value in self.values:
+            _put_varint(out, _zigzag(value))
+        # Rows are mostly in date order, so most gaps take one byte.
+        previous = 0
+        for day in self.days:
+            _put_varint(out, _zigzag(day - previous))
+            previous = day
+        return bytes(out)
+
+    @classmethod
+    def decode(cls, data: bytes) -> "VariableColumns":
+        count, pos = _get_varint(data, 0)
+        names = []
+        for _ in range(count):
+            length, pos = _get_varint(data, pos)
+            names.append(data[pos : pos + length].decode())
+            pos += length
+        rows, pos = _get_varint(data, pos)
+        codes, values, days = [], [], []
+        for _ in range(rows):
+            code, pos = _get_varint(data, pos)
+            codes.append(code)
+        for _ in range(rows):
+            value, pos = _get_varint(data, pos)
+            values.append(_unzigzag(value))
+        day = 0
+        for _ in range(rows):
+            gap, pos = _get_varint(data, pos)
+            day += _unzigzag(gap)
+            days.append(day)
+        return cls(names, codes, values, days)
+
+    def to_data(self) -> dict:
+        """The rows in the shape of `Data`."""
+        return {
+            STATE_KEY: [
+                {
+                    "variable": name,
+                    "value": value,
+                    "time": datetime.date.fromordinal(day + _EPOCH).isoformat(),
+                }
+                for name, value, day in self.rows()
+            ]
+        }
+
+
+class VariableStore:
+    """Append-only deltas of each session's variables in SQLite."""
+
+    def __init__(self, path: str = VARIABLES_DB_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS variable_deltas ("
+            " session TEXT NOT NULL,"
+            " seq INTEGER NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " rows INTEGER NOT NULL,"
+            " snapshot INTEGER NOT NULL,"
+            " payload BLOB NOT NULL,"
+            " PRIMARY KEY (session, seq)) WITHOUT ROWID"
+        )
+        self._loaded: "OrderedDict[tuple[str, int], VariableColumns]" = OrderedDict()
+
+    def next_seq(self, session: str) -> int:
+        with self._lock:
+            (seq,) = self._db.execute(
+                "SELECT COALESCE(MAX(seq), 0) + 1 FROM variable_deltas WHERE session = ?",
+                (session,),
+            ).fetchone()
+        return seq
+
+    def append(
+        self,
+        session: str,
+        seq: int,
+        delta: VariableColumns,
+        columns: VariableColumns,
+        snapshot: bool = False,
+    ) -> None:
+        """Stores delta as the session's seq-th delta; columns is the result.
+
+        A snapshot holds all of the session's rows, so loading starts there;
+        other deltas append their rows to the previous delta's.
+        """
+        payload = delta.encode()
+        with self._lock:
+            # The primary key rejects a second writer of the same seq.
+            self._db.execute(
+                "INSERT INTO variable_deltas VALUES (?, ?, ?, ?, ?, ?)",
+                (session, seq, time.time(), len(delta), int(snapshot), payload),
+            )
+            self._remember(session, seq, columns)
+
+    def load(self, session: str, seq: int, rows: Optional[int] = None) -> VariableColumns:
+        """The session's variables as of its seq-th delta.
+
+        Raises:
+            VariablesUnavailableError: If that delta, or one it builds on, is
+                not in the store, or the result does not have `rows` rows.
+        """
+        with self._lock:
+            columns = self._loaded.get((session, seq))
+            if columns is not None:
+                self._loaded.move_to_end((session, seq))
+                return columns
+            payloads = self._db.execute(
+                "SELECT seq, snapshot, payload FROM variable_deltas"
+                " WHERE session = ? AND seq <= ? AND seq >= ("
+                "  SELECT COALESCE(MAX(seq), 0) FROM variable_deltas"
+                "  WHERE session = ? AND seq <= ? AND snapshot)"
+                " ORDER BY seq",
+                (session, seq, session, seq),
+            ).fetchall()
+        complete = (
+            payloads
+            and payloads[0][1]
+            and [row[0] for row in payloads] == list(range(payloads[0][0], seq + 1))
+        )
+        if not complete:
+            raise VariablesUnavailableError(
+                f"Variable delta {seq} of session {session} is not in {self.path}"
+            )
+        columns = VariableColumns()
+        for _, _, payload in payloads:
+            for name, value, day in VariableColumns.decode(payload).rows():
+                columns.append(name, value, day)
+        if rows is not None and len(columns) != rows:
+            raise VariablesUnavailableError(
+                f"Variable delta {seq} of session {session} has {len(columns)} rows"
+                f" in {self.path}, not {rows}"
+            )
+        with self._lock:
+            self._remember(session, seq, columns)
+        return columns
+
+    def _remember(self, session: str, seq: int, columns: VariableColumns) -> None:
+        self._loaded[session, seq] = columns
+        while len(self._loaded) > LOADED_SESSIONS:
+            self._loaded.popitem(last=False)
+
+    def stats(self) -> dict:
+        with self._lock:
+            sessions, deltas, rows, size = self._db.execute(
+                "SELECT COUNT(DISTINCT session), COUNT(*), COALESCE(SUM(rows), 0),"
+                " COALESCE(SUM(LENGTH(payload)), 0) FROM variable_deltas"
+            ).fetchone()
+        return {"sessions": sessions, "deltas": deltas, "rows": rows, "bytes": size}
+
+
+_store: Optional[VariableStore] = None
+_store_lock = threading.Lock()
+
+
+def variable_store() -> VariableStore:
+    """The process-wide store, opened on first use."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = VariableStore()
+        return _store
+
+
+def is_variables_ref(value: Any) -> bool:
+    return isinstance(value, dict) and value.get("format") == REF_FORMAT
+
+
+class VariablesView(dict):
+    """A store reference that renders as the `Data` JSON of its variables.
+
+    The dict items are the reference (format, session, seq, rows), which is
+    what JSON, pickle and copies of the session state carry. `str()` and
+    `to_data()` load the columns from the store on first use, and raise
+    `VariablesUnavailableError` if it does not hold them.
+    """
+
+    def __init__(self, ref: dict, columns: Optional[VariableColumns] = None):
+        super().__init__(ref)
+        self._columns = columns
+
+    def __reduce__(self):
+        return (VariablesView, (dict(self),))
+
+    @property
+    def columns(self) -> VariableColumns:
+        if self._columns is None:
+            self._columns = variable_store().load(
+                self["session"], self["seq"], self.get("rows")
+            )
+        return self._columns
+
+    def to_data(self) -> dict:
+        return self.columns.to_data()
+
+    def __str__(self) -> str:
+        # The same text as Data.model_dump_json().
+        return json.dumps(self.to_data(), ensure_ascii=False, separators=(",", ":"))
+
+    def __repr__(self) -> str:
+        return f"VariablesView({dict.__repr__(self)})"
+
+
+def variables_view(value: Any) -> Optional[VariablesView]:
+    """value as a view if it is a store reference, else None."""
+    if isinstance(value, VariablesView):
+        return value
+    if is_variables_ref(value):
+        return VariablesView(value)
+    return None
+
+
+def attach_variables(callback_context: CallbackContext) -> None:
+    """before_agent_callback that puts a view in place of a stored reference.
+
+    The view replaces the reference in the session's state directly rather
+    than through a state delta, so nothing is written.
+    """
+    state = callback_context._invocation_context.session.state
+    value = state.get(STATE_KEY)
+    if is_variables_ref(value) and not isinstance(value, VariablesView):
+        state[STATE_KEY] = VariablesView(value)
+    return None
+
+
+def record_variables(callback_context: CallbackContext, data: Data) -> None:
+    """Stores a validated answer as a delta and points the state at it.
+
+    The answer replaces the earlier variables. When it starts with them, only
+    the rows it appends are stored, and an unchanged answer stores nothing;
+    otherwise its rows are stored as a snapshot. If the store cannot take
+    them (e.g. values outside int64), the state holds the answer's JSON as
+    before.
+    """
+    invocation = callback_context._invocation_context
+    view = variables_view(callback_context.state.get(STATE_KEY))
+    session = (
+        view["session"]
+        if view is not None
+        else f"{invocation.app_name}:{invocation.user_id}:{invocation.session.id}"
+    )
+    base = None
+    if view is not None:
+        try:
+            base = view.columns
+        except VariablesUnavailableError as e:
+            # Replaced by the answer anyway; start again from a snapshot.
+            logger.warning("Writing list_of_variables as a snapshot: %s", e)
+    try:
+        new = VariableColumns.from_rows(data.list_of_variables)
+        store = variable_store()
+        delta = base.appended(new) if base is not None else None
+        if delta is None:
+            delta, snapshot, seq = new, True, store.next_seq(session)
+        elif not len(delta):
+            return
+        else:
+            snapshot, seq = False, view["seq"] + 1
+        store.append(session, seq, delta, new, snapshot=snapshot)
+    except (ValueError, sqlite3.Error) as e:
+        logger.warning("Storing list_of_variables as JSON: %s", e)
+        callback_context.state[STATE_KEY] = data.model_dump_json()
+        return
+    callback_context.state[STATE_KEY] = VariablesView(
+        {"format": REF_FORMAT, "session": session, "seq": seq, "rows": len(new)},
+        new,
+    )
+
+
+def expand_variables(state: dict) -> dict:
+    """state with a variables reference replaced by its `Data` dict."""
+    value = state.get(STATE_KEY)
+    view = variables_view(value)
+    if view is None:
+        return state
+    return {**state, STATE_KEY: view.to_data()}
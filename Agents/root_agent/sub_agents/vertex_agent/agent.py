@@ -1,16 +1,22 @@
 from google.adk.agents import Agent
 from .prompt import VERTEX_AGENT_PROMPT
+from ...models import build_model
 from .tools import (
     list_all_files,
     add_file,
     delete_file_by_id,
     query_all_files,
 )
+from ...context_budget import ContextBudget, ContextBudgeter
 
 vertex_agent = Agent(
     name="vertex_agent",
-    model="gemini-2.5-pro",
+    model=build_model("vertex_agent", "gemini-2.5-pro"),
     description="An agent that can manage and query files in a Vertex AI RAG Corpus.",
     instruction=VERTEX_AGENT_PROMPT,
     tools=[list_all_files, add_file, delete_file_by_id, query_all_files],
+    # RAG contexts are large; keep them only until the model has answered.
+    before_model_callback=ContextBudgeter(
+        ContextBudget(keep_turns=3, max_tool_output_chars=1500)
+    ),
 )
\ No newline at end of file
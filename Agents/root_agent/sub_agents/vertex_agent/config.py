@@ -12,3 +12,8 @@ CORPUS_DISPLAY_NAME = "agent-bake-off-demo"
 # Default RAG query parameters
 DEFAULT_TOP_K = 3
 DEFAULT_DISTANCE_THRESHOLD = 0.5
+
+# How long file listings and query results are reused; adding or deleting
+# a file drops them sooner.
+LIST_CACHE_TTL_S = int(os.getenv("RAG_LIST_CACHE_TTL_S", "60"))
+QUERY_CACHE_TTL_S = int(os.getenv("RAG_QUERY_CACHE_TTL_S", "600"))
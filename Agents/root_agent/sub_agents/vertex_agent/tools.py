@@ -6,7 +6,6 @@ import os
 import logging
 from google.adk.tools import FunctionTool
 from google.adk.tools.tool_context import ToolContext
-from vertexai import rag
 import sys
 import json
 
@@ -17,23 +16,49 @@ if __name__ == "__main__" and (__package__ is None or __package__ == ''):
     # This is a bit of a hack to allow the script to be run standalone
     # and still find its sibling modules.
     _current_dir = os.path.dirname(os.path.abspath(__file__))
-    if _current_dir not in sys.path:
-        sys.path.append(_current_dir)
-    from config import DEFAULT_DISTANCE_THRESHOLD, DEFAULT_TOP_K
+    _root_agent_dir = os.path.dirname(os.path.dirname(_current_dir))
+    for _dir in (_current_dir, _root_agent_dir):
+        if _dir not in sys.path:
+            sys.path.append(_dir)
+    from config import (
+        DEFAULT_DISTANCE_THRESHOLD,
+        DEFAULT_TOP_K,
+        LIST_CACHE_TTL_S,
+        QUERY_CACHE_TTL_S,
+    )
+    from tool_cache import memoize_tool
     from utils import (
         check_corpus_exists,
         get_corpus_resource_name,
         get_corpus_name as get_active_corpus_name,
+        get_rag,
     )
 else:
-    from .config import DEFAULT_DISTANCE_THRESHOLD, DEFAULT_TOP_K
+    from .config import (
+        DEFAULT_DISTANCE_THRESHOLD,
+        DEFAULT_TOP_K,
+        LIST_CACHE_TTL_S,
+        QUERY_CACHE_TTL_S,
+    )
+    from ...tool_cache import memoize_tool
     from .utils import (
         check_corpus_exists,
         get_corpus_resource_name,
         get_corpus_name as get_active_corpus_name,
+        get_rag,
     )
 
+# The corpus is shared by every user, so its listing and query results are
+# too, until a file is added or deleted.
+CORPUS_CHANGES = ("add_file", "delete_file_by_id")
+
 
+@memoize_tool(
+    ttl_s=LIST_CACHE_TTL_S,
+    scope="global",
+    invalidated_by=CORPUS_CHANGES,
+    state_keys=("corpus_name",),
+)
 def list_all_files(tool_context: ToolContext) -> dict:
     """Lists all files in the currently active RAG corpus.
 
@@ -44,6 +69,7 @@ def list_all_files(tool_context: ToolContext) -> dict:
         dict: A dictionary containing the list of files or an error message.
     """
     try:
+        rag = get_rag()
         corpus_name = get_active_corpus_name(tool_context)
         corpus_resource_name = get_corpus_resource_name(corpus_name)
 
@@ -90,6 +116,7 @@ def add_file(
         return {"status": "error", "message": f"File not found at '{file_path}'"}
 
     try:
+        rag = get_rag()
         corpus_name = get_active_corpus_name(tool_context)
         corpus_resource_name = get_corpus_resource_name(corpus_name)
 
@@ -124,13 +151,19 @@ def delete_file_by_id(file_name: str, tool_context: ToolContext) -> dict:
         dict: A dictionary containing the result of the deletion operation.
     """
     try:
-        rag.delete_file(name=file_name)
+        get_rag().delete_file(name=file_name)
         return {"status": "success", "message": "File deleted successfully."}
     except Exception as e:
         logging.error(f"Error deleting file: {e}")
         return {"status": "error", "message": str(e)}
 
 
+@memoize_tool(
+    ttl_s=QUERY_CACHE_TTL_S,
+    scope="global",
+    invalidated_by=CORPUS_CHANGES,
+    state_keys=("corpus_name",),
+)
 def query_all_files(query: str, tool_context: ToolContext) -> dict:
     """
     Query a Vertex AI RAG corpus with a user question and return relevant information.
@@ -143,6 +176,7 @@ def query_all_files(query: str, tool_context: ToolContext) -> dict:
         dict: The query results and status.
     """
     try:
+        rag = get_rag()
         corpus_name = get_active_corpus_name(tool_context)
         if not check_corpus_exists(corpus_name, tool_context):
             return {
@@ -1,8 +1,7 @@
 """Utility functions for the Vertex AI RAG tools."""
+import functools
 import sys
 import os
-import vertexai
-from vertexai import rag
 from google.adk.tools.tool_context import ToolContext
 
 if __package__ is None or __package__ == '':
@@ -16,18 +15,26 @@ else:
     from .config import LOCATION, PROJECT_ID, CORPUS_DISPLAY_NAME
 
 
-vertexai.init(project=PROJECT_ID, location=LOCATION)
+@functools.cache
+def get_rag():
+    """Imports and initialises the Vertex AI RAG SDK on first use."""
+    import vertexai
+    from vertexai import rag
+
+    vertexai.init(project=PROJECT_ID, location=LOCATION)
+    return rag
+
 
 def get_corpus_name(tool_context: ToolContext) -> str:
     """Gets the active corpus name from the tool context or the default."""
-    return tool_context.get_tool_state().get("corpus_name", CORPUS_DISPLAY_NAME)
+    return tool_context.state.get("corpus_name", CORPUS_DISPLAY_NAME)
 
 
 def get_corpus_resource_name(corpus_name: str) -> str:
     """
     Retrieves the full resource name of a RAG Corpus.
     """
-    corpora = rag.list_corpora()
+    corpora = get_rag().list_corpora()
     for corpus in corpora:
         if corpus.display_name == corpus_name:
             return corpus.name
@@ -0,0 +1,263 @@
+"""Memoization of idempotent tool results.
+
+Some tools are called again with the same arguments within a session and
+across sessions, e.g. the same RAG query. `memoize_tool` declares how a
+tool's results may be reused:
+
+    @memoize_tool(ttl_s=300, scope="global", invalidated_by=("add_file",))
+    def query_all_files(query: str, tool_context: ToolContext) -> dict: ...
+
+- ttl_s: how long a result is reused;
+- scope: who shares a result, "session", "user" or "global" (every user);
+- invalidated_by: tools whose calls drop all of this tool's results, e.g.
+  a query's results after a file is added to the corpus;
+- state_keys: session state keys the result also depends on.
+
+Invalidation runs from `tool_cache.after_tool`, an after_tool_callback
+installed on every agent, so it also covers tools that are not memoized
+themselves. A result whose call was in flight while its tool was
+invalidated is not stored either, nor are error results
+({"status": "error"}).
+
+Results live in one in-process LRU of TOOL_CACHE_MAX_ENTRIES entries;
+another worker process may serve a result until its TTL ends, so ttl_s
+bounds how stale a result can be.
+`tool_cache.stats()` gives the hits, misses and hit rate of each tool, which
+are also exported as metrics. TOOL_CACHE_ENABLED=false turns memoization
+off.
+"""
+
+import copy
+import functools
+import hashlib
+import inspect
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from dataclasses import dataclass
+from typing import Any, Callable, Optional
+
+from google.adk.tools.base_tool import BaseTool
+from google.adk.tools.tool_context import ToolContext
+
+logger = logging.getLogger(__name__)
+
+TOOL_CACHE_ENABLED = os.getenv("TOOL_CACHE_ENABLED", "true").lower() != "false"
+TOOL_CACHE_MAX_ENTRIES = int(os.getenv("TOOL_CACHE_MAX_ENTRIES", "1024"))
+
+SCOPES = ("session", "user", "global")
+_COUNTERS = ("hits", "misses", "expired", "invalidated", "evicted")
+
+
+@dataclass
+class ToolCachePolicy:
+    ttl_s: float
+    scope: str
+    invalidated_by: tuple[str, ...]
+    state_keys: tuple[str, ...]
+
+
+@dataclass
+class _Entry:
+    tool: str
+    result: Any
+    expires_at: float
+
+
+def _cacheable(result: Any) -> bool:
+    return not (isinstance(result, dict) and result.get("status") == "error")
+
+
+class ToolCache:
+    """A bounded LRU of tool results, with per-tool counters."""
+
+    def __init__(self, max_entries: int = TOOL_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.policies: dict[str, ToolCachePolicy] = {}
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._counts: dict[str, dict[str, int]] = defaultdict(lambda: dict.fromkeys(_COUNTERS, 0))
+        # Bumped by every invalidation of a tool.
+        self._generations: dict[str, int] = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def key(
+        self,
+        tool: str,
+        policy: ToolCachePolicy,
+        args: dict,
+        tool_context: Optional[ToolContext],
+    ) -> Optional[str]:
+        """The cache key of a call, or None if it cannot be cached."""
+        invocation = tool_context._invocation_context if tool_context else None
+        if policy.scope == "global":
+            owner = ""
+        elif invocation is None:
+            return None
+        elif policy.scope == "user":
+            owner = f"{invocation.app_name}:{invocation.user_id}"
+        else:
+            owner = f"{invocation.app_name}:{invocation.user_id}:{invocation.session.id}"
+        state = (
+            {k: tool_context.state.get(k) for k in policy.state_keys} if tool_context else {}
+        )
+        try:
+            payload = json.dumps(
+                {"tool": tool, "owner": owner, "args": args, "state": state},
+                sort_keys=True,
+                separators=(",", ":"),
+            )
+        except TypeError:
+            return None
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def get(self, tool: str, key: str) -> tuple[bool, Any]:
+        """(True, a copy of the result), or (False, None) on a miss."""
+        with self._lock:
+            counts = self._counts[tool]
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires_at <= time.monotonic():
+                del self._entries[key]
+                counts["expired"] += 1
+                entry = None
+            if entry is None:
+                counts["misses"] += 1
+                return False, None
+            self._entries.move_to_end(key)
+            counts["hits"] += 1
+        return True, copy.deepcopy(entry.result)
+
+    def generation(self, tool: str) -> int:
+        """Read before a call, then passed to `put` with its result."""
+        with self._lock:
+            return self._generations[tool]
+
+    def put(self, tool: str, key: str, result: Any, ttl_s: float, generation: int) -> None:
+        """Stores result unless tool was invalidated since `generation` was read."""
+        if not _cacheable(result):
+            return
+        entry = _Entry(tool, copy.deepcopy(result), time.monotonic() + ttl_s)
+        with self._lock:
+            if self._generations[tool] != generation:
+                return
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                _, evicted = self._entries.popitem(last=False)
+                self._counts[evicted.tool]["evicted"] += 1
+
+    def invalidate(self, tool: str) -> int:
+        """Drops every result of tool; returns how many were dropped."""
+        with self._lock:
+            self._generations[tool] += 1
+            keys = [k for k, entry in self._entries.items() if entry.tool == tool]
+            for k in keys:
+                del self._entries[k]
+            self._counts[tool]["invalidated"] += len(keys)
+        if keys:
+            logger.debug("Dropped %d cached results of %s", len(keys), tool)
+        return len(keys)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def after_tool(
+        self,
+        tool: BaseTool,
+        args: dict[str, Any],
+        tool_context: ToolContext,
+        tool_response: Any,
+    ) -> None:
+        """after_tool_callback that applies the declared invalidations."""
+        for name, policy in self.policies.items():
+            if tool.name in policy.invalidated_by:
+                self.invalidate(name)
+        return None
+
+    def stats(self) -> dict:
+        """Per tool: the counters, the number of entries and the hit rate."""
+        with self._lock:
+            entries = defaultdict(int)
+            for entry in self._entries.values():
+                entries[entry.tool] += 1
+            tools = {}
+            for tool, counts in self._counts.items():
+                lookups = counts["hits"] + counts["misses"]
+                tools[tool] = {
+                    **counts,
+                    "entries": entries[tool],
+                    "hit_rate": counts["hits"] / lookups if lookups else 0.0,
+                }
+        return tools
+
+
+tool_cache = ToolCache()
+
+
+def memoize_tool(
+    ttl_s: float,
+    scope: str = "session",
+    invalidated_by: tuple[str, ...] = (),
+    state_keys: tuple[str, ...] = (),
+    cache: ToolCache = tool_cache,
+) -> Callable:
+    """Decorates a sync or async function tool so its results are reused.
+
+    The wrapper keeps the tool's name, docstring and signature, which ADK
+    reads to declare the tool to the model. The arguments, without
+    tool_context, must be JSON-serializable for the call to be cached.
+    """
+    if scope not in SCOPES:
+        raise ValueError(f"scope must be one of {SCOPES}")
+
+    def decorator(tool: Callable) -> Callable:
+        name = tool.__name__
+        policy = ToolCachePolicy(ttl_s, scope, tuple(invalidated_by), tuple(state_keys))
+        cache.policies[name] = policy
+        signature = inspect.signature(tool)
+
+        def lookup(args, kwargs) -> tuple[Optional[str], int, bool, Any]:
+            """(key, generation, hit, result); key is None if not cacheable."""
+            if not TOOL_CACHE_ENABLED:
+                return None, 0, False, None
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            call_args = dict(bound.arguments)
+            tool_context = call_args.pop("tool_context", None)
+            key = cache.key(name, policy, call_args, tool_context)
+            if key is None:
+                return None, 0, False, None
+            # Read before the call, so an invalidation during it is seen.
+            generation = cache.generation(name)
+            return (key, generation, *cache.get(name, key))
+
+        if inspect.iscoroutinefunction(tool):
+
+            @functools.wraps(tool)
+            async def async_wrapper(*args, **kwargs):
+                key, generation, hit, result = lookup(args, kwargs)
+                if hit:
+                    return result
+                result = await tool(*args, **kwargs)
+                if key is not None:
+                    cache.put(name, key, result, ttl_s, generation)
+                return result
+
+            return async_wrapper
+
+        @functools.wraps(tool)
+        def wrapper(*args, **kwargs):
+            key, generation, hit, result = lookup(args, kwargs)
+            if hit:
+                return result
+            result = tool(*args, **kwargs)
+            if key is not None:
+                cache.put(name, key, result, ttl_s, generation)
+            return result
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,256 @@
+"""Per-invocation span timelines, exportable in the Chrome trace format.
+
+ADK already creates OpenTelemetry spans for each invocation, agent run
+(`agent_run [name]`), model call (`call_llm`) and tool call
+(`execute_tool name`). The model layer adds one span per provider attempt
+(`model_call <model>`, including hedges, fail-overs and rate-limit waits),
+and `TracedSessionService` adds one per session store operation.
+
+`setup_tracing` installs a sampler and `TraceStore`, which keeps the spans
+of the most recent sampled invocations in memory. Payload attributes
+(prompts, responses, tool arguments) are dropped as spans end. The
+admin-only `/debug/traces` routes (see admin.py) list them and download one
+invocation as Chrome / Perfetto trace JSON (open it in chrome://tracing or
+ui.perfetto.dev).
+
+The sample rate is TRACE_SAMPLE_RATE (default 0.1); unsampled invocations
+create no spans.
+"""
+
+import json
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Optional
+
+from google.adk.events import Event
+from google.adk.sessions import BaseSessionService, Session
+from opentelemetry import trace
+from opentelemetry.sdk.trace import ReadableSpan, SpanProcessor, TracerProvider
+from opentelemetry.sdk.trace.sampling import ParentBased, TraceIdRatioBased
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+
+from .admin import is_admin
+
+TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "0.1"))
+TRACE_MAX_INVOCATIONS = 200
+TRACE_MAX_SPANS = 10_000
+
+INVOCATION_ID_ATTRIBUTE = "gcp.vertex.agent.invocation_id"
+# Attributes that carry payloads rather than identifiers or sizes.
+PAYLOAD_ATTRIBUTES = {
+    "gcp.vertex.agent.llm_request",
+    "gcp.vertex.agent.llm_response",
+    "gcp.vertex.agent.tool_call_args",
+    "gcp.vertex.agent.tool_response",
+    "gcp.vertex.agent.data",
+    "gen_ai.tool.description",
+}
+MAX_ATTRIBUTE_CHARS = 256
+
+tracer = trace.get_tracer(__name__)
+
+
+@dataclass
+class SpanRecord:
+    name: str
+    start_ns: int
+    end_ns: int
+    attributes: dict[str, Any]
+    error: bool
+
+    @property
+    def category(self) -> str:
+        for prefix, category in (
+            ("agent_run", "agent"),
+            ("call_llm", "model"),
+            ("model_call", "model"),
+            ("execute_tool", "tool"),
+            ("session.", "session"),
+        ):
+            if self.name.startswith(prefix):
+                return category
+        return "runner"
+
+
+def _compact_attributes(span: ReadableSpan) -> dict[str, Any]:
+    return {
+        key: value
+        for key, value in (span.attributes or {}).items()
+        if key not in PAYLOAD_ATTRIBUTES
+        and not (isinstance(value, str) and len(value) > MAX_ATTRIBUTE_CHARS)
+    }
+
+
+class TraceStore(SpanProcessor):
+    """Keeps the finished spans of the most recent traces, by invocation id."""
+
+    def __init__(self, max_traces: int = TRACE_MAX_INVOCATIONS):
+        self.max_traces = max_traces
+        self._traces: OrderedDict[int, list[SpanRecord]] = OrderedDict()
+        self._invocations: dict[str, int] = {}
+        self._trace_invocations: dict[int, str] = {}
+        self._lock = threading.Lock()
+
+    def on_end(self, span: ReadableSpan) -> None:
+        record = SpanRecord(
+            name=span.name,
+            start_ns=span.start_time,
+            end_ns=span.end_time,
+            attributes=_compact_attributes(span),
+            error=not span.status.is_ok,
+        )
+        trace_id = span.context.trace_id
+        invocation_id = (span.attributes or {}).get(INVOCATION_ID_ATTRIBUTE)
+        with self._lock:
+            spans = self._traces.setdefault(trace_id, [])
+            if len(spans) < TRACE_MAX_SPANS:
+                spans.append(record)
+            if invocation_id and trace_id not in self._trace_invocations:
+                self._invocations[invocation_id] = trace_id
+                self._trace_invocations[trace_id] = invocation_id
+            if span.parent is None and trace_id not in self._trace_invocations:
+                # A finished trace outside any invocation, e.g. a session lookup.
+                del self._traces[trace_id]
+            while len(self._traces) > self.max_traces:
+                evicted, _ = self._traces.popitem(last=False)
+                self._invocations.pop(self._trace_invocations.pop(evicted, None), None)
+
+    def invocations(self) -> list[dict]:
+        """Summaries of the stored invocations, most recent first."""
+        with self._lock:
+            items = [(i, list(self._traces.get(t, []))) for i, t in self._invocations.items()]
+        summaries = []
+        for invocation_id, spans in items:
+            if not spans:
+                continue
+            start = min(s.start_ns for s in spans)
+            end = max(s.end_ns for s in spans)
+            summaries.append(
+                {
+                    "invocation_id": invocation_id,
+                    "start_ns": start,
+                    "duration_ms": (end - start) / 1e6,
+                    "spans": len(spans),
+                }
+            )
+        return sorted(summaries, key=lambda s: s["start_ns"], reverse=True)
+
+    def spans(self, invocation_id: str) -> Optional[list[SpanRecord]]:
+        with self._lock:
+            trace_id = self._invocations.get(invocation_id)
+            return list(self._traces[trace_id]) if trace_id in self._traces else None
+
+
+def chrome_trace(spans: list[SpanRecord]) -> dict:
+    """Spans as Chrome trace "complete" events.
+
+    The viewer needs the spans of one track to nest, so concurrent spans
+    (hedged calls, parallel tools) are spread over as many tracks as needed.
+    """
+    origin = min(s.start_ns for s in spans)
+    lanes: list[list[int]] = []
+    events = []
+    for span in sorted(spans, key=lambda s: (s.start_ns, -s.end_ns)):
+        for lane, open_ends in enumerate(lanes):
+            while open_ends and open_ends[-1] <= span.start_ns:
+                open_ends.pop()
+            if not open_ends or span.end_ns <= open_ends[-1]:
+                break
+        else:
+            lane, open_ends = len(lanes), []
+            lanes.append(open_ends)
+        open_ends.append(span.end_ns)
+        events.append(
+            {
+                "name": span.name,
+                "cat": span.category,
+                "ph": "X",
+                "ts": (span.start_ns - origin) / 1000,
+                "dur": (span.end_ns - span.start_ns) / 1000,
+                "pid": 1,
+                "tid": lane,
+                "args": {**span.attributes, **({"error": True} if span.error else {})},
+            }
+        )
+    return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+
+trace_store = TraceStore()
+
+
+def setup_tracing(sample_rate: float = TRACE_SAMPLE_RATE) -> None:
+    """Samples invocations into `trace_store`.
+
+    Adds the store to an already configured SDK provider (e.g. one exporting
+    to Cloud Trace); otherwise installs a provider with the sample rate.
+    """
+    provider = trace.get_tracer_provider()
+    if not isinstance(provider, TracerProvider):
+        provider = TracerProvider(sampler=ParentBased(TraceIdRatioBased(sample_rate)))
+        trace.set_tracer_provider(provider)
+    provider.add_span_processor(trace_store)
+
+
+async def traces_endpoint(request: Request) -> JSONResponse:
+    if not is_admin(request):
+        return JSONResponse({"detail": "Forbidden"}, status_code=403)
+    return JSONResponse(trace_store.invocations())
+
+
+async def trace_endpoint(request: Request) -> Response:
+    if not is_admin(request):
+        return JSONResponse({"detail": "Forbidden"}, status_code=403)
+    invocation_id = request.path_params["invocation_id"]
+    spans = trace_store.spans(invocation_id)
+    if not spans:
+        return JSONResponse({"detail": "Trace not found or not sampled"}, status_code=404)
+    return Response(
+        json.dumps(chrome_trace(spans)),
+        media_type="application/json",
+        headers={
+            "Content-Disposition": f'attachment; filename="trace-{invocation_id}.json"'
+        },
+    )
+
+
+TRACE_ROUTES = [
+    ("/debug/traces", traces_endpoint),
+    ("/debug/traces/{invocation_id}", trace_endpoint),
+]
+
+
+class TracedSessionService(BaseSessionService):
+    """Wraps a session service with one span per store operation."""
+
+    def __init__(self, inner: BaseSessionService):
+        self.inner = inner
+
+    def __getattr__(self, name: str):
+        return getattr(self.inner, name)
+
+    async def create_session(self, **kwargs) -> Session:
+        with tracer.start_as_current_span("session.create_session"):
+            return await self.inner.create_session(**kwargs)
+
+    async def get_session(self, **kwargs) -> Optional[Session]:
+        with tracer.start_as_current_span("session.get_session") as span:
+            session = await self.inner.get_session(**kwargs)
+            if session is not None:
+                span.set_attribute("session.events", len(session.events))
+            return session
+
+    async def list_sessions(self, **kwargs):
+        with tracer.start_as_current_span("session.list_sessions"):
+            return await self.inner.list_sessions(**kwargs)
+
+    async def delete_session(self, **kwargs) -> None:
+        with tracer.start_as_current_span("session.delete_session"):
+            return await self.inner.delete_session(**kwargs)
+
+    async def append_event(self, session: Session, event: Event) -> Event:
+        with tracer.start_as_current_span("session.append_event") as span:
+            span.set_attribute(INVOCATION_ID_ATTRIBUTE, event.invocation_id)
+            return await self.inner.append_event(session, event)
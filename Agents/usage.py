@@ -0,0 +1,310 @@
+"""Token and cost accounting for agent runs, with budget enforcement.
+
+`UsageTracker.track` wraps the event stream of `Runner.run_async`. It sums
+the `usage_metadata` of every model event per agent, and stops the run once
+the invocation exceeds its token or wall-clock budget, or its session
+exceeds the session token budget. In that case a final error event with
+error_code "BUDGET_EXCEEDED" is yielded in place of the rest of the run.
+
+Agents reached only through an AgentTool run in an inner Runner whose
+events never reach the outer stream. Their usage is recorded by an
+after_model_callback into the invocation that is being tracked.
+
+One row per invocation and agent is stored in SQLite when the invocation
+ends. `UsageStore.summary` aggregates the rows by invocation, session or
+user.
+"""
+
+import asyncio
+import contextvars
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections.abc import AsyncGenerator
+from dataclasses import asdict, dataclass, field
+from typing import Optional
+
+from google.adk.agents import BaseAgent, LlmAgent
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.events import Event
+from google.adk.models import LlmResponse
+from google.genai import types
+
+from .root_agent.hooks import add_callback, walk_agents
+from .root_agent.models.routing import call_cost_usd
+
+logger = logging.getLogger(__name__)
+
+USAGE_DB_PATH = os.getenv("USAGE_DB_PATH", "./agent_usage.db")
+# Budgets; 0 disables a limit.
+MAX_INVOCATION_TOKENS = int(os.getenv("USAGE_MAX_INVOCATION_TOKENS", "200000"))
+MAX_INVOCATION_WALL_S = float(os.getenv("USAGE_MAX_INVOCATION_WALL_S", "300"))
+MAX_SESSION_TOKENS = int(os.getenv("USAGE_MAX_SESSION_TOKENS", "0"))
+
+BUDGET_EXCEEDED = "BUDGET_EXCEEDED"
+
+
+@dataclass
+class Usage:
+    calls: int = 0
+    prompt_tokens: int = 0
+    cached_tokens: int = 0
+    output_tokens: int = 0
+    total_tokens: int = 0
+    cost_usd: float = 0.0
+
+    def add(self, usage: types.GenerateContentResponseUsageMetadata, model: Optional[str]):
+        self.calls += 1
+        self.prompt_tokens += usage.prompt_token_count or 0
+        self.cached_tokens += usage.cached_content_token_count or 0
+        self.output_tokens += (usage.candidates_token_count or 0) + (
+            usage.thoughts_token_count or 0
+        )
+        self.total_tokens += usage.total_token_count or 0
+        if model:
+            self.cost_usd += call_cost_usd(model, usage)
+
+
+@dataclass
+class InvocationUsage:
+    user_id: str
+    session_id: str
+    invocation_id: str = ""
+    started_at: float = field(default_factory=time.time)
+    agents: dict[str, Usage] = field(default_factory=dict)
+
+    def add(self, agent: str, usage, model: Optional[str]) -> None:
+        self.agents.setdefault(agent, Usage()).add(usage, model)
+
+    @property
+    def total_tokens(self) -> int:
+        return sum(u.total_tokens for u in self.agents.values())
+
+    @property
+    def wall_s(self) -> float:
+        return time.time() - self.started_at
+
+
+@dataclass
+class Budget:
+    max_tokens: int = MAX_INVOCATION_TOKENS
+    max_wall_s: float = MAX_INVOCATION_WALL_S
+    max_session_tokens: int = MAX_SESSION_TOKENS
+
+
+_USAGE_COLUMNS = tuple(Usage.__dataclass_fields__)
+_SCOPES = ("invocation_id", "session_id", "user_id")
+
+
+class UsageStore:
+    """Per-invocation, per-agent usage rows in SQLite."""
+
+    def __init__(self, path: str = USAGE_DB_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS usage ("
+            " invocation_id TEXT NOT NULL,"
+            " agent TEXT NOT NULL,"
+            " user_id TEXT NOT NULL,"
+            " session_id TEXT NOT NULL,"
+            " started_at REAL NOT NULL,"
+            " wall_s REAL NOT NULL,"
+            + "".join(
+                f" {c} {'REAL' if c == 'cost_usd' else 'INTEGER'} NOT NULL,"
+                for c in _USAGE_COLUMNS
+            )
+            + " PRIMARY KEY (invocation_id, agent)) WITHOUT ROWID"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS usage_session ON usage (session_id)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS usage_user ON usage (user_id)")
+
+    def save(self, invocation: InvocationUsage) -> None:
+        rows = [
+            (
+                invocation.invocation_id,
+                agent,
+                invocation.user_id,
+                invocation.session_id,
+                invocation.started_at,
+                invocation.wall_s,
+                *asdict(usage).values(),
+            )
+            for agent, usage in invocation.agents.items()
+        ]
+        placeholders = ", ".join("?" * (6 + len(_USAGE_COLUMNS)))
+        with self._lock:
+            self._db.executemany(
+                f"INSERT OR REPLACE INTO usage VALUES ({placeholders})", rows
+            )
+
+    def session_tokens(self, session_id: str) -> int:
+        with self._lock:
+            (total,) = self._db.execute(
+                "SELECT COALESCE(SUM(total_tokens), 0) FROM usage WHERE session_id = ?",
+                (session_id,),
+            ).fetchone()
+        return total
+
+    def summary(self, scope: str, value: str) -> dict:
+        """Totals and per-agent usage for one invocation, session or user."""
+        if scope not in _SCOPES:
+            raise ValueError(f"scope must be one of {_SCOPES}")
+        sums = ", ".join(f"SUM({c})" for c in _USAGE_COLUMNS)
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT agent, {sums} FROM usage WHERE {scope} = ? GROUP BY agent",
+                (value,),
+            ).fetchall()
+            invocations, wall_s = self._db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(wall_s), 0) FROM ("
+                f" SELECT MAX(wall_s) AS wall_s FROM usage WHERE {scope} = ?"
+                " GROUP BY invocation_id)",
+                (value,),
+            ).fetchone()
+        by_agent = {row[0]: dict(zip(_USAGE_COLUMNS, row[1:])) for row in rows}
+        total = {c: sum(a[c] for a in by_agent.values()) for c in _USAGE_COLUMNS}
+        return {
+            scope: value,
+            "invocations": invocations,
+            "wall_s": wall_s,
+            "total": total,
+            "by_agent": by_agent,
+        }
+
+
+_current: contextvars.ContextVar[Optional[InvocationUsage]] = contextvars.ContextVar(
+    "current_invocation_usage", default=None
+)
+
+
+def _record_inner_usage(
+    callback_context: CallbackContext, llm_response: LlmResponse
+) -> Optional[LlmResponse]:
+    """after_model_callback for agents whose events the tracker does not see."""
+    invocation = _current.get()
+    if invocation is not None and llm_response.usage_metadata and not llm_response.partial:
+        llm = callback_context._invocation_context.agent.canonical_model
+        model = (llm_response.custom_metadata or {}).get("model") or llm.model
+        invocation.add(callback_context.agent_name, llm_response.usage_metadata, model)
+    return None
+
+
+def _event_agents(root: BaseAgent) -> set[str]:
+    """Names of agents whose events reach the runner's event stream."""
+    names, stack = set(), [root]
+    while stack:
+        agent = stack.pop()
+        names.add(agent.name)
+        stack.extend(agent.sub_agents)
+    return names
+
+
+_INSTALLED: set[int] = set()
+
+
+class UsageTracker:
+    """Accounts the usage of runs of one agent tree and enforces budgets."""
+
+    def __init__(
+        self,
+        root_agent: BaseAgent,
+        store: Optional[UsageStore] = None,
+        budget: Optional[Budget] = None,
+    ):
+        self._store = store
+        self._store_lock = threading.Lock()
+        self.budget = budget or Budget()
+        self._models = {
+            agent.name: agent.canonical_model.model
+            for agent in walk_agents(root_agent)
+            if isinstance(agent, LlmAgent)
+        }
+        self._root_name = root_agent.name
+        if id(root_agent) not in _INSTALLED:
+            _INSTALLED.add(id(root_agent))
+            event_agents = _event_agents(root_agent)
+            for agent in walk_agents(root_agent):
+                if agent.name not in event_agents:
+                    add_callback(agent, "after_model_callback", _record_inner_usage, first=True)
+
+    @property
+    def store(self) -> UsageStore:
+        """The given store, or the default one, opened on first use."""
+        with self._store_lock:
+            if self._store is None:
+                self._store = UsageStore()
+            return self._store
+
+    def _over_budget(self, invocation: InvocationUsage, session_tokens: int) -> Optional[str]:
+        budget = self.budget
+        tokens = invocation.total_tokens
+        if budget.max_tokens and tokens > budget.max_tokens:
+            return f"token budget of {budget.max_tokens} exceeded ({tokens} used)"
+        if budget.max_session_tokens and session_tokens + tokens > budget.max_session_tokens:
+            return f"session token budget of {budget.max_session_tokens} exceeded"
+        if budget.max_wall_s and invocation.wall_s > budget.max_wall_s:
+            return f"time budget of {budget.max_wall_s:g}s exceeded"
+        return None
+
+    async def track(
+        self, events: AsyncGenerator[Event, None], user_id: str, session_id: str
+    ) -> AsyncGenerator[Event, None]:
+        """Yields the events of a run, accounting usage and enforcing budgets."""
+        invocation = InvocationUsage(user_id=user_id, session_id=session_id)
+        token = _current.set(invocation)
+        session_tokens = 0
+        if self.budget.max_session_tokens:
+            session_tokens = await asyncio.to_thread(self.store.session_tokens, session_id)
+
+        # Budgets, the wall-clock one included, are checked between events: the
+        # run is stopped by no longer iterating it, never by cancelling the
+        # consumer's task.
+        reason = self._over_budget(invocation, session_tokens)
+        try:
+            while reason is None:
+                try:
+                    event = await events.__anext__()
+                except StopAsyncIteration:
+                    break
+                invocation.invocation_id = invocation.invocation_id or event.invocation_id
+                if event.usage_metadata and not event.partial:
+                    model = (event.custom_metadata or {}).get("model") or self._models.get(
+                        event.author
+                    )
+                    invocation.add(event.author, event.usage_metadata, model)
+                yield event
+                reason = self._over_budget(invocation, session_tokens)
+        finally:
+            try:
+                _current.reset(token)
+            except ValueError:
+                pass  # Finalized from another context after the consumer stopped.
+            await events.aclose()
+            invocation.invocation_id = invocation.invocation_id or uuid.uuid4().hex
+            if invocation.agents:
+                await asyncio.to_thread(self.store.save, invocation)
+
+        if reason is not None:
+            logger.warning(
+                "Stopping invocation %s of session %s: %s",
+                invocation.invocation_id,
+                session_id,
+                reason,
+            )
+            yield Event(
+                invocation_id=invocation.invocation_id,
+                author=self._root_name,
+                error_code=BUDGET_EXCEEDED,
+                error_message=reason,
+                content=types.Content(
+                    role="model",
+                    parts=[types.Part(text=f"Stopped: the {reason}.")],
+                ),
+            )